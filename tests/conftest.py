@@ -0,0 +1,56 @@
+# 测试公共设置：按各模块导入时使用的名称加载仓库根目录下的模块文件
+import importlib.abc
+import importlib.util
+import sys
+from pathlib import Path
+from typing import Any, Dict
+
+import pytest
+
+仓库根目录 = Path(__file__).resolve().parent.parent
+
+# 导入名 -> 文件名（模块之间按导入名互相引用，文件名与之不同）
+模块文件表 = {
+    "模块2_配置管理": "模块2配置管理系统.py",
+    "模块3_网络学习引擎": "模块3 网络学习引擎.py",
+    "模块4_风格管理": "模块4风格管理系统.py",
+    "模块5_智能生成核心": "模块5智能生成核心.py",
+    "模块7三级审核系统": "模块7三级审核系统.py",
+}
+
+class 仓库模块查找器(importlib.abc.MetaPathFinder):
+    """把导入名映射到仓库根目录下的对应文件"""
+    def find_spec(self, 全名, 路径=None, 目标=None):
+        文件名 = 模块文件表.get(全名)
+        if 文件名 is None:
+            return None
+        return importlib.util.spec_from_file_location(全名, 仓库根目录 / 文件名)
+
+sys.meta_path.insert(0, 仓库模块查找器())
+
+class 测试配置:
+    """替代配置管理器：只返回测试给定的值，不读写配置文件"""
+    def __init__(self, 配置: Dict[str, Any] = None, 网络配置: Dict[str, Any] = None):
+        self.配置 = dict(配置 or {})
+        self.网络配置 = {
+            "真实爬取": True, "遵守规范": True, "爬取延迟": 0.0, "超时时间": 5, "重试次数": 1,
+            "并发线程数": 4, "用户代理": "测试爬虫", "代理设置": None, "白名单": [], "黑名单": [],
+            **(网络配置 or {})
+        }
+
+    def 获取配置(self, 配置路径: str = None, 默认值=None):
+        return self.配置.get(配置路径, 默认值)
+
+    def 设置配置(self, 配置路径: str, 值: Any, 立即保存: bool = True):
+        self.配置[配置路径] = 值
+        return True
+
+    def 获取网络配置(self) -> Dict[str, Any]:
+        return dict(self.网络配置)
+
+    def 获取安全配置(self) -> Dict[str, Any]:
+        return {"审核模式": "开启", "自定义关键词": []}
+
+@pytest.fixture
+def 配置():
+    return 测试配置()
\ No newline at end of file
@@ -0,0 +1,179 @@
+# 三级审核系统测试
+import random
+import sys
+
+import numpy as np
+import pytest
+
+try:
+    import 模块7三级审核系统 as 审核模块
+except Exception as 导入错误:
+    # 依赖链上的模块（生成核心、风格管理等）无法导入时整体跳过
+    pytest.skip(f"无法导入三级审核系统: {导入错误}", allow_module_level=True)
+
+from 模块7三级审核系统 import (
+    三级审核系统, 视觉内容分析器, 感知哈希索引, 风险等级, 内容类型
+)
+
+@pytest.fixture(autouse=True)
+def 隔离配置(monkeypatch, 配置):
+    monkeypatch.setattr(审核模块, "获取配置管理器", lambda: 配置)
+
+# 视频关键帧：解码不完整时不能判为安全
+
+@pytest.fixture
+def 假ffmpeg(tmp_path, 配置):
+    """生成一个按参数输出PPM帧的假ffmpeg，并配置为分析器使用的ffmpeg"""
+    if sys.platform == "win32":
+        pytest.skip("假ffmpeg依赖shebang脚本")
+
+    def 生成(帧数: int, 返回码: int = 0, 截断最后一帧: bool = False) -> str:
+        脚本 = tmp_path / "ffmpeg"
+        脚本.write_text(
+            f"#!{sys.executable}\n"
+            "import sys\n"
+            f"帧数, 返回码, 截断 = {帧数}, {返回码}, {截断最后一帧}\n"
+            "输出 = sys.stdout.buffer\n"
+            "for 序号 in range(帧数):\n"
+            "    像素 = bytes([20, 40, 200]) * 64\n"
+            "    if 截断 and 序号 == 帧数 - 1:\n"
+            "        像素 = 像素[:50]\n"
+            "    输出.write(b'P6\\n8 8\\n255\\n' + 像素)\n"
+            "输出.flush()\n"
+            "sys.exit(返回码)\n",
+            encoding="utf-8"
+        )
+        脚本.chmod(0o755)
+        配置.配置["安全设置.ffmpeg路径"] = str(脚本)
+        return str(tmp_path / "视频.mp4")
+    return 生成
+
+def test_完整解码的正常视频判为安全(假ffmpeg):
+    结果 = 视觉内容分析器().分析视频内容(假ffmpeg(3))
+    assert 结果["风险等级"] == 风险等级.安全
+    assert 结果["视频时长"] == 3.0
+    assert 结果["分析详情"]["已扫描帧数"] == 3
+    assert not 结果["分析详情"]["解码失败"]
+
+def test_ffmpeg中途失败时按中风险复核(假ffmpeg):
+    结果 = 视觉内容分析器().分析视频内容(假ffmpeg(3, 返回码=1))
+    assert 结果["风险等级"] == 风险等级.中风险
+    assert 结果["分析详情"]["解码失败"]
+    assert 结果["分析详情"]["已扫描帧数"] == 3
+    assert 结果["视频时长"] == "未知"
+
+def test_最后一帧被截断时按中风险复核(假ffmpeg):
+    结果 = 视觉内容分析器().分析视频内容(假ffmpeg(3, 截断最后一帧=True))
+    assert 结果["风险等级"] == 风险等级.中风险
+    assert 结果["分析详情"]["解码失败"]
+    assert 结果["分析详情"]["已扫描帧数"] == 2
+
+def test_没有解出任何帧时按中风险复核(假ffmpeg):
+    结果 = 视觉内容分析器().分析视频内容(假ffmpeg(0))
+    assert 结果["风险等级"] == 风险等级.中风险
+    assert 结果["分析详情"]["已扫描帧数"] == 0
+
+def test_达到帧数上限时按中风险复核(假ffmpeg, 配置):
+    配置.配置["安全设置.视频最大采样帧数"] = 2
+    结果 = 视觉内容分析器().分析视频内容(假ffmpeg(5))
+    assert 结果["风险等级"] == 风险等级.中风险
+    assert 结果["分析详情"]["达到帧数上限"]
+    assert 结果["视频时长"] == "未知"
+
+# 感知哈希BK树
+
+def test_感知哈希索引查询结果与逐个比较一致():
+    随机数 = random.Random(0)
+    哈希列表 = []
+    for _ in range(50):
+        基准 = 随机数.getrandbits(64)
+        for _ in range(20):
+            翻转位 = sum(1 << 位 for 位 in 随机数.sample(range(64), 随机数.randint(0, 8)))
+            哈希列表.append(基准 ^ 翻转位)
+    索引 = 感知哈希索引()
+    for 序号, 哈希值 in enumerate(哈希列表):
+        索引.添加(哈希值, 序号)
+
+    for 查询 in 哈希列表[::97]:
+        期望 = {}
+        for 序号, 哈希值 in enumerate(哈希列表):
+            距离 = 感知哈希索引.汉明距离(查询, 哈希值)
+            if 距离 <= 6:
+                期望.setdefault(哈希值, (距离, 序号))
+        结果 = 索引.查询(查询, 6)
+        assert sorted(结果) == sorted(期望.values())
+        assert [距离 for 距离, _ in 结果] == sorted(距离 for 距离, _ in 结果)
+
+def test_感知哈希索引相同哈希保留最早的数据():
+    索引 = 感知哈希索引()
+    assert 索引.添加(0b1010, "最早")
+    assert 索引.添加(0b1010, "之后")
+    assert len(索引) == 1
+    assert 索引.查询(0b1010, 0) == [(0, "最早")]
+
+def test_感知哈希索引满后拒绝新哈希():
+    索引 = 感知哈希索引(最大条目数=2)
+    assert 索引.添加(0b0001, "a")
+    assert 索引.添加(0b0011, "b")
+    assert not 索引.添加(0b0111, "c")
+    assert 索引.添加(0b0001, "a2")
+    assert len(索引) == 2
+    assert 索引.查询(0b0111, 0) == []
+
+# 图像分析
+
+@pytest.fixture
+def 测试图像(tmp_path):
+    Image = pytest.importorskip("PIL.Image")
+    随机数 = np.random.default_rng(0)
+    路径列表 = []
+    for 序号 in range(4):
+        色块 = 随机数.integers(0, 256, size=(6, 8, 3), dtype=np.uint8)
+        路径 = tmp_path / f"图像{序号}.png"
+        Image.fromarray(色块).resize((64, 48)).save(路径)
+        路径列表.append(str(路径))
+    return 路径列表
+
+def 判定摘要(结果):
+    return 结果["分析状态"], 结果["风险等级"], round(结果["风险评分"], 6), 结果["检测到的元素"]
+
+def test_批量分析图像与逐张分析结果一致(测试图像):
+    批量结果 = 视觉内容分析器().批量分析图像(测试图像)
+    逐张结果 = [视觉内容分析器().分析图像内容(路径) for 路径 in 测试图像]
+    assert [判定摘要(结果) for 结果 in 批量结果] == [判定摘要(结果) for 结果 in 逐张结果]
+    assert all(结果["分析状态"] == "分析完成" for 结果 in 批量结果)
+
+def test_图像结果按文件内容缓存(测试图像, tmp_path):
+    分析器 = 视觉内容分析器()
+    首次 = 分析器.批量分析图像(测试图像)
+    副本 = tmp_path / "副本.png"
+    副本.write_bytes(open(测试图像[0], "rb").read())
+
+    再次 = 分析器.批量分析图像(测试图像 + [str(副本)])
+    assert 分析器.缓存统计["命中次数"] == 5
+    assert [判定摘要(结果) for 结果 in 再次] == [判定摘要(结果) for 结果 in 首次 + 首次[:1]]
+
+def test_无法分析的图像不判为安全(tmp_path):
+    坏图像 = tmp_path / "坏图像.png"
+    坏图像.write_bytes(b"not an image")
+    不支持 = tmp_path / "说明.txt"
+    不支持.write_text("x", encoding="utf-8")
+
+    坏结果, 不支持结果 = 视觉内容分析器().批量分析图像([str(坏图像), str(不支持)])
+    assert 坏结果["风险等级"] == 风险等级.中风险
+    assert 坏结果["分析状态"].startswith("分析失败")
+    assert (不支持结果["分析状态"], 不支持结果["风险等级"]) == ("不支持的图像格式", 风险等级.低风险)
+
+def test_批量审核图像只调用一次批量分析(monkeypatch, 测试图像):
+    审核系统 = 三级审核系统(配置覆盖={"安全设置.启用风险监控": False})
+    调用列表 = []
+    原方法 = 审核系统.视觉分析器.批量分析图像
+    def 记录调用(路径列表):
+        调用列表.append(list(路径列表))
+        return 原方法(路径列表)
+    monkeypatch.setattr(审核系统.视觉分析器, "批量分析图像", 记录调用)
+
+    结果列表 = 审核系统.批量审核(测试图像, 内容类型.图像)
+    assert 调用列表 == [测试图像]
+    assert [结果.内容类型 for 结果 in 结果列表] == [内容类型.图像] * len(测试图像)
+    assert len({结果.审核ID for 结果 in 结果列表}) == len(测试图像)
\ No newline at end of file
@@ -0,0 +1,310 @@
+# 网络学习引擎测试
+import atexit
+import time
+from collections import Counter
+from typing import Dict
+from urllib.parse import urlsplit
+
+import pytest
+import requests
+from requests.structures import CaseInsensitiveDict
+
+import 模块3_网络学习引擎 as 网络学习引擎
+from 模块3_网络学习引擎 import (
+    规范化URL, 网址哈希, 可扩展布隆过滤器, 抓取前沿, 智能爬虫系统,
+    robots缓存, HTTP缓存, 主机礼貌调度器
+)
+
+@pytest.fixture(autouse=True)
+def 隔离配置(monkeypatch, 配置):
+    monkeypatch.setattr(网络学习引擎, "获取配置管理器", lambda: 配置)
+
+# 网址规范化
+
+@pytest.mark.parametrize("网址, 期望", [
+    ("http://example.com/a#frag", "http://example.com/a"),
+    ("http://Example.COM:80/a", "http://example.com/a"),
+    ("https://example.com:443/", "https://example.com/"),
+    ("http://example.com:8080/a", "http://example.com:8080/a"),
+    ("http://example.com/p?utm_source=x&b=1&utm_medium=y&fbclid=z", "http://example.com/p?b=1"),
+    ("http://example.com/a/./b/../c", "http://example.com/a/c"),
+    ("http://example.com/%7euser", "http://example.com/~user"),
+])
+def test_规范化URL(网址, 期望):
+    assert 规范化URL(网址) == 期望
+
+def test_规范化URL_同名参数保持原顺序():
+    assert 规范化URL("http://example.com/p?b=2&a=1&b=1") == "http://example.com/p?a=1&b=2&b=1"
+    assert 规范化URL("http://example.com/p?b=1&b=2") != 规范化URL("http://example.com/p?b=2&b=1")
+
+# 布隆过滤器和抓取前沿
+
+def test_布隆过滤器扩层后没有漏判():
+    过滤器 = 可扩展布隆过滤器(初始容量=1000, 误判率=0.01)
+    哈希列表 = [网址哈希(f"http://example.com/{序号}") for 序号 in range(5000)]
+    for 哈希值 in 哈希列表:
+        过滤器.添加(哈希值)
+
+    assert len(过滤器.层列表) > 1
+    assert 过滤器.元素数 == 5000
+    assert all(过滤器.包含(哈希值) for 哈希值 in 哈希列表)
+    误判数 = sum(过滤器.包含(网址哈希(f"http://other.com/{序号}")) for 序号 in range(5000))
+    assert 误判数 / 5000 < 0.02
+
+def test_抓取前沿按规范网址去重并保存原网址(tmp_path):
+    前沿 = 抓取前沿(str(tmp_path / "前沿.db"))
+    try:
+        assert 前沿.加入(["http://Example.com:80/a?utm_source=x#top", "http://example.com/a"]) == 1
+        assert [条目.url for 条目 in 前沿.取出(10)] == ["http://Example.com:80/a?utm_source=x#top"]
+    finally:
+        前沿.关闭()
+
+def test_抓取前沿每批每主机有上限(tmp_path):
+    前沿 = 抓取前沿(str(tmp_path / "前沿.db"), 每主机批量上限=2)
+    try:
+        前沿.加入([f"http://a.com/{序号}" for 序号 in range(10)] + [f"http://b.com/{序号}" for 序号 in range(3)])
+        批次 = 前沿.取出(10)
+        assert Counter(urlsplit(条目.url).netloc for 条目 in 批次) == {"a.com": 2, "b.com": 2}
+    finally:
+        前沿.关闭()
+
+def test_抓取前沿失败重试用完后标记失败(tmp_path):
+    前沿 = 抓取前沿(str(tmp_path / "前沿.db"), 最大尝试次数=2)
+    try:
+        前沿.加入(["http://example.com/a"])
+        for _ in range(2):
+            条目, = 前沿.取出(1)
+            前沿.完成(条目, False)
+        assert 前沿.取出(1) == []
+        assert 前沿.获取前沿状态()["已失败"] == 1
+    finally:
+        前沿.关闭()
+
+def test_抓取前沿崩溃后从中断处继续(tmp_path):
+    路径 = str(tmp_path / "前沿.db")
+    网址列表 = [f"http://h{序号 % 5}.com/p{序号}" for 序号 in range(30)]
+    前沿 = 抓取前沿(路径, 快照间隔=10)
+    前沿.加入(网址列表)
+    取出列表 = 前沿.取出(10)
+    前沿.完成(取出列表[0], True, ["http://h9.com/新页面"])
+
+    # 模拟进程崩溃：不保存布隆快照，取出的网址停留在抓取中
+    atexit.unregister(前沿.关闭)
+    前沿.数据库.close()
+
+    恢复 = 抓取前沿(路径, 快照间隔=10)
+    try:
+        状态 = 恢复.获取前沿状态()
+        assert (状态["待抓取"], 状态["抓取中"], 状态["已完成"]) == (30, 0, 1)
+        assert 恢复.布隆过滤器.元素数 == 31
+        assert 恢复.加入(网址列表 + ["http://h9.com/新页面"]) == 0
+
+        剩余 = []
+        while True:
+            批次 = 恢复.取出(100)
+            if not 批次:
+                break
+            剩余.extend(条目.url for 条目 in 批次)
+            for 条目 in 批次:
+                恢复.完成(条目, True)
+        assert sorted(剩余) == sorted(set(网址列表 + ["http://h9.com/新页面"]) - {取出列表[0].url})
+    finally:
+        恢复.关闭()
+
+def test_抓取前沿关闭时保存布隆快照(tmp_path):
+    路径 = str(tmp_path / "前沿.db")
+    前沿 = 抓取前沿(路径)
+    前沿.加入([f"http://example.com/{序号}" for 序号 in range(20)])
+    前沿.关闭()
+    前沿.关闭()
+
+    重开 = 抓取前沿(路径)
+    try:
+        assert 重开.快照序号 == 20
+        assert 重开.布隆过滤器.元素数 == 20
+    finally:
+        重开.关闭()
+
+def test_爬虫首次使用时才打开抓取前沿(monkeypatch, tmp_path, 配置):
+    monkeypatch.chdir(tmp_path)
+    配置.配置["网络设置.抓取前沿路径"] = str(tmp_path / "前沿" / "前沿.db")
+    with 智能爬虫系统() as 爬虫:
+        assert 爬虫.抓取前沿 is None
+        assert not any(tmp_path.iterdir())
+        assert 爬虫.添加种子网址(["http://example.com/"]) == 1
+        assert (tmp_path / "前沿" / "前沿.db").exists()
+    assert 爬虫.抓取前沿.数据库 is None
+
+# robots.txt缓存
+
+class 假响应:
+    def __init__(self, 状态码: int, 内容: bytes = b""):
+        self.status_code = 状态码
+        self.content = 内容
+
+@pytest.mark.parametrize("状态码, 允许", [
+    (404, True), (410, True), (0, True),
+    (401, False), (403, False), (500, False), (503, False),
+])
+def test_robots按状态码放行或禁止(状态码, 允许):
+    解析器 = robots缓存.构建解析器("http://example.com", 状态码, "")
+    assert 解析器.can_fetch("测试爬虫", "http://example.com/a") is 允许
+
+def test_robots_2xx按内容解析():
+    解析器 = robots缓存.构建解析器("http://example.com", 200, "User-agent: *\nDisallow: /private\n")
+    assert 解析器.can_fetch("测试爬虫", "http://example.com/a")
+    assert not 解析器.can_fetch("测试爬虫", "http://example.com/private/a")
+
+def test_robots_5xx禁止抓取并按失败有效期缓存(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    请求列表 = []
+    def 假get(url, **参数):
+        请求列表.append(url)
+        return 假响应(503)
+    monkeypatch.setattr(网络学习引擎.requests, "get", 假get)
+
+    缓存 = robots缓存("", {}, 5, 有效期_秒=86400, 失败有效期_秒=60)
+    try:
+        解析器 = 缓存.获取("http://example.com/a", 超时=5)
+        assert not 解析器.can_fetch("测试爬虫", "http://example.com/a")
+        assert 缓存.获取("http://example.com/b", 超时=5) is 解析器
+        assert 请求列表 == ["http://example.com/robots.txt"]
+        _, 过期时间 = 缓存.内存缓存["http://example.com"]
+        assert 过期时间 - time.time() <= 60
+    finally:
+        缓存.关闭()
+    # 未给缓存路径时只用内存
+    assert not any(tmp_path.iterdir())
+
+def test_robots缓存重启后不再下载(monkeypatch, tmp_path):
+    路径 = str(tmp_path / "robots.db")
+    monkeypatch.setattr(网络学习引擎.requests, "get",
+                        lambda url, **参数: 假响应(200, b"User-agent: *\nDisallow: /private\n"))
+    缓存 = robots缓存(路径, {}, 5)
+    缓存.获取("http://example.com/a", 超时=5)
+    缓存.关闭()
+
+    def 禁止下载(url, **参数):
+        raise AssertionError(f"不应下载 {url}")
+    monkeypatch.setattr(网络学习引擎.requests, "get", 禁止下载)
+    重开 = robots缓存(路径, {}, 5)
+    try:
+        解析器 = 重开.获取("http://example.com/a", 超时=5)
+        assert not 解析器.can_fetch("测试爬虫", "http://example.com/private/x")
+        assert 重开.获取缓存状态()["磁盘条目数"] == 1
+    finally:
+        重开.关闭()
+
+# HTTP条件请求缓存
+
+def 构造响应(url: str, 状态码: int, 内容: bytes = b"", 响应头: Dict[str, str] = None) -> requests.Response:
+    响应 = requests.Response()
+    响应.url = url
+    响应.status_code = 状态码
+    响应.headers = CaseInsensitiveDict(响应头 or {})
+    响应._content = 内容
+    响应.encoding = "utf-8"
+    return 响应
+
+def test_HTTP缓存保存正文和校验器(tmp_path):
+    缓存 = HTTP缓存(str(tmp_path / "http.db"))
+    try:
+        缓存.保存("http://example.com/a", "http://example.com/a?p=1", CaseInsensitiveDict({
+            "ETag": '"v1"', "Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT",
+            "Content-Encoding": "gzip", "Content-Type": "text/html"
+        }), "正文".encode(), "utf-8")
+        条目 = 缓存.读取("http://example.com/a")
+        assert 条目.内容 == "正文".encode()
+        assert "Content-Encoding" not in 条目.响应头
+        assert 条目.条件请求头() == {
+            "If-None-Match": '"v1"', "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT"
+        }
+        响应 = 条目.构建响应()
+        assert (响应.status_code, 响应.url, 响应.text) == (200, "http://example.com/a?p=1", "正文")
+    finally:
+        缓存.关闭()
+
+def test_HTTP缓存不保存no_store响应(tmp_path):
+    缓存 = HTTP缓存(str(tmp_path / "http.db"))
+    try:
+        缓存.保存("http://example.com/a", "http://example.com/a",
+                 CaseInsensitiveDict({"Cache-Control": "private, no-store"}), b"x", None)
+        assert 缓存.读取("http://example.com/a") is None
+    finally:
+        缓存.关闭()
+
+def test_智能请求收到304时回放缓存(monkeypatch, tmp_path, 配置):
+    配置.配置["网络设置.HTTP缓存路径"] = str(tmp_path / "http.db")
+    配置.网络配置["遵守规范"] = False
+    url = "http://example.com/a"
+    请求头列表 = []
+    应答列表 = [
+        构造响应(url, 200, "第一版".encode(), {"ETag": '"v1"'}),
+        构造响应(url, 304, 响应头={"ETag": '"v1"'})
+    ]
+    with 智能爬虫系统() as 爬虫:
+        def 假get(网址, headers=None, **参数):
+            请求头列表.append(dict(headers or {}))
+            return 应答列表.pop(0)
+        monkeypatch.setattr(爬虫.会话, "get", 假get)
+
+        assert 爬虫.智能请求(url).text == "第一版"
+        回放 = 爬虫.智能请求(url)
+        assert (回放.status_code, 回放.text) == (200, "第一版")
+        assert 请求头列表 == [{}, {"If-None-Match": '"v1"'}]
+        assert 爬虫.统计信息["缓存命中次数"] == 1
+
+        # 离线模式只回放缓存，不访问网络
+        爬虫.离线模式 = True
+        assert 爬虫.智能请求(url).text == "第一版"
+        assert 爬虫.智能请求("http://example.com/未缓存") is None
+        assert len(请求头列表) == 2
+
+def test_未配置路径时不启用HTTP缓存(monkeypatch, tmp_path, 配置):
+    monkeypatch.chdir(tmp_path)
+    配置.网络配置["遵守规范"] = False
+    with 智能爬虫系统() as 爬虫:
+        monkeypatch.setattr(爬虫.会话, "get", lambda 网址, **参数: 构造响应(网址, 200, b"ok"))
+        assert 爬虫.HTTP缓存 is None
+        assert 爬虫.智能请求("http://example.com/a").text == "ok"
+    assert not any(tmp_path.iterdir())
+
+# 抓取前沿驱动的批量抓取
+
+def test_处理响应失败的网址会重新抓取(monkeypatch, tmp_path, 配置):
+    配置.配置["网络设置.抓取前沿路径"] = str(tmp_path / "前沿.db")
+    调用次数 = Counter()
+    def 处理(网址, 响应):
+        调用次数[网址] += 1
+        if 网址.endswith("/a") and 调用次数[网址] == 1:
+            raise ValueError("解析失败")
+        return [网址 + "/子页"] if 网址.endswith("/a") else []
+
+    with 智能爬虫系统() as 爬虫:
+        monkeypatch.setattr(爬虫, "抓取网址列表",
+                            lambda url列表: [构造响应(url, 200, b"ok") for url in url列表])
+        爬虫.添加种子网址(["http://example.com/a"])
+        统计 = 爬虫.运行抓取前沿(处理)
+
+        assert 调用次数 == {"http://example.com/a": 2, "http://example.com/a/子页": 1}
+        assert 统计 == {"抓取数": 3, "成功数": 2, "新链接数": 1}
+        assert 爬虫.抓取前沿.获取前沿状态()["已完成"] == 2
+
+# 按主机的礼貌调度
+
+def test_礼貌调度器同主机排队且不同主机互不等待():
+    调度器 = 主机礼貌调度器(2.0)
+    assert 调度器.预约("a.com", 100.0) == 100.0
+    assert 调度器.预约("a.com", 100.0) == 102.0
+    assert 调度器.预约("b.com", 100.0) == 100.0
+    assert 调度器.预约("a.com", 110.0) == 110.0
+
+def test_礼貌调度器允许突发并按主机间隔限速():
+    调度器 = 主机礼貌调度器(1.0, 突发数=3)
+    assert [调度器.预约("a.com", 0.0) for _ in range(4)] == [0.0, 0.0, 0.0, 1.0]
+
+    调度器 = 主机礼貌调度器(1.0)
+    调度器.设置主机间隔("b.com", 5.0)
+    调度器.设置主机间隔("c.com", 0.1)
+    assert [调度器.预约("b.com", 0.0) for _ in range(2)] == [0.0, 5.0]
+    assert [调度器.预约("c.com", 0.0) for _ in range(2)] == [0.0, 1.0]
\ No newline at end of file
@@ -0,0 +1,335 @@
+# 基准: 三级审核系统吞吐与风险模式引擎
+import os
+import json
+import time
+import random
+import shutil
+import logging
+import platform
+import subprocess
+import tempfile
+import threading
+from typing import Dict, List, Any, Tuple
+from contextlib import contextmanager
+from pathlib import Path
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+import numpy as np
+import psutil
+from 模块7三级审核系统 import (
+    三级审核系统, Google级安全识别器, 风险模式引擎, 审核模式, 内容类型
+)
+
+def 运行风险模式基准(规模列表: Tuple[int, ...] = (131072, 262144, 524288, 1048576)) -> List[Dict[str, Any]]:
+    """风险模式引擎线性时间基准
+    
+    构造只含前导字符、没有句末标点的最坏情况长文本（旧实现在这种输入上
+    发生回溯爆炸），以及带标点的普通长文本，分别用逐个匹配和合并匹配两种
+    方式记录各规模下的耗时和每MB耗时。每MB耗时在规模翻倍时保持稳定即说明
+    匹配为线性时间。
+    """
+    风险模式库 = Google级安全识别器().风险模式库
+    引擎表 = {
+        "逐个匹配": 风险模式引擎(风险模式库, 合并匹配=False),
+        "合并匹配": 风险模式引擎(风险模式库, 合并匹配=True)
+    }
+    普通句子 = "他说我们必须坚持到底，一定要把困难全部消灭。所有人都希望明天会更好！"
+    
+    基准结果 = []
+    for 字数 in 规模列表:
+        测试文本 = {
+            "最坏情况": ("必须所有唯一想" * (字数 // 7 + 1))[:字数],
+            "普通文本": (普通句子 * (字数 // len(普通句子) + 1))[:字数]
+        }
+        for 文本类型, 文本 in 测试文本.items():
+            for 匹配方式, 引擎 in 引擎表.items():
+                开始 = time.perf_counter()
+                引擎.匹配(文本)
+                耗时 = time.perf_counter() - 开始
+                基准结果.append({
+                    "文本类型": 文本类型,
+                    "匹配方式": 匹配方式,
+                    "字数": 字数,
+                    "耗时_秒": round(耗时, 4),
+                    "每MB耗时_秒": round(耗时 / (字数 / 1048576), 4)
+                })
+    
+    return 基准结果
+
+@contextmanager
+def 采样峰值内存(统计: Dict[str, float], 间隔_秒: float = 0.005):
+    """在后台线程按间隔采样进程RSS，退出代码块时把峰值（MB）写入 统计["峰值内存_MB"]"""
+    当前进程 = psutil.Process()
+    峰值 = [当前进程.memory_info().rss]
+    结束 = threading.Event()
+    
+    def 采样():
+        while not 结束.wait(间隔_秒):
+            峰值[0] = max(峰值[0], 当前进程.memory_info().rss)
+    
+    采样线程 = threading.Thread(target=采样, daemon=True)
+    采样线程.start()
+    try:
+        yield 统计
+    finally:
+        结束.set()
+        采样线程.join()
+        峰值[0] = max(峰值[0], 当前进程.memory_info().rss)
+        统计["峰值内存_MB"] = round(峰值[0] / (1024 * 1024), 2)
+
+def 生成合成语料(文档数: int, 平均字数: int = 200, 关键词密度: float = 0.05,
+                 随机种子: int = 0) -> List[str]:
+    """生成合成中文语料
+    
+    文档由常用词拼成句子，每个词以 关键词密度 的概率替换为安全规则库中的关键词，
+    字数在平均字数的0.5~1.5倍之间均匀分布。同一随机种子生成的语料相同。
+    """
+    随机数 = random.Random(随机种子)
+    普通词表 = [
+        "我们", "今天", "天气", "公园", "学习", "朋友", "故事", "城市", "早上", "晚上",
+        "老师", "学生", "工作", "生活", "时间", "问题", "方法", "事情", "开心", "希望",
+        "一起", "已经", "可以", "觉得", "知道", "看见", "走进", "回到", "听说", "准备",
+        "他", "她", "的", "了", "在", "和", "很", "也", "都", "就"
+    ]
+    关键词表 = sorted({
+        关键词 for 规则 in Google级安全识别器().安全规则库.values() for 关键词 in 规则["关键词"]
+    })
+    
+    语料 = []
+    for _ in range(文档数):
+        目标字数 = 随机数.randint(max(1, 平均字数 // 2), max(1, 平均字数 * 3 // 2))
+        片段 = []
+        字数 = 0
+        句长 = 0
+        while 字数 < 目标字数:
+            词 = 随机数.choice(关键词表) if 随机数.random() < 关键词密度 else 随机数.choice(普通词表)
+            片段.append(词)
+            字数 += len(词)
+            句长 += len(词)
+            if 句长 >= 12 and 随机数.random() < 0.3:
+                片段.append(随机数.choice("。。。，！？"))
+                字数 += 1
+                句长 = 0
+        语料.append("".join(片段) + "。")
+    
+    return 语料
+
+def 生成合成图像(目录: str, 数量: int, 尺寸: Tuple[int, int] = (640, 480), 随机种子: int = 0) -> List[str]:
+    """生成随机色块加噪声的JPEG图像，返回文件路径列表（需要PIL）"""
+    if Image is None:
+        raise RuntimeError("未安装PIL，无法生成合成图像")
+    
+    随机数 = np.random.default_rng(随机种子)
+    宽, 高 = 尺寸
+    路径列表 = []
+    for 序号 in range(数量):
+        # 低分辨率随机色块放大后叠加噪声，图像之间感知哈希互不相近
+        色块 = 随机数.integers(0, 256, size=(6, 8, 3), dtype=np.uint8)
+        图像数组 = np.asarray(Image.fromarray(色块).resize((宽, 高)), dtype=np.int16)
+        图像数组 += 随机数.integers(-20, 21, size=图像数组.shape, dtype=np.int16)
+        路径 = os.path.join(目录, f"基准图像_{序号:05d}.jpg")
+        Image.fromarray(np.clip(图像数组, 0, 255).astype(np.uint8)).save(路径, quality=85)
+        路径列表.append(路径)
+    
+    return 路径列表
+
+def 生成合成视频(目录: str, 数量: int, 时长_秒: int = 10, 尺寸: Tuple[int, int] = (640, 360),
+                 ffmpeg路径: str = None) -> List[str]:
+    """用ffmpeg的testsrc2测试源编码H.264视频，返回文件路径列表"""
+    ffmpeg路径 = ffmpeg路径 or shutil.which("ffmpeg")
+    if not ffmpeg路径:
+        raise RuntimeError("未找到ffmpeg，无法生成合成视频")
+    
+    路径列表 = []
+    for 序号 in range(数量):
+        路径 = os.path.join(目录, f"基准视频_{序号:03d}.mp4")
+        subprocess.run(
+            [ffmpeg路径, "-v", "error", "-y", "-f", "lavfi",
+             "-i", f"testsrc2=size={尺寸[0]}x{尺寸[1]}:rate=25:duration={时长_秒}",
+             "-pix_fmt", "yuv420p", 路径],
+            check=True
+        )
+        路径列表.append(路径)
+    
+    return 路径列表
+
+def 计算延迟分位数(延迟列表: List[float], 分位: float) -> float:
+    """最近秩法计算分位数"""
+    if not 延迟列表:
+        return 0.0
+    有序延迟 = sorted(延迟列表)
+    return 有序延迟[min(len(有序延迟) - 1, max(0, int(np.ceil(分位 * len(有序延迟))) - 1))]
+
+def 运行审核基准测试(文档数: int = 1000, 平均字数: int = 200, 关键词密度: float = 0.05,
+                     图像数: int = 20, 视频数: int = 2, 视频时长_秒: int = 10,
+                     输出路径: str = None, 随机种子: int = 0) -> Dict[str, Any]:
+    """三级审核系统吞吐基准
+    
+    生成合成语料、图像和视频，在开启/关闭/自定义三种模式下逐条审核，记录每秒文档数、
+    每秒MB、延迟分位数和进程峰值内存。每轮开始前清空审核缓存，测得的是实际扫描开销。
+    审核历史只留在内存，安全事件写入临时目录，不影响正式数据。给出输出路径时结果另存为JSON，
+    可用 比较基准结果 对比两个版本。
+    """
+    日志器 = logging.getLogger('审核基准测试')
+    
+    with tempfile.TemporaryDirectory(prefix="审核基准_") as 临时目录:
+        # 存储从构造起就指向临时目录，不打开正式的事件库、历史段文件和共享状态
+        审核系统 = 三级审核系统(配置覆盖={
+            "安全设置.启用风险监控": False,
+            "安全设置.审核历史溢写路径": None,
+            "安全设置.安全事件数据库路径": os.path.join(临时目录, "安全事件.db"),
+            "安全设置.共享状态路径": None
+        })
+        
+        样本集 = {内容类型.文本: 生成合成语料(文档数, 平均字数, 关键词密度, 随机种子)}
+        跳过原因 = {}
+        for 类型, 生成 in (
+            (内容类型.图像, lambda: 生成合成图像(临时目录, 图像数, 随机种子=随机种子)),
+            (内容类型.视频, lambda: 生成合成视频(
+                临时目录, 视频数, 视频时长_秒,
+                ffmpeg路径=审核系统.配置管理器.获取配置("安全设置.ffmpeg路径", None)
+            ))
+        ):
+            try:
+                样本集[类型] = 生成()
+            except Exception as e:
+                跳过原因[类型.value] = str(e)
+                日志器.warning(f"跳过{类型.value}基准: {e}")
+        
+        # 自定义模式使用规则库中的一部分关键词，保证语料中有命中
+        规则关键词 = sorted({
+            关键词 for 规则 in 审核系统.安全识别器.安全规则库.values() for 关键词 in 规则["关键词"]
+        })
+        自定义关键词 = 规则关键词[::5]
+        原关键词 = 审核系统.自定义关键词库
+        原模式 = 审核系统.当前模式
+        
+        结果列表 = []
+        try:
+            for 模式 in 审核模式:
+                # 直接切换，不经 设置审核模式 写回配置
+                审核系统.当前模式 = 模式
+                审核系统.修改自定义关键词(
+                    lambda _: 自定义关键词 if 模式 == 审核模式.自定义 else 原关键词, 持久化=False
+                )
+                
+                for 类型, 样本列表 in 样本集.items():
+                    if not 样本列表:
+                        continue
+                    审核系统.审核缓存.清空()
+                    审核系统.视觉分析器.清空缓存()
+                    if 类型 == 内容类型.文本:
+                        总字节数 = sum(len(样本.encode("utf-8")) for 样本 in 样本列表)
+                    else:
+                        总字节数 = sum(os.path.getsize(样本) for 样本 in 样本列表)
+                    
+                    延迟列表 = []
+                    未通过数 = 0
+                    内存统计: Dict[str, float] = {}
+                    with 采样峰值内存(内存统计):
+                        总开始 = time.perf_counter()
+                        for 样本 in 样本列表:
+                            开始 = time.perf_counter()
+                            结果 = 审核系统.审核内容(样本, 类型)
+                            延迟列表.append((time.perf_counter() - 开始) * 1000)
+                            未通过数 += not 结果.通过
+                        总耗时 = time.perf_counter() - 总开始
+                    
+                    结果列表.append({
+                        "模式": 模式.value,
+                        "内容类型": 类型.value,
+                        "样本数": len(样本列表),
+                        "总字节数": 总字节数,
+                        "耗时_秒": round(总耗时, 4),
+                        "每秒文档数": round(len(样本列表) / 总耗时, 2) if 总耗时 else 0.0,
+                        "每秒MB": round(总字节数 / (1024 * 1024) / 总耗时, 4) if 总耗时 else 0.0,
+                        "延迟_毫秒": {
+                            "p50": round(计算延迟分位数(延迟列表, 0.5), 3),
+                            "p99": round(计算延迟分位数(延迟列表, 0.99), 3),
+                            "最大": round(max(延迟列表), 3)
+                        },
+                        "峰值内存_MB": 内存统计["峰值内存_MB"],
+                        "未通过数": 未通过数
+                    })
+                    日志器.info(f"{模式.value}/{类型.value}: {结果列表[-1]['每秒文档数']} 条/秒")
+        finally:
+            审核系统.当前模式 = 原模式
+            审核系统.修改自定义关键词(lambda _: 原关键词, 持久化=False)
+            审核系统.安全事件记录.关闭()
+            审核系统.关闭批量进程池()
+    
+    基准报告 = {
+        "运行时间": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "运行环境": {
+            "Python版本": platform.python_version(),
+            "NumPy版本": np.__version__,
+            "平台": platform.platform(),
+            "CPU核数": os.cpu_count()
+        },
+        "参数": {
+            "文档数": 文档数,
+            "平均字数": 平均字数,
+            "关键词密度": 关键词密度,
+            "图像数": 图像数,
+            "视频数": 视频数,
+            "视频时长_秒": 视频时长_秒,
+            "随机种子": 随机种子
+        },
+        "跳过": 跳过原因,
+        "结果": 结果列表
+    }
+    
+    if 输出路径:
+        Path(输出路径).parent.mkdir(parents=True, exist_ok=True)
+        with open(输出路径, 'w', encoding='utf-8') as f:
+            json.dump(基准报告, f, ensure_ascii=False, indent=2)
+    
+    return 基准报告
+
+def 比较基准结果(基线路径: str, 当前路径: str, 容差: float = 0.1) -> List[Dict[str, Any]]:
+    """对比两次基准的JSON结果，列出吞吐下降或p99延迟上升超过容差比例的组合"""
+    with open(基线路径, 'r', encoding='utf-8') as f:
+        基线结果 = {(记录["模式"], 记录["内容类型"]): 记录 for 记录 in json.load(f)["结果"]}
+    with open(当前路径, 'r', encoding='utf-8') as f:
+        当前结果 = json.load(f)["结果"]
+    
+    退化列表 = []
+    for 记录 in 当前结果:
+        基线 = 基线结果.get((记录["模式"], 记录["内容类型"]))
+        if 基线 is None:
+            continue
+        for 指标, 取值, 更大更好 in (
+            ("每秒文档数", lambda 项: 项["每秒文档数"], True),
+            ("p99延迟_毫秒", lambda 项: 项["延迟_毫秒"]["p99"], False)
+        ):
+            基线值, 当前值 = 取值(基线), 取值(记录)
+            if not 基线值:
+                continue
+            变化率 = (当前值 - 基线值) / 基线值
+            if (更大更好 and 变化率 < -容差) or (not 更大更好 and 变化率 > 容差):
+                退化列表.append({
+                    "模式": 记录["模式"],
+                    "内容类型": 记录["内容类型"],
+                    "指标": 指标,
+                    "基线值": 基线值,
+                    "当前值": 当前值,
+                    "变化率": round(变化率, 4)
+                })
+    
+    return 退化列表
+
+if __name__ == "__main__":
+    # 风险模式引擎线性时间基准
+    print("风险模式引擎基准:")
+    for 记录 in 运行风险模式基准():
+        print(f"{记录['文本类型']}/{记录['匹配方式']} {记录['字数']}字: "
+              f"{记录['耗时_秒']}秒 (每MB {记录['每MB耗时_秒']}秒)")
+    
+    # 审核吞吐基准（小规模）
+    print("\n审核吞吐基准:")
+    基准报告 = 运行审核基准测试(文档数=200, 图像数=5, 视频数=1, 视频时长_秒=3)
+    for 记录 in 基准报告["结果"]:
+        print(f"{记录['模式']}/{记录['内容类型']}: {记录['每秒文档数']}条/秒, {记录['每秒MB']}MB/秒, "
+              f"p99 {记录['延迟_毫秒']['p99']}毫秒, 峰值内存 {记录['峰值内存_MB']}MB")
\ No newline at end of file
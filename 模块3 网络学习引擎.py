@@ -5,26 +5,987 @@ import random
 import json
 import re
 import os
-from urllib.parse import urljoin, urlparse
+import asyncio
+import heapq
+import itertools
+import sqlite3
+import zlib
+import math
+import hashlib
+import atexit
+from urllib.parse import urljoin, urlparse, urlsplit, urlunsplit, parse_qsl, urlencode, quote
 from bs4 import BeautifulSoup
 import threading
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, as_completed, Future
 import logging
-from typing import Dict, List, Any, Optional, Set
+from typing import Dict, List, Any, Optional, Set, Callable, Awaitable, Tuple
+from collections import deque
+from dataclasses import dataclass
 from pathlib import Path
 import urllib.robotparser
 from 模块2_配置管理 import 获取配置管理器
 
+try:
+    import aiohttp
+except ImportError:  # 未安装时批量爬取退回线程池
+    aiohttp = None
+
+默认端口 = {"http": 80, "https": 443}
+跟踪参数 = {"fbclid", "gclid", "spm"}
+非保留字符 = set("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-._~")
+
+def 移除点段(路径: str) -> str:
+    """按RFC 3986移除路径中的 . 和 .. 段"""
+    段列表 = 路径.split('/')
+    输出 = []
+    for 段 in 段列表:
+        if 段 == '.':
+            continue
+        if 段 == '..':
+            if len(输出) > 1:
+                输出.pop()
+            continue
+        输出.append(段)
+    if 段列表[-1] in ('.', '..'):
+        输出.append('')
+    结果 = '/'.join(输出)
+    return 结果 if 结果.startswith('/') else '/' + 结果
+
+def 规范化百分号编码(文本: str) -> str:
+    """非保留字符解码，其余转义统一为大写，非ASCII字符编码"""
+    def 替换(匹配):
+        字符 = chr(int(匹配.group(1), 16))
+        return 字符 if 字符 in 非保留字符 else 匹配.group(0).upper()
+    文本 = re.sub(r'%([0-9a-fA-F]{2})', 替换, 文本)
+    return quote(文本, safe="/%:@!$&'()*+,;=-._~")
+
+def 规范化URL(url: str) -> str:
+    """规范化网址，只用于计算去重哈希，实际请求仍使用原网址
+    
+    协议和主机转小写，去掉默认端口和片段，解析 . 和 ..，统一百分号编码，
+    查询参数按参数名稳定排序（同名参数保持原顺序）并去掉跟踪参数（utm_* 等）。
+    """
+    解析结果 = urlsplit(url.strip())
+    协议 = 解析结果.scheme.lower()
+    主机 = (解析结果.hostname or "").rstrip('.')
+    try:
+        主机 = 主机.encode('idna').decode('ascii')
+    except UnicodeError:
+        pass
+    if ':' in 主机:
+        主机 = f"[{主机}]"
+    try:
+        端口 = 解析结果.port
+    except ValueError:
+        端口 = None
+    if 端口 and 端口 != 默认端口.get(协议):
+        主机 = f"{主机}:{端口}"
+    
+    路径 = 规范化百分号编码(移除点段(解析结果.path))
+    查询参数 = sorted(
+        ((键, 值) for 键, 值 in parse_qsl(解析结果.query, keep_blank_values=True)
+         if not 键.lower().startswith("utm_") and 键.lower() not in 跟踪参数),
+        key=lambda 项: 项[0]
+    )
+    return urlunsplit((协议, 主机, 路径, urlencode(查询参数), ""))
+
+def 网址哈希(规范网址: str) -> int:
+    """规范化网址的64位哈希（有符号，可直接作为SQLite整数）"""
+    return int.from_bytes(hashlib.blake2b(规范网址.encode('utf-8'), digest_size=8).digest(), 'big', signed=True)
+
+@dataclass
+class 抓取响应:
+    """异步抓取得到的响应，常用属性与requests.Response同名，提取函数可直接使用"""
+    url: str
+    status_code: int
+    headers: Dict[str, str]
+    content: bytes
+    encoding: str = 'utf-8'
+    
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding or 'utf-8', errors='replace')
+
+class 主机礼貌调度器:
+    """按主机限速的令牌桶
+    
+    每个主机记录理论到达时间（GCRA形式的令牌桶）：最小间隔为爬取延迟或robots.txt
+    的Crawl-delay（取较大者），允许连续突发 突发数 个请求。预约只推进该主机自己的
+    时间线，不同主机之间互不等待。线程安全，同步请求和异步引擎共用。
+    """
+    def __init__(self, 默认间隔_秒: float, 突发数: int = 1, 抖动_秒: float = 0.0):
+        self.默认间隔_秒 = 默认间隔_秒
+        self.突发数 = max(1, 突发数)
+        self.抖动_秒 = 抖动_秒
+        self.调度锁 = threading.Lock()
+        
+        # 主机 -> 理论到达时间；主机 -> 专属间隔（Crawl-delay）
+        self.理论到达时间: Dict[str, float] = {}
+        self.主机间隔: Dict[str, float] = {}
+    
+    def 设置主机间隔(self, 主机: str, 间隔_秒: float):
+        """设置主机的最小请求间隔，不低于默认间隔"""
+        with self.调度锁:
+            self.主机间隔[主机] = max(self.默认间隔_秒, 间隔_秒)
+    
+    def 获取主机间隔(self, 主机: str) -> float:
+        return self.主机间隔.get(主机, self.默认间隔_秒)
+    
+    def 就绪时间(self, 主机: str) -> float:
+        """该主机下一个请求最早可以发出的时间（time.monotonic）"""
+        with self.调度锁:
+            return self.计算就绪时间(主机)
+    
+    def 计算就绪时间(self, 主机: str) -> float:
+        # 调用方持有调度锁
+        return self.理论到达时间.get(主机, 0.0) - (self.突发数 - 1) * self.获取主机间隔(主机)
+    
+    def 预约(self, 主机: str, 当前时间: float = None) -> float:
+        """为该主机预约一次请求，返回可以发出的时间（time.monotonic）"""
+        当前时间 = time.monotonic() if 当前时间 is None else 当前时间
+        with self.调度锁:
+            发出时间 = max(当前时间, self.计算就绪时间(主机))
+            间隔 = self.获取主机间隔(主机) + (random.uniform(0, self.抖动_秒) if self.抖动_秒 else 0.0)
+            self.理论到达时间[主机] = max(当前时间, self.理论到达时间.get(主机, 0.0)) + 间隔
+            return 发出时间
+    
+    def 预约等待时长(self, 主机: str) -> float:
+        """预约一次请求，返回需要等待的秒数"""
+        当前时间 = time.monotonic()
+        return max(0.0, self.预约(主机, 当前时间) - 当前时间)
+
+class 主机就绪队列:
+    """一批待抓取项目的分主机队列，用就绪时间小顶堆选出最先可以请求的主机
+    
+    堆里每个有待发项目的主机占一项；弹出时若该主机的就绪时间已被其他请求推迟，
+    按新时间放回堆中重新比较。
+    """
+    def __init__(self, 调度器: 主机礼貌调度器):
+        self.调度器 = 调度器
+        self.待发项目: Dict[str, deque] = {}
+        self.就绪堆: List[Tuple[float, int, str]] = []
+        self.序号 = itertools.count()
+    
+    def __len__(self) -> int:
+        return sum(len(队列) for 队列 in self.待发项目.values())
+    
+    def 加入(self, 主机: str, 项目: Any):
+        队列 = self.待发项目.get(主机)
+        if 队列 is None:
+            队列 = self.待发项目[主机] = deque()
+            heapq.heappush(self.就绪堆, (self.调度器.就绪时间(主机), next(self.序号), 主机))
+        队列.append(项目)
+    
+    def 弹出就绪(self, 当前时间: float = None) -> Tuple[Optional[Tuple[str, Any]], Optional[float]]:
+        """弹出最先就绪主机的一个项目并为其预约
+        
+        返回 ((主机, 项目), None)；都未就绪时返回 (None, 需等待秒数)；队列为空返回 (None, None)。
+        """
+        当前时间 = time.monotonic() if 当前时间 is None else 当前时间
+        while self.就绪堆:
+            就绪时间, _, 主机 = self.就绪堆[0]
+            实际就绪时间 = self.调度器.就绪时间(主机)
+            if 实际就绪时间 > 就绪时间:
+                heapq.heapreplace(self.就绪堆, (实际就绪时间, next(self.序号), 主机))
+                continue
+            if 就绪时间 > 当前时间:
+                return None, 就绪时间 - 当前时间
+            
+            heapq.heappop(self.就绪堆)
+            队列 = self.待发项目[主机]
+            项目 = 队列.popleft()
+            self.调度器.预约(主机, 当前时间)
+            if 队列:
+                heapq.heappush(self.就绪堆, (self.调度器.就绪时间(主机), next(self.序号), 主机))
+            else:
+                del self.待发项目[主机]
+            return (主机, 项目), None
+        
+        return None, None
+
+class robots缓存:
+    """可持久化的robots.txt缓存
+    
+    解析结果按基础域名保存在内存和SQLite中，有效期内直接复用；给出缓存路径时写入
+    磁盘，重启后仍然有效，路径为空时只用内存数据库，不创建文件；
+    5xx和不可达的主机同样缓存（有效期较短），避免反复连接出错的主机。下载只在
+    后台线程池中进行：查询 从不阻塞，过期条目在后台刷新期间继续使用。
+    """
+    def __init__(self, 缓存路径: str, 请求头: Dict[str, str], 超时时间: float,
+                 有效期_秒: float = 86400, 失败有效期_秒: float = 3600, 预取线程数: int = 8,
+                 代理: Any = None, 加载回调: Callable[[str, urllib.robotparser.RobotFileParser], None] = None):
+        self.请求头 = dict(请求头)
+        self.超时时间 = 超时时间
+        self.有效期_秒 = 有效期_秒
+        self.失败有效期_秒 = 失败有效期_秒
+        self.代理 = 代理
+        self.加载回调 = 加载回调
+        self.日志器 = logging.getLogger('robots缓存')
+        
+        # 基础域名 -> (解析器, 过期时间)；基础域名 -> 进行中的下载
+        self.内存缓存: Dict[str, Tuple[urllib.robotparser.RobotFileParser, float]] = {}
+        self.下载中: Dict[str, Future] = {}
+        self.缓存锁 = threading.Lock()
+        self.执行器 = ThreadPoolExecutor(max_workers=预取线程数, thread_name_prefix='robots预取')
+        
+        if 缓存路径:
+            Path(缓存路径).parent.mkdir(parents=True, exist_ok=True)
+        self.数据库锁 = threading.Lock()
+        self.数据库 = sqlite3.connect(缓存路径 or ":memory:", timeout=30, check_same_thread=False)
+        self.数据库.execute("PRAGMA journal_mode=WAL")
+        self.数据库.execute("""
+            CREATE TABLE IF NOT EXISTS robots (
+                基础域名 TEXT PRIMARY KEY,
+                状态码 INTEGER NOT NULL,
+                内容 TEXT NOT NULL,
+                获取时间 REAL NOT NULL,
+                过期时间 REAL NOT NULL
+            )
+        """)
+        self.数据库.commit()
+    
+    @staticmethod
+    def 获取基础域名(url: str) -> str:
+        解析结果 = urlparse(url)
+        return f"{解析结果.scheme}://{解析结果.netloc.lower()}"
+    
+    @staticmethod
+    def 构建解析器(基础域名: str, 状态码: int, 内容: str) -> urllib.robotparser.RobotFileParser:
+        """由下载结果构建解析器；状态码0表示主机不可达
+        
+        2xx解析内容；401/403全部禁止；其他4xx视为没有robots.txt，全部允许；
+        5xx按RFC 9309视为全部禁止（原先 read() 遇到5xx时 can_fetch 同样返回False）；
+        不可达与原先检查抛异常时一样放行。
+        """
+        解析器 = urllib.robotparser.RobotFileParser(urljoin(基础域名, "/robots.txt"))
+        if 200 <= 状态码 < 300:
+            解析器.parse(内容.splitlines())
+        elif 状态码 in (401, 403) or 状态码 >= 500:
+            解析器.disallow_all = True
+        else:
+            解析器.allow_all = True
+        解析器.modified()
+        return 解析器
+    
+    def 查询(self, url: str) -> Optional[urllib.robotparser.RobotFileParser]:
+        """返回已缓存的解析器，不存在时返回None；缺失或过期时在后台下载"""
+        基础域名 = self.获取基础域名(url)
+        with self.缓存锁:
+            条目 = self.内存缓存.get(基础域名)
+        
+        if 条目 is None:
+            条目 = self.读取磁盘缓存(基础域名)
+            if 条目 is not None:
+                with self.缓存锁:
+                    self.内存缓存.setdefault(基础域名, 条目)
+                self.通知加载(基础域名, 条目[0])
+        
+        if 条目 is None or 条目[1] <= time.time():
+            self.预取(url)
+        return 条目[0] if 条目 else None
+    
+    def 获取(self, url: str, 超时: float = None) -> urllib.robotparser.RobotFileParser:
+        """同步获取解析器；只有从未见过的域名才等待下载完成"""
+        解析器 = self.查询(url)
+        if 解析器 is None:
+            解析器 = self.预取(url).result(timeout=超时)
+        return 解析器
+    
+    async def 异步获取(self, url: str) -> urllib.robotparser.RobotFileParser:
+        """异步获取解析器；等待下载时只挂起当前协程"""
+        解析器 = self.查询(url)
+        if 解析器 is None:
+            解析器 = await asyncio.wrap_future(self.预取(url))
+        return 解析器
+    
+    def 预取(self, url: str) -> Future:
+        """在后台下载robots.txt，同一域名同时只有一个下载"""
+        基础域名 = self.获取基础域名(url)
+        with self.缓存锁:
+            未来 = self.下载中.get(基础域名)
+            if 未来 is None:
+                未来 = self.执行器.submit(self.下载, 基础域名)
+                self.下载中[基础域名] = 未来
+        return 未来
+    
+    def 批量预取(self, url列表: List[str]):
+        """为待抓取网址所在的域名预取robots.txt，已缓存且未过期的跳过"""
+        for 基础域名 in {self.获取基础域名(url) for url in url列表}:
+            self.查询(基础域名)
+    
+    def 下载(self, 基础域名: str) -> urllib.robotparser.RobotFileParser:
+        """下载并解析robots.txt，结果写入内存和磁盘"""
+        try:
+            try:
+                响应 = requests.get(urljoin(基础域名, "/robots.txt"), headers=self.请求头,
+                                  timeout=self.超时时间, proxies=self.代理)
+                状态码 = 响应.status_code
+                内容 = 响应.content.decode('utf-8', errors='replace') if 200 <= 状态码 < 300 else ""
+                有效期 = self.有效期_秒 if 状态码 < 500 else self.失败有效期_秒
+            except requests.RequestException as e:
+                self.日志器.warning(f"robots.txt下载失败 {基础域名}: {e}")
+                状态码, 内容, 有效期 = 0, "", self.失败有效期_秒
+            
+            获取时间 = time.time()
+            解析器 = self.构建解析器(基础域名, 状态码, 内容)
+            self.写入磁盘缓存(基础域名, 状态码, 内容, 获取时间, 获取时间 + 有效期)
+            with self.缓存锁:
+                self.内存缓存[基础域名] = (解析器, 获取时间 + 有效期)
+            self.通知加载(基础域名, 解析器)
+            return 解析器
+        finally:
+            with self.缓存锁:
+                self.下载中.pop(基础域名, None)
+    
+    def 读取磁盘缓存(self, 基础域名: str) -> Optional[Tuple[urllib.robotparser.RobotFileParser, float]]:
+        with self.数据库锁:
+            行 = self.数据库.execute(
+                "SELECT 状态码, 内容, 过期时间 FROM robots WHERE 基础域名 = ?", (基础域名,)
+            ).fetchone()
+        if 行 is None:
+            return None
+        状态码, 内容, 过期时间 = 行
+        return self.构建解析器(基础域名, 状态码, 内容), 过期时间
+    
+    def 写入磁盘缓存(self, 基础域名: str, 状态码: int, 内容: str, 获取时间: float, 过期时间: float):
+        try:
+            with self.数据库锁:
+                self.数据库.execute(
+                    "INSERT OR REPLACE INTO robots VALUES (?, ?, ?, ?, ?)",
+                    (基础域名, 状态码, 内容, 获取时间, 过期时间)
+                )
+                self.数据库.commit()
+        except sqlite3.Error as e:
+            self.日志器.warning(f"robots缓存写入失败 {基础域名}: {e}")
+    
+    def 通知加载(self, 基础域名: str, 解析器: urllib.robotparser.RobotFileParser):
+        if self.加载回调 is not None:
+            try:
+                self.加载回调(基础域名, 解析器)
+            except Exception as e:
+                self.日志器.warning(f"robots加载回调失败 {基础域名}: {e}")
+    
+    def 获取缓存状态(self) -> Dict[str, Any]:
+        with self.缓存锁:
+            内存条目数, 下载中数 = len(self.内存缓存), len(self.下载中)
+        with self.数据库锁:
+            磁盘条目数, 不可达数 = self.数据库.execute(
+                "SELECT COUNT(*), COALESCE(SUM(状态码 = 0 OR 状态码 >= 500), 0) FROM robots"
+            ).fetchone()
+        return {"内存条目数": 内存条目数, "磁盘条目数": 磁盘条目数, "不可达主机数": 不可达数, "下载中": 下载中数}
+    
+    def 关闭(self):
+        self.执行器.shutdown(wait=False)
+        with self.数据库锁:
+            self.数据库.close()
+
+@dataclass
+class 缓存条目:
+    """HTTP缓存中的一条响应，响应头不区分大小写"""
+    url: str
+    最终url: str
+    响应头: requests.structures.CaseInsensitiveDict
+    内容: bytes
+    编码: Optional[str]
+    
+    def 条件请求头(self) -> Dict[str, str]:
+        """按保存的校验器生成条件请求头"""
+        请求头 = {}
+        标签 = self.响应头.get("ETag")
+        最后修改 = self.响应头.get("Last-Modified")
+        if 标签:
+            请求头["If-None-Match"] = 标签
+        if 最后修改:
+            请求头["If-Modified-Since"] = 最后修改
+        return 请求头
+    
+    def 构建响应(self) -> requests.Response:
+        """还原为requests.Response，供 智能请求 的调用方直接使用"""
+        响应 = requests.Response()
+        响应.status_code = 200
+        响应.url = self.最终url
+        响应.headers = requests.structures.CaseInsensitiveDict(self.响应头)
+        响应._content = self.内容
+        响应.encoding = self.编码
+        return 响应
+    
+    def 转为抓取响应(self) -> 抓取响应:
+        return 抓取响应(
+            url=self.最终url,
+            status_code=200,
+            headers=dict(self.响应头),
+            content=self.内容,
+            encoding=self.编码 or 'utf-8'
+        )
+
+class HTTP缓存:
+    """按URL保存响应的磁盘缓存，正文zlib压缩后存入SQLite
+    
+    同时保存ETag和Last-Modified，重新抓取时据此发送条件请求，服务器返回304时
+    直接使用缓存正文；离线模式下只从缓存回放，不访问网络。
+    """
+    # 正文已解压保存，这些头不再适用
+    不保存的响应头 = {"content-encoding", "content-length", "transfer-encoding", "set-cookie"}
+    
+    def __init__(self, 缓存路径: str, 压缩级别: int = 6):
+        self.压缩级别 = 压缩级别
+        self.日志器 = logging.getLogger('HTTP缓存')
+        
+        Path(缓存路径).parent.mkdir(parents=True, exist_ok=True)
+        self.数据库锁 = threading.Lock()
+        self.数据库 = sqlite3.connect(缓存路径, timeout=30, check_same_thread=False)
+        self.数据库.execute("PRAGMA journal_mode=WAL")
+        self.数据库.execute("""
+            CREATE TABLE IF NOT EXISTS 响应缓存 (
+                url TEXT PRIMARY KEY,
+                最终url TEXT NOT NULL,
+                响应头 TEXT NOT NULL,
+                内容 BLOB NOT NULL,
+                编码 TEXT,
+                原始字节数 INTEGER NOT NULL,
+                保存时间 REAL NOT NULL,
+                验证时间 REAL NOT NULL
+            )
+        """)
+        self.数据库.commit()
+    
+    @staticmethod
+    def 可缓存(响应头) -> bool:
+        return "no-store" not in (响应头.get("Cache-Control") or "").lower()
+    
+    def 读取(self, url: str) -> Optional[缓存条目]:
+        with self.数据库锁:
+            行 = self.数据库.execute(
+                "SELECT 最终url, 响应头, 内容, 编码 FROM 响应缓存 WHERE url = ?", (url,)
+            ).fetchone()
+        if 行 is None:
+            return None
+        
+        最终url, 响应头, 内容, 编码 = 行
+        try:
+            return 缓存条目(url, 最终url, requests.structures.CaseInsensitiveDict(json.loads(响应头)),
+                          zlib.decompress(内容), 编码)
+        except (ValueError, zlib.error) as e:
+            self.日志器.warning(f"缓存条目损坏，已忽略 {url}: {e}")
+            return None
+    
+    def 保存(self, url: str, 最终url: str, 响应头, 内容: bytes, 编码: Optional[str]):
+        """保存一次200响应；带 Cache-Control: no-store 的响应不保存"""
+        if not self.可缓存(响应头):
+            return
+        保存头 = {键: 值 for 键, 值 in 响应头.items() if 键.lower() not in self.不保存的响应头}
+        压缩内容 = zlib.compress(内容, self.压缩级别)
+        现在 = time.time()
+        try:
+            with self.数据库锁:
+                self.数据库.execute(
+                    "INSERT OR REPLACE INTO 响应缓存 VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (url, 最终url, json.dumps(保存头, ensure_ascii=False), 压缩内容, 编码, len(内容), 现在, 现在)
+                )
+                self.数据库.commit()
+        except sqlite3.Error as e:
+            self.日志器.warning(f"缓存写入失败 {url}: {e}")
+    
+    def 刷新(self, 条目: 缓存条目, 响应头):
+        """服务器返回304后更新验证时间，并合并新的校验器等响应头"""
+        for 键, 值 in 响应头.items():
+            if 键.lower() in ("etag", "last-modified", "cache-control", "expires", "date"):
+                条目.响应头[键] = 值
+        try:
+            with self.数据库锁:
+                self.数据库.execute(
+                    "UPDATE 响应缓存 SET 响应头 = ?, 验证时间 = ? WHERE url = ?",
+                    (json.dumps(dict(条目.响应头), ensure_ascii=False), time.time(), 条目.url)
+                )
+                self.数据库.commit()
+        except sqlite3.Error as e:
+            self.日志器.warning(f"缓存刷新失败 {条目.url}: {e}")
+    
+    def 获取缓存状态(self) -> Dict[str, Any]:
+        with self.数据库锁:
+            条目数, 压缩字节数, 原始字节数 = self.数据库.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(内容)), 0), COALESCE(SUM(原始字节数), 0) FROM 响应缓存"
+            ).fetchone()
+        return {
+            "条目数": 条目数,
+            "压缩后字节数": 压缩字节数,
+            "原始字节数": 原始字节数,
+            "压缩率": 压缩字节数 / max(原始字节数, 1)
+        }
+    
+    def 关闭(self):
+        with self.数据库锁:
+            self.数据库.close()
+
+class 可扩展布隆过滤器:
+    """可扩展布隆过滤器
+    
+    当前层装满后追加一层，容量翻倍、误判率减半，总误判率不超过设定值的两倍；
+    内存随元素数近似线性增长（1%误判率约每个元素1.2字节）。位置由64位哈希的
+    高低两半做双重哈希得到，只需要保存网址哈希就能重建。
+    """
+    def __init__(self, 初始容量: int = 100000, 误判率: float = 0.01):
+        self.初始容量 = 初始容量
+        self.误判率 = 误判率
+        # 每层: {"位数组", "位数", "哈希数", "容量", "元素数"}
+        self.层列表: List[Dict[str, Any]] = []
+        self.添加层()
+    
+    def 添加层(self):
+        序号 = len(self.层列表)
+        容量 = self.初始容量 * (2 ** 序号)
+        误判率 = self.误判率 * (0.5 ** (序号 + 1))
+        位数 = max(8, math.ceil(-容量 * math.log(误判率) / (math.log(2) ** 2)))
+        self.层列表.append({
+            "位数组": bytearray((位数 + 7) // 8),
+            "位数": 位数,
+            "哈希数": max(1, round(位数 / 容量 * math.log(2))),
+            "容量": 容量,
+            "元素数": 0
+        })
+    
+    @staticmethod
+    def 位位置(哈希值: int, 位数: int, 哈希数: int):
+        无符号 = 哈希值 & 0xFFFFFFFFFFFFFFFF
+        哈希1, 哈希2 = 无符号 & 0xFFFFFFFF, (无符号 >> 32) | 1
+        return ((哈希1 + 序号 * 哈希2) % 位数 for 序号 in range(哈希数))
+    
+    def 包含(self, 哈希值: int) -> bool:
+        for 层 in self.层列表:
+            位数组 = 层["位数组"]
+            if all(位数组[位置 >> 3] & (1 << (位置 & 7)) for 位置 in self.位位置(哈希值, 层["位数"], 层["哈希数"])):
+                return True
+        return False
+    
+    def 添加(self, 哈希值: int):
+        层 = self.层列表[-1]
+        if 层["元素数"] >= 层["容量"]:
+            self.添加层()
+            层 = self.层列表[-1]
+        位数组 = 层["位数组"]
+        for 位置 in self.位位置(哈希值, 层["位数"], 层["哈希数"]):
+            位数组[位置 >> 3] |= 1 << (位置 & 7)
+        层["元素数"] += 1
+    
+    @property
+    def 元素数(self) -> int:
+        return sum(层["元素数"] for 层 in self.层列表)
+    
+    @property
+    def 内存字节数(self) -> int:
+        return sum(len(层["位数组"]) for 层 in self.层列表)
+
+@dataclass
+class 前沿条目:
+    """从抓取前沿取出的一个待抓取网址（首次加入时的原网址）"""
+    序号: int
+    url: str
+    深度: int
+    优先级: float
+
+class 抓取前沿:
+    """磁盘持久化的URL抓取前沿
+    
+    网址规范化后以64位哈希去重，表中保存和抓取的仍是原网址。SQLite中的前沿表既是
+    按优先级出队的待抓取队列，也是精确的已见网址集合；内存里只有一个可扩展布隆
+    过滤器，新网址不必查询磁盘。
+    过滤器定期快照到同一个数据库，重启时载入快照再补上之后新增的网址；关闭（含进程
+    退出）时保存最新快照。取出的网址标记为抓取中，进程崩溃后重新打开时退回待抓取，
+    已完成的不会重复抓取。
+    """
+    待抓取, 抓取中, 已完成, 已失败 = 0, 1, 2, 3
+    
+    def __init__(self, 数据库路径: str, 每主机批量上限: int = 10, 最大尝试次数: int = 3,
+                 布隆初始容量: int = 100000, 布隆误判率: float = 0.01, 快照间隔: int = 100000):
+        self.每主机批量上限 = 每主机批量上限
+        self.最大尝试次数 = 最大尝试次数
+        self.快照间隔 = 快照间隔
+        self.日志器 = logging.getLogger('抓取前沿')
+        self.前沿锁 = threading.Lock()
+        
+        Path(数据库路径).parent.mkdir(parents=True, exist_ok=True)
+        self.数据库 = sqlite3.connect(数据库路径, timeout=30, check_same_thread=False)
+        self.数据库.execute("PRAGMA journal_mode=WAL")
+        self.数据库.execute("PRAGMA synchronous=NORMAL")
+        self.数据库.executescript("""
+            CREATE TABLE IF NOT EXISTS 前沿 (
+                序号 INTEGER PRIMARY KEY AUTOINCREMENT,
+                哈希 INTEGER NOT NULL UNIQUE,
+                url TEXT NOT NULL,
+                主机 TEXT NOT NULL,
+                深度 INTEGER NOT NULL,
+                优先级 REAL NOT NULL,
+                状态 INTEGER NOT NULL,
+                尝试次数 INTEGER NOT NULL DEFAULT 0,
+                更新时间 REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS 前沿出队 ON 前沿 (状态, 优先级 DESC, 序号);
+            CREATE TABLE IF NOT EXISTS 布隆快照 (
+                层号 INTEGER PRIMARY KEY,
+                位数 INTEGER NOT NULL,
+                哈希数 INTEGER NOT NULL,
+                容量 INTEGER NOT NULL,
+                元素数 INTEGER NOT NULL,
+                位数组 BLOB NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS 前沿元数据 (键 TEXT PRIMARY KEY, 值 INTEGER NOT NULL);
+        """)
+        
+        self.布隆过滤器 = 可扩展布隆过滤器(布隆初始容量, 布隆误判率)
+        self.快照序号 = 0
+        self.距上次快照 = 0
+        with self.前沿锁, self.数据库:
+            # 上次运行中断时抓取中的网址退回待抓取
+            恢复数 = self.数据库.execute(
+                "UPDATE 前沿 SET 状态 = ? WHERE 状态 = ?", (self.待抓取, self.抓取中)
+            ).rowcount
+            self.载入布隆快照()
+        if 恢复数:
+            self.日志器.info(f"恢复了 {恢复数} 个中断的网址")
+        atexit.register(self.关闭)
+    
+    def 载入布隆快照(self):
+        """载入过滤器快照，再补上快照之后新增的网址（调用方持有前沿锁）"""
+        层列表 = self.数据库.execute(
+            "SELECT 位数, 哈希数, 容量, 元素数, 位数组 FROM 布隆快照 ORDER BY 层号"
+        ).fetchall()
+        行 = self.数据库.execute("SELECT 值 FROM 前沿元数据 WHERE 键 = '布隆快照序号'").fetchone()
+        if 层列表 and 行:
+            self.布隆过滤器.层列表 = [
+                {"位数组": bytearray(位数组), "位数": 位数, "哈希数": 哈希数, "容量": 容量, "元素数": 元素数}
+                for 位数, 哈希数, 容量, 元素数, 位数组 in 层列表
+            ]
+            self.快照序号 = 行[0]
+        
+        for (哈希值,) in self.数据库.execute("SELECT 哈希 FROM 前沿 WHERE 序号 > ?", (self.快照序号,)):
+            self.布隆过滤器.添加(哈希值)
+            self.距上次快照 += 1
+    
+    def 保存布隆快照(self):
+        """把过滤器写入数据库（调用方持有前沿锁）"""
+        最大序号 = self.数据库.execute("SELECT COALESCE(MAX(序号), 0) FROM 前沿").fetchone()[0]
+        with self.数据库:
+            self.数据库.execute("DELETE FROM 布隆快照")
+            self.数据库.executemany(
+                "INSERT INTO 布隆快照 VALUES (?, ?, ?, ?, ?, ?)",
+                [(层号, 层["位数"], 层["哈希数"], 层["容量"], 层["元素数"], bytes(层["位数组"]))
+                 for 层号, 层 in enumerate(self.布隆过滤器.层列表)]
+            )
+            self.数据库.execute(
+                "INSERT OR REPLACE INTO 前沿元数据 VALUES ('布隆快照序号', ?)", (最大序号,)
+            )
+        self.快照序号 = 最大序号
+        self.距上次快照 = 0
+    
+    def 已见过(self, 哈希值: int) -> bool:
+        # 布隆过滤器说没有就一定没有；说有时再查磁盘排除误判（调用方持有前沿锁）
+        if not self.布隆过滤器.包含(哈希值):
+            return False
+        return self.数据库.execute("SELECT 1 FROM 前沿 WHERE 哈希 = ?", (哈希值,)).fetchone() is not None
+    
+    def 插入网址(self, url列表: List[str], 深度: int, 优先级: Optional[float]) -> int:
+        """规范化去重后插入新网址，返回实际加入的数量（调用方持有前沿锁并处于事务中）"""
+        优先级 = -深度 if 优先级 is None else 优先级
+        现在 = time.time()
+        加入数 = 0
+        for url in url列表:
+            url = url.strip()
+            try:
+                规范网址 = 规范化URL(url)
+            except ValueError:
+                self.日志器.warning(f"无法解析的网址: {url}")
+                continue
+            if not 规范网址.startswith(("http://", "https://")):
+                continue
+            哈希值 = 网址哈希(规范网址)
+            if self.已见过(哈希值):
+                continue
+            self.数据库.execute(
+                "INSERT INTO 前沿 (哈希, url, 主机, 深度, 优先级, 状态, 更新时间) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (哈希值, url, urlsplit(规范网址).netloc, 深度, 优先级, self.待抓取, 现在)
+            )
+            self.布隆过滤器.添加(哈希值)
+            self.距上次快照 += 1
+            加入数 += 1
+        return 加入数
+    
+    def 加入(self, url列表: List[str], 深度: int = 0, 优先级: float = None) -> int:
+        """加入一批网址，已见过的跳过；优先级越大越先抓取，默认按深度广度优先"""
+        with self.前沿锁:
+            with self.数据库:
+                加入数 = self.插入网址(url列表, 深度, 优先级)
+            if self.距上次快照 >= self.快照间隔:
+                self.保存布隆快照()
+        return 加入数
+    
+    def 取出(self, 数量: int) -> List[前沿条目]:
+        """按优先级取出一批待抓取网址并标记为抓取中
+        
+        每个主机最多取 每主机批量上限 个。沿优先级索引向后查找，已取满的主机
+        在SQL中排除，单个主机排满队首时其他主机的网址也能进入同一批，且只
+        扫描到凑满一批为止，不必对全部待抓取网址排序。
+        """
+        with self.前沿锁, self.数据库:
+            主机计数: Dict[str, int] = {}
+            条目列表: List[前沿条目] = []
+            游标 = (math.inf, 0)  # 上一次查询的最后 (优先级, 序号)
+            while len(条目列表) < 数量:
+                已满主机 = [主机 for 主机, 计数 in 主机计数.items() if 计数 >= self.每主机批量上限]
+                候选 = self.数据库.execute(
+                    "SELECT 序号, url, 主机, 深度, 优先级 FROM 前沿 "
+                    "WHERE 状态 = ? AND (优先级 < ? OR (优先级 = ? AND 序号 > ?)) "
+                    "AND 主机 NOT IN (SELECT value FROM json_each(?)) "
+                    "ORDER BY 优先级 DESC, 序号 LIMIT ?",
+                    (self.待抓取, 游标[0], 游标[0], 游标[1], json.dumps(已满主机), 数量 - len(条目列表))
+                ).fetchall()
+                if not 候选:
+                    break
+                for 序号, url, 主机, 深度, 优先级 in 候选:
+                    游标 = (优先级, 序号)
+                    if 主机计数.get(主机, 0) >= self.每主机批量上限:
+                        continue
+                    主机计数[主机] = 主机计数.get(主机, 0) + 1
+                    条目列表.append(前沿条目(序号, url, 深度, 优先级))
+            
+            self.数据库.executemany(
+                "UPDATE 前沿 SET 状态 = ?, 尝试次数 = 尝试次数 + 1, 更新时间 = ? WHERE 序号 = ?",
+                [(self.抓取中, time.time(), 条目.序号) for 条目 in 条目列表]
+            )
+        return 条目列表
+    
+    def 完成(self, 条目: 前沿条目, 成功: bool, 新链接: List[str] = None, 新链接优先级: float = None) -> int:
+        """标记网址完成或失败，并在同一事务中加入从该页发现的链接；返回新加入的链接数
+        
+        失败且尝试次数未用完的网址退回待抓取，优先级降低一级。
+        """
+        with self.前沿锁:
+            with self.数据库:
+                if 成功:
+                    self.数据库.execute(
+                        "UPDATE 前沿 SET 状态 = ?, 更新时间 = ? WHERE 序号 = ?",
+                        (self.已完成, time.time(), 条目.序号)
+                    )
+                else:
+                    self.数据库.execute(
+                        "UPDATE 前沿 SET 状态 = CASE WHEN 尝试次数 >= ? THEN ? ELSE ? END, "
+                        "优先级 = 优先级 - 1, 更新时间 = ? WHERE 序号 = ?",
+                        (self.最大尝试次数, self.已失败, self.待抓取, time.time(), 条目.序号)
+                    )
+                加入数 = self.插入网址(新链接 or [], 条目.深度 + 1, 新链接优先级)
+            if self.距上次快照 >= self.快照间隔:
+                self.保存布隆快照()
+        return 加入数
+    
+    def 获取前沿状态(self) -> Dict[str, Any]:
+        with self.前沿锁:
+            计数 = dict(self.数据库.execute("SELECT 状态, COUNT(*) FROM 前沿 GROUP BY 状态").fetchall())
+        return {
+            "待抓取": 计数.get(self.待抓取, 0),
+            "抓取中": 计数.get(self.抓取中, 0),
+            "已完成": 计数.get(self.已完成, 0),
+            "已失败": 计数.get(self.已失败, 0),
+            "布隆层数": len(self.布隆过滤器.层列表),
+            "布隆内存字节数": self.布隆过滤器.内存字节数
+        }
+    
+    def 关闭(self):
+        """保存布隆快照并关闭数据库，重复调用无影响"""
+        with self.前沿锁:
+            if self.数据库 is None:
+                return
+            self.保存布隆快照()
+            self.数据库.close()
+            self.数据库 = None
+        atexit.unregister(self.关闭)
+
+class 异步抓取引擎:
+    """基于asyncio和aiohttp的抓取引擎
+    
+    一个事件循环线程内可同时挂起数千个请求：连接池限制总连接数，每个主机另有
+    并发上限。礼貌延迟由主机礼貌调度器按主机预约，等待只挂起该主机的协程，
+    不会阻塞发往其他主机的请求；批量抓取时工作协程总是先取最早就绪的主机。
+    """
+    def __init__(self, 网络配置: Dict[str, Any], robots检查: Callable[[str], Awaitable[bool]] = None,
+                 统计信息: Dict[str, Any] = None, 调度器: 主机礼貌调度器 = None,
+                 响应缓存: HTTP缓存 = None):
+        self.配置管理器 = 获取配置管理器()
+        self.网络配置 = 网络配置
+        self.日志器 = logging.getLogger('异步抓取引擎')
+        self.robots检查 = robots检查
+        self.统计信息 = 统计信息 if 统计信息 is not None else {"总爬取次数": 0, "成功次数": 0, "失败次数": 0}
+        
+        self.总连接数 = self.配置管理器.获取配置("网络设置.总连接数", 100)
+        self.每主机并发数 = self.配置管理器.获取配置("网络设置.每主机并发数", 2)
+        self.重试次数 = self.配置管理器.获取配置("网络设置.重试次数", 3)
+        
+        # 按主机限速，跨多次运行保留
+        self.调度器 = 调度器 or 主机礼貌调度器(网络配置["爬取延迟"], 抖动_秒=1.0)
+        
+        # 条件请求缓存（可选）
+        self.响应缓存 = 响应缓存
+        
+        # 会话和信号量绑定事件循环，在 打开() 中创建
+        self.会话 = None
+        self.主机信号量: Dict[str, asyncio.Semaphore] = {}
+    
+    async def __aenter__(self) -> "异步抓取引擎":
+        await self.打开()
+        return self
+    
+    async def __aexit__(self, *异常信息):
+        await self.关闭()
+    
+    async def 打开(self):
+        """在当前事件循环中创建连接池和会话"""
+        if aiohttp is None:
+            raise RuntimeError("未安装aiohttp，无法使用异步抓取引擎")
+        if self.会话 is not None:
+            return
+        
+        连接器 = aiohttp.TCPConnector(limit=self.总连接数, limit_per_host=self.每主机并发数)
+        self.会话 = aiohttp.ClientSession(
+            connector=连接器,
+            timeout=aiohttp.ClientTimeout(total=self.网络配置["超时时间"]),
+            headers={
+                'User-Agent': self.网络配置["用户代理"],
+                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+                'Accept-Language': 'zh-CN,zh;q=0.8,en-US;q=0.5,en;q=0.3',
+                'Accept-Encoding': 'gzip, deflate',
+            }
+        )
+        self.主机信号量 = {}
+    
+    async def 关闭(self):
+        """关闭会话和连接池"""
+        if self.会话 is not None:
+            await self.会话.close()
+            self.会话 = None
+        self.主机信号量 = {}
+    
+    def 获取主机信号量(self, 主机: str) -> asyncio.Semaphore:
+        信号量 = self.主机信号量.get(主机)
+        if 信号量 is None:
+            信号量 = self.主机信号量[主机] = asyncio.Semaphore(self.每主机并发数)
+        return 信号量
+    
+    @staticmethod
+    def 主机标识(url: str) -> str:
+        return urlparse(url).netloc.lower()
+    
+    async def 抓取(self, url: str, 最大重试次数: int = None) -> Optional[抓取响应]:
+        """抓取单个网址，重试和状态码处理与 智能请求 一致"""
+        return await self.执行抓取(url, 最大重试次数, 已预约=False)
+    
+    async def 执行抓取(self, url: str, 最大重试次数: int = None, 已预约: bool = False) -> Optional[抓取响应]:
+        """抓取单个网址；已预约为True表示调用方已为第一次请求占用了该主机的令牌"""
+        if self.会话 is None:
+            raise RuntimeError("异步抓取引擎尚未打开")
+        
+        if self.robots检查 is not None and not await self.robots检查(url):
+            self.日志器.warning(f"被robots.txt禁止访问: {url}")
+            return None
+        
+        主机 = self.主机标识(url)
+        重试次数 = 最大重试次数 or self.重试次数
+        代理 = self.网络配置.get("代理设置") if isinstance(self.网络配置.get("代理设置"), str) else None
+        self.统计信息["总爬取次数"] += 1
+        
+        缓存 = await asyncio.to_thread(self.响应缓存.读取, url) if self.响应缓存 is not None else None
+        条件请求头 = 缓存.条件请求头() if 缓存 is not None else {}
+        
+        async with self.获取主机信号量(主机):
+            for 尝试 in range(重试次数):
+                if 尝试 or not 已预约:
+                    等待时长 = self.调度器.预约等待时长(主机)
+                    if 等待时长:
+                        await asyncio.sleep(等待时长)
+                try:
+                    async with self.会话.get(url, allow_redirects=True, proxy=代理, headers=条件请求头) as 响应:
+                        if 响应.status == 304 and 缓存 is not None:
+                            await asyncio.to_thread(self.响应缓存.刷新, 缓存, 响应.headers)
+                            self.统计信息["成功次数"] += 1
+                            self.统计信息["缓存命中次数"] = self.统计信息.get("缓存命中次数", 0) + 1
+                            self.统计信息["节省字节数"] = self.统计信息.get("节省字节数", 0) + len(缓存.内容)
+                            return 缓存.转为抓取响应()
+                        elif 响应.status == 200:
+                            内容 = await 响应.read()
+                            self.统计信息["成功次数"] += 1
+                            结果 = 抓取响应(
+                                url=str(响应.url),
+                                status_code=响应.status,
+                                headers=dict(响应.headers),
+                                content=内容,
+                                encoding=响应.charset or 'utf-8'
+                            )
+                            if self.响应缓存 is not None:
+                                await asyncio.to_thread(
+                                    self.响应缓存.保存, url, 结果.url, 响应.headers, 内容, 结果.encoding
+                                )
+                            return 结果
+                        elif 响应.status in [403, 404, 500, 503]:
+                            self.日志器.warning(f"HTTP {响应.status} 错误: {url}")
+                            break
+                        else:
+                            self.日志器.warning(f"HTTP {响应.status} 错误，重试 {尝试+1}/{重试次数}: {url}")
+                
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    self.日志器.warning(f"请求异常，重试 {尝试+1}/{重试次数}: {url} - {e}")
+                
+                if 尝试 < 重试次数 - 1:
+                    await asyncio.sleep(2 ** 尝试)  # 指数退避
+        
+        self.统计信息["失败次数"] += 1
+        return None
+    
+    async def 批量抓取(self, url列表: List[str], 工作协程数: int = None) -> List[Optional[抓取响应]]:
+        """抓取一批网址，结果按输入顺序返回
+        
+        网址按主机放入就绪队列，固定数量的工作协程每次取最先就绪的主机，
+        某个主机在等待间隔时，其他已就绪主机的请求照常发出。
+        """
+        结果列表: List[Optional[抓取响应]] = [None] * len(url列表)
+        
+        # 先取得各主机的robots.txt，使Crawl-delay在第一次请求前生效
+        if self.robots检查 is not None:
+            首个网址 = {self.主机标识(url): url for url in reversed(url列表)}
+            await asyncio.gather(*(self.robots检查(url) for url in 首个网址.values()))
+        
+        就绪队列 = 主机就绪队列(self.调度器)
+        for 序号, url in enumerate(url列表):
+            就绪队列.加入(self.主机标识(url), (序号, url))
+        
+        async def 工作协程():
+            while True:
+                取出, 等待时长 = 就绪队列.弹出就绪()
+                if 取出 is None:
+                    if 等待时长 is None:
+                        return
+                    await asyncio.sleep(等待时长)
+                    continue
+                _, (序号, url) = 取出
+                结果列表[序号] = await self.执行抓取(url, 已预约=True)
+        
+        工作协程数 = min(len(url列表), 工作协程数 or self.总连接数)
+        await asyncio.gather(*(工作协程() for _ in range(工作协程数)))
+        return 结果列表
+
+def 运行协程(协程: Awaitable) -> Any:
+    """在同步代码中运行协程；当前线程已有事件循环在运行时改在新线程中运行"""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(协程)
+    with ThreadPoolExecutor(max_workers=1) as 执行器:
+        return 执行器.submit(asyncio.run, 协程).result()
+
 class 智能爬虫系统:
     def __init__(self):
         self.配置管理器 = 获取配置管理器()
         self.网络配置 = self.配置管理器.获取网络配置()
         self.日志器 = logging.getLogger('智能爬虫')
         
-        # 爬虫状态
-        self.爬取队列 = []
-        self.已爬取网址 = set()
-        self.robots解析器 = {}
+        # 爬虫状态：待抓取和已抓取的网址都在磁盘上的抓取前沿中，首次使用时才打开
+        self.抓取前沿: Optional[抓取前沿] = None
         self.会话 = requests.Session()
         self.爬虫锁 = threading.Lock()
         
@@ -37,11 +998,50 @@ class 智能爬虫系统:
             "总爬取次数": 0,
             "成功次数": 0,
             "失败次数": 0,
+            "缓存命中次数": 0,
+            "节省字节数": 0,
             "总字数": 0,
             "开始时间": time.time()
         }
         
         self.设置会话头()
+        
+        # 按主机的礼貌调度（同步请求和异步引擎共用）
+        self.礼貌调度器 = 主机礼貌调度器(
+            self.网络配置["爬取延迟"],
+            突发数=self.配置管理器.获取配置("网络设置.主机突发请求数", 1),
+            抖动_秒=self.配置管理器.获取配置("网络设置.爬取延迟抖动", 1.0)
+        )
+        
+        # robots.txt缓存（后台下载；配置了路径才持久化到磁盘）
+        self.robots缓存 = robots缓存(
+            self.配置管理器.获取配置("网络设置.robots缓存路径", ""),
+            dict(self.会话.headers),
+            self.网络配置["超时时间"],
+            有效期_秒=self.配置管理器.获取配置("网络设置.robots缓存有效期", 86400),
+            失败有效期_秒=self.配置管理器.获取配置("网络设置.robots失败缓存有效期", 3600),
+            预取线程数=self.配置管理器.获取配置("网络设置.robots预取线程数", 8),
+            代理=self.网络配置.get("代理设置"),
+            加载回调=self.应用抓取间隔
+        )
+        
+        # HTTP条件请求缓存（配置了路径才启用）；离线模式只回放缓存中的响应
+        self.HTTP缓存: Optional[HTTP缓存] = None
+        HTTP缓存路径 = self.配置管理器.获取配置("网络设置.HTTP缓存路径", "")
+        if HTTP缓存路径:
+            self.HTTP缓存 = HTTP缓存(
+                HTTP缓存路径,
+                压缩级别=self.配置管理器.获取配置("网络设置.HTTP缓存压缩级别", 6)
+            )
+        self.离线模式 = self.配置管理器.获取配置("网络设置.离线模式", False)
+        if self.离线模式 and self.HTTP缓存 is None:
+            self.日志器.warning("离线模式未配置HTTP缓存路径，没有可回放的响应")
+        
+        # 异步抓取引擎（批量爬取时使用，需要aiohttp）
+        self.异步引擎 = 异步抓取引擎(
+            self.网络配置, robots检查=self.异步检查robots协议, 统计信息=self.统计信息,
+            调度器=self.礼貌调度器, 响应缓存=self.HTTP缓存
+        )
     
     def 设置会话头(self):
         """设置请求头"""
@@ -198,47 +1198,84 @@ class 智能爬虫系统:
             return True
         
         try:
-            解析器 = urllib.robotparser.RobotFileParser()
-            基础域名 = f"{urlparse(url).scheme}://{urlparse(url).netloc}"
-            robots_url = urljoin(基础域名, "/robots.txt")
-            
-            if 基础域名 not in self.robots解析器:
-                解析器.set_url(robots_url)
-                解析器.read()
-                self.robots解析器[基础域名] = 解析器
+            解析器 = self.robots缓存.获取(url, 超时=self.网络配置["超时时间"])
+            return 解析器.can_fetch(self.网络配置["用户代理"], url)
             
-            解析器 = self.robots解析器[基础域名]
+        except Exception as e:
+            self.日志器.warning(f"Robots协议检查失败 {url}: {e}")
+            return True
+    
+    async def 异步检查robots协议(self, url: str) -> bool:
+        """异步版 检查robots协议，等待robots.txt下载时不阻塞事件循环"""
+        if not self.网络配置["遵守规范"]:
+            return True
+        
+        try:
+            解析器 = await self.robots缓存.异步获取(url)
             return 解析器.can_fetch(self.网络配置["用户代理"], url)
             
         except Exception as e:
             self.日志器.warning(f"Robots协议检查失败 {url}: {e}")
             return True
     
+    def 预取robots(self, url列表: List[str]):
+        """在后台为待抓取网址预取robots.txt"""
+        if self.网络配置["遵守规范"]:
+            self.robots缓存.批量预取(url列表)
+    
+    def 应用抓取间隔(self, 基础域名: str, 解析器: urllib.robotparser.RobotFileParser):
+        """把robots.txt中的Crawl-delay或Request-rate设为该主机的最小请求间隔"""
+        主机 = urlparse(基础域名).netloc.lower()
+        用户代理 = self.网络配置["用户代理"]
+        间隔 = 解析器.crawl_delay(用户代理)
+        请求频率 = 解析器.request_rate(用户代理)
+        if 请求频率 and 请求频率.requests:
+            间隔 = max(间隔 or 0, 请求频率.seconds / 请求频率.requests)
+        if 间隔:
+            self.礼貌调度器.设置主机间隔(主机, float(间隔))
+    
     def 智能请求(self, url: str, 最大重试次数: int = None) -> Optional[requests.Response]:
-        """智能请求网页，包含重试机制和延迟"""
+        """智能请求网页，包含重试机制和延迟；已缓存的网页发送条件请求，未修改时使用缓存"""
         if not self.网络配置["真实爬取"]:
             self.日志器.info(f"模拟爬取: {url}")
             return self.模拟请求(url)
         
+        if self.离线模式:
+            缓存 = self.从缓存回放(url)
+            return 缓存.构建响应() if 缓存 is not None else None
+        
         if not self.检查robots协议(url):
             self.日志器.warning(f"被robots.txt禁止访问: {url}")
             return None
         
-        # 遵守爬取延迟
-        time.sleep(self.网络配置["爬取延迟"] + random.uniform(0, 1))
+        # 遵守爬取延迟：只等待同一主机的上一次请求，不同主机之间不互相等待
+        等待时长 = self.礼貌调度器.预约等待时长(urlparse(url).netloc.lower())
+        if 等待时长:
+            time.sleep(等待时长)
         
         重试次数 = 最大重试次数 or self.网络配置["重试次数"]
+        缓存 = self.HTTP缓存.读取(url) if self.HTTP缓存 is not None else None
+        条件请求头 = 缓存.条件请求头() if 缓存 is not None else {}
         
         for 尝试 in range(重试次数):
             try:
                 响应 = self.会话.get(
                     url, 
                     timeout=self.网络配置["超时时间"],
-                    allow_redirects=True
+                    allow_redirects=True,
+                    headers=条件请求头
                 )
                 
-                if 响应.status_code == 200:
+                if 响应.status_code == 304 and 缓存 is not None:
+                    self.HTTP缓存.刷新(缓存, 响应.headers)
+                    self.统计信息["成功次数"] += 1
+                    self.统计信息["缓存命中次数"] += 1
+                    self.统计信息["节省字节数"] += len(缓存.内容)
+                    return 缓存.构建响应()
+                elif 响应.status_code == 200:
                     self.统计信息["成功次数"] += 1
+                    if self.HTTP缓存 is not None:
+                        self.HTTP缓存.保存(url, 响应.url, 响应.headers, 响应.content, 响应.encoding)
                     return 响应
                 elif 响应.status_code in [403, 404, 500, 503]:
                     self.日志器.warning(f"HTTP {响应.status_code} 错误: {url}")
@@ -255,6 +1292,111 @@ class 智能爬虫系统:
         self.统计信息["失败次数"] += 1
         return None
     
+    async def 异步智能请求(self, url: str) -> Optional[抓取响应]:
+        """异步版 智能请求，需在异步引擎打开后调用"""
+        if not self.网络配置["真实爬取"]:
+            self.日志器.info(f"模拟爬取: {url}")
+            return self.模拟请求(url)
+        if self.离线模式:
+            缓存 = self.从缓存回放(url)
+            return 缓存.转为抓取响应() if 缓存 is not None else None
+        return await self.异步引擎.抓取(url)
+    
+    def 从缓存回放(self, url: str) -> Optional[缓存条目]:
+        """离线模式下读取缓存的响应，不访问网络"""
+        缓存 = self.HTTP缓存.读取(url) if self.HTTP缓存 is not None else None
+        if 缓存 is None:
+            self.日志器.info(f"离线模式，缓存中没有: {url}")
+            return None
+        self.统计信息["缓存命中次数"] += 1
+        return 缓存
+    
+    def 抓取网址列表(self, url列表: List[str]) -> List[Optional[抓取响应]]:
+        """在一个事件循环中并发抓取一批网址，结果按输入顺序返回"""
+        if not self.网络配置["真实爬取"]:
+            return [self.模拟请求(url) for url in url列表]
+        if self.离线模式:
+            return [缓存.转为抓取响应() if 缓存 is not None else None
+                    for 缓存 in map(self.从缓存回放, url列表)]
+        
+        if aiohttp is None:
+            return [self.智能请求(url) for url in url列表]
+        
+        self.预取robots(url列表)
+        
+        async def 执行():
+            async with self.异步引擎:
+                return await self.异步引擎.批量抓取(url列表)
+        return 运行协程(执行())
+    
+    def 打开抓取前沿(self) -> 抓取前沿:
+        """首次使用时打开抓取前沿（建库、载入布隆快照），不用前沿的调用方不打开"""
+        with self.爬虫锁:
+            if self.抓取前沿 is None:
+                self.抓取前沿 = 抓取前沿(
+                    self.配置管理器.获取配置("网络设置.抓取前沿路径", "学习数据/抓取前沿.db"),
+                    每主机批量上限=self.配置管理器.获取配置("网络设置.前沿每主机批量上限", 10),
+                    最大尝试次数=self.配置管理器.获取配置("网络设置.重试次数", 3)
+                )
+            return self.抓取前沿
+    
+    def 添加种子网址(self, url列表: List[str], 优先级: float = None) -> int:
+        """把起始网址加入抓取前沿，返回新加入的数量"""
+        return self.打开抓取前沿().加入(url列表, 深度=0, 优先级=优先级)
+    
+    def 运行抓取前沿(self, 处理响应: Callable[[str, Any], List[str]], 批量大小: int = None,
+                    最大网址数: int = None, 最大深度: int = None) -> Dict[str, int]:
+        """从抓取前沿按优先级分批抓取，直到前沿为空或达到上限
+        
+        处理响应(网址, 响应) 返回页面中发现的链接，与该网址的完成状态在同一事务中写入前沿；
+        处理响应抛出异常时按抓取失败处理，网址在尝试次数内会重新抓取。
+        进程中断后再次调用会从中断处继续，已完成的网址不会重复抓取。
+        """
+        批量大小 = 批量大小 or self.配置管理器.获取配置("网络设置.前沿批量大小", 100)
+        前沿 = self.打开抓取前沿()
+        统计 = {"抓取数": 0, "成功数": 0, "新链接数": 0}
+        
+        while 最大网址数 is None or 统计["抓取数"] < 最大网址数:
+            数量 = 批量大小 if 最大网址数 is None else min(批量大小, 最大网址数 - 统计["抓取数"])
+            条目列表 = 前沿.取出(数量)
+            if not 条目列表:
+                break
+            
+            响应列表 = self.抓取网址列表([条目.url for 条目 in 条目列表])
+            for 条目, 响应 in zip(条目列表, 响应列表):
+                新链接 = []
+                处理成功 = False
+                if 响应 is not None:
+                    try:
+                        新链接 = 处理响应(条目.url, 响应) or []
+                        处理成功 = True
+                    except Exception as e:
+                        self.日志器.error(f"处理响应失败 {条目.url}: {e}")
+                    if not 处理成功 or (最大深度 is not None and 条目.深度 >= 最大深度):
+                        新链接 = []
+                统计["成功数"] += 处理成功
+                
+                统计["新链接数"] += 前沿.完成(条目, 处理成功, 新链接)
+                统计["抓取数"] += 1
+            
+            self.日志器.info(f"抓取前沿进度: {统计}")
+        
+        return 统计
+    
+    def __enter__(self) -> "智能爬虫系统":
+        return self
+    
+    def __exit__(self, *异常信息):
+        self.关闭()
+    
+    def 关闭(self):
+        """保存抓取前沿快照并关闭各个缓存"""
+        if self.抓取前沿 is not None:
+            self.抓取前沿.关闭()
+        self.robots缓存.关闭()
+        if self.HTTP缓存 is not None:
+            self.HTTP缓存.关闭()
+    
     def 模拟请求(self, url: str) -> Optional[requests.Response]:
         """模拟请求，用于测试或网络受限时"""
         class 模拟响应:
@@ -506,9 +1648,8 @@ class 智能爬虫系统:
         else:
             return 0.3
     
-    def 网络爬取角色(self, 角色名: str) -> List[Dict[str, Any]]:
-        """从网络爬取角色信息"""
-        # 构建搜索URL
+    def 生成角色搜索URL(self, 角色名: str) -> List[str]:
+        """构建角色搜索URL"""
         搜索词编码 = requests.utils.quote(角色名)
         搜索URL列表 = [
             f"https://www.baidu.com/s?wd={搜索词编码} 角色 设定",
@@ -516,56 +1657,67 @@ class 智能爬虫系统:
             f"https://wiki.biligame.com/ys/{搜索词编码}" if "原神" in 角色名 else None,
             f"https://wiki.biligame.com/sr/{搜索词编码}" if "星穹" in 角色名 else None
         ]
-        
+        return [url for url in 搜索URL列表 if url]
+    
+    def 解析角色响应(self, url: str, 响应) -> Optional[Dict[str, Any]]:
+        """由角色搜索响应生成结果项，无有效内容时返回None"""
+        if 响应 and 响应.status_code == 200:
+            角色信息 = self.提取角色信息(响应.text, url)
+            if 角色信息["姓名"] != "提取失败":
+                return {
+                    "类型": "角色",
+                    "来源": "网络爬取",
+                    "网址": url,
+                    "数据": 角色信息,
+                    "匹配度": 0.5  # 网络结果的默认匹配度
+                }
+        return None
+    
+    def 网络爬取角色(self, 角色名: str) -> List[Dict[str, Any]]:
+        """从网络爬取角色信息"""
         结果列表 = []
-        for url in 搜索URL列表:
-            if not url:
-                continue
-            
-            响应 = self.智能请求(url)
-            if 响应 and 响应.status_code == 200:
-                角色信息 = self.提取角色信息(响应.text, url)
-                if 角色信息["姓名"] != "提取失败":
-                    结果列表.append({
-                        "类型": "角色",
-                        "来源": "网络爬取",
-                        "网址": url,
-                        "数据": 角色信息,
-                        "匹配度": 0.5  # 网络结果的默认匹配度
-                    })
+        for url in self.生成角色搜索URL(角色名):
+            结果 = self.解析角色响应(url, self.智能请求(url))
+            if 结果:
+                结果列表.append(结果)
         
         return 结果列表
     
-    def 网络爬取世界观(self, 世界观名: str) -> List[Dict[str, Any]]:
-        """从网络爬取世界观信息"""
-        # 类似角色爬取，但专注于世界观信息
+    def 生成世界观搜索URL(self, 世界观名: str) -> str:
+        """构建世界观搜索URL"""
         搜索词编码 = requests.utils.quote(世界观名 + " 世界观 设定")
-        搜索URL = f"https://www.baidu.com/s?wd={搜索词编码}"
-        
-        响应 = self.智能请求(搜索URL)
+        return f"https://www.baidu.com/s?wd={搜索词编码}"
+    
+    def 解析世界观响应(self, 世界观名: str, url: str, 响应) -> List[Dict[str, Any]]:
+        """由世界观搜索响应生成结果列表"""
         if 响应 and 响应.status_code == 200:
             # 这里简化处理，实际应该提取世界观相关信息
             return [{
                 "类型": "世界观",
                 "来源": "网络爬取", 
-                "网址": 搜索URL,
+                "网址": url,
                 "数据": {"名称": 世界观名, "描述": "从网络提取的世界观信息"},
                 "匹配度": 0.5
             }]
         
         return []
     
-    def 网络爬取小说(self, 关键词: str) -> List[Dict[str, Any]]:
-        """从网络爬取小说内容"""
-        # 构建小说搜索URL
+    def 网络爬取世界观(self, 世界观名: str) -> List[Dict[str, Any]]:
+        """从网络爬取世界观信息"""
+        # 类似角色爬取，但专注于世界观信息
+        搜索URL = self.生成世界观搜索URL(世界观名)
+        return self.解析世界观响应(世界观名, 搜索URL, self.智能请求(搜索URL))
+    
+    def 生成小说搜索URL(self, 关键词: str) -> str:
+        """构建小说搜索URL"""
         搜索词编码 = requests.utils.quote(关键词 + " 小说")
-        搜索URL = f"https://www.biquge.com.cn/search.php?keyword={搜索词编码}"
-        
-        响应 = self.智能请求(搜索URL)
+        return f"https://www.biquge.com.cn/search.php?keyword={搜索词编码}"
+    
+    def 解析小说链接(self, 搜索URL: str, 响应) -> List[str]:
+        """解析搜索结果页，返回前几个小说页面链接"""
         if not 响应 or 响应.status_code != 200:
             return []
         
-        # 解析搜索结果，获取小说链接
         soup = BeautifulSoup(响应.text, 'lxml')
         小说链接列表 = []
         
@@ -575,26 +1727,130 @@ class 智能爬虫系统:
                 href = urljoin(搜索URL, href)
             小说链接列表.append(href)
         
+        return 小说链接列表[:3]  # 限制数量
+    
+    def 解析小说响应(self, 链接: str, 响应) -> Optional[Dict[str, Any]]:
+        """由小说页面响应生成结果项"""
+        if 响应 and 响应.status_code == 200:
+            return {
+                "类型": "小说",
+                "来源": "网络爬取",
+                "网址": 链接,
+                "数据": self.提取小说内容(响应.text, 链接),
+                "匹配度": 0.7
+            }
+        return None
+    
+    def 网络爬取小说(self, 关键词: str) -> List[Dict[str, Any]]:
+        """从网络爬取小说内容"""
+        搜索URL = self.生成小说搜索URL(关键词)
+        小说链接列表 = self.解析小说链接(搜索URL, self.智能请求(搜索URL))
+        
         # 爬取前几个小说页面
         结果列表 = []
-        for 链接 in 小说链接列表[:3]:  # 限制数量
-            响应 = self.智能请求(链接)
-            if 响应 and 响应.status_code == 200:
-                小说内容 = self.提取小说内容(响应.text, 链接)
-                结果列表.append({
-                    "类型": "小说",
-                    "来源": "网络爬取",
-                    "网址": 链接,
-                    "数据": 小说内容,
-                    "匹配度": 0.7
-                })
+        for 链接 in 小说链接列表:
+            结果 = self.解析小说响应(链接, self.智能请求(链接))
+            if 结果:
+                结果列表.append(结果)
+        
+        return 结果列表
+    
+    async def 异步网络爬取角色(self, 角色名: str) -> List[Dict[str, Any]]:
+        """并发请求各角色搜索URL"""
+        url列表 = self.生成角色搜索URL(角色名)
+        响应列表 = await asyncio.gather(*(self.异步智能请求(url) for url in url列表))
+        结果列表 = [self.解析角色响应(url, 响应) for url, 响应 in zip(url列表, 响应列表)]
+        return [结果 for 结果 in 结果列表 if 结果]
+    
+    async def 异步网络爬取世界观(self, 世界观名: str) -> List[Dict[str, Any]]:
+        """异步版 网络爬取世界观"""
+        搜索URL = self.生成世界观搜索URL(世界观名)
+        return self.解析世界观响应(世界观名, 搜索URL, await self.异步智能请求(搜索URL))
+    
+    async def 异步网络爬取小说(self, 关键词: str) -> List[Dict[str, Any]]:
+        """先取搜索结果页，再并发抓取其中的小说页面"""
+        搜索URL = self.生成小说搜索URL(关键词)
+        小说链接列表 = self.解析小说链接(搜索URL, await self.异步智能请求(搜索URL))
+        响应列表 = await asyncio.gather(*(self.异步智能请求(链接) for 链接 in 小说链接列表))
+        结果列表 = [self.解析小说响应(链接, 响应) for 链接, 响应 in zip(小说链接列表, 响应列表)]
+        return [结果 for 结果 in 结果列表 if 结果]
+    
+    async def 异步爬取指定内容(self, 搜索词: str, 内容类型: str = "自动") -> List[Dict[str, Any]]:
+        """异步版 爬取指定内容：各类网络请求并发发出，结果顺序与同步版一致"""
+        self.日志器.info(f"开始爬取: {搜索词} ({内容类型})")
+        
+        爬取角色 = 内容类型 in ("角色", "自动")
+        爬取世界观 = 内容类型 in ("世界观", "自动")
+        爬取小说 = 内容类型 in ("小说", "自动")
+        真实爬取 = self.网络配置["真实爬取"]
+        
+        async def 无结果():
+            return []
+        
+        角色结果, 世界观结果, 小说结果 = await asyncio.gather(
+            self.异步网络爬取角色(搜索词) if 爬取角色 and 真实爬取 else 无结果(),
+            self.异步网络爬取世界观(搜索词) if 爬取世界观 and 真实爬取 else 无结果(),
+            self.异步网络爬取小说(搜索词) if 爬取小说 and 真实爬取 else 无结果()
+        )
+        
+        结果列表 = []
+        if 爬取角色:
+            预设结果 = self.从预设库查询角色(搜索词)
+            if 预设结果:
+                结果列表.extend(预设结果)
+                self.日志器.info(f"从预设库找到角色: {搜索词}")
+            结果列表.extend(角色结果)
+        if 爬取世界观:
+            结果列表.extend(self.从预设库查询世界观(搜索词))
+            结果列表.extend(世界观结果)
+        结果列表.extend(小说结果)
         
         return 结果列表
     
+    def 生成任务搜索URL(self, 任务列表: List[Dict[str, str]]) -> List[str]:
+        """列出批量任务首先要请求的搜索页网址"""
+        url列表 = []
+        for 任务 in 任务列表:
+            搜索词, 内容类型 = 任务["搜索词"], 任务.get("内容类型", "自动")
+            if 内容类型 in ("角色", "自动"):
+                url列表.extend(self.生成角色搜索URL(搜索词))
+            if 内容类型 in ("世界观", "自动"):
+                url列表.append(self.生成世界观搜索URL(搜索词))
+            if 内容类型 in ("小说", "自动"):
+                url列表.append(self.生成小说搜索URL(搜索词))
+        return url列表
+    
+    async def 异步批量爬取(self, 任务列表: List[Dict[str, str]]) -> Dict[str, Any]:
+        """在一个事件循环中并发执行全部任务"""
+        结果汇总 = {}
+        
+        async def 执行任务(任务: Dict[str, str]):
+            try:
+                结果 = await self.异步爬取指定内容(任务["搜索词"], 任务.get("内容类型", "自动"))
+                结果汇总[任务["搜索词"]] = 结果
+                self.日志器.info(f"完成爬取: {任务['搜索词']} - 找到 {len(结果)} 个结果")
+            except Exception as e:
+                self.日志器.error(f"爬取失败 {任务['搜索词']}: {e}")
+                结果汇总[任务["搜索词"]] = []
+        
+        async with self.异步引擎:
+            await asyncio.gather(*(执行任务(任务) for 任务 in 任务列表))
+        
+        return 结果汇总
+    
     def 批量爬取(self, 任务列表: List[Dict[str, str]]) -> Dict[str, Any]:
-        """批量爬取多个任务"""
+        """批量爬取多个任务
+        
+        安装了aiohttp时全部任务在一个事件循环中并发执行，否则退回线程池。
+        """
         self.日志器.info(f"开始批量爬取 {len(任务列表)} 个任务")
         
+        if self.网络配置["真实爬取"] and not self.离线模式:
+            self.预取robots(self.生成任务搜索URL(任务列表))
+        
+        if aiohttp is not None:
+            return 运行协程(self.异步批量爬取(任务列表))
+        
         结果汇总 = {}
         
         with ThreadPoolExecutor(max_workers=self.网络配置["并发线程数"]) as 执行器:
@@ -625,7 +1881,10 @@ class 智能爬虫系统:
             "运行时间_秒": round(运行时间, 2),
             "成功率": self.统计信息["成功次数"] / max(self.统计信息["总爬取次数"], 1),
             "预设角色数": sum(len(角色库) for 角色库 in self.预设角色库.values()),
-            "预设世界观数": len(self.预设世界观库)
+            "预设世界观数": len(self.预设世界观库),
+            "robots缓存": self.robots缓存.获取缓存状态(),
+            "HTTP缓存": self.HTTP缓存.获取缓存状态() if self.HTTP缓存 is not None else None,
+            "抓取前沿": self.抓取前沿.获取前沿状态() if self.抓取前沿 is not None else None
         }
     
     def 保存学习数据(self, 数据: Dict[str, Any], 文件名: str = None):
@@ -4,12 +4,32 @@ import json
 import time
 import logging
 import hashlib
-from typing import Dict, List, Any, Optional, Tuple, Set
+import bisect
+import copy
+import os
+import asyncio
+import itertools
+import sqlite3
+import shutil
+import subprocess
+import socket
+import atexit
+from array import array
+from typing import Dict, List, Any, Optional, Tuple, Set, Iterable, Iterator
 from dataclasses import dataclass
+from contextlib import contextmanager
 from enum import Enum
 from pathlib import Path
 import threading
-from collections import defaultdict
+from collections import defaultdict, deque, OrderedDict, Counter
+from concurrent.futures import ProcessPoolExecutor, Future
+from queue import PriorityQueue, Full
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+import numpy as np
+import psutil
 from 模块2_配置管理 import 获取配置管理器
 from 模块5_智能生成核心 import 生成结果
 
@@ -25,6 +45,12 @@ class 风险等级(Enum):
     高风险 = "高风险"
     危险 = "危险"
 
+class 审核优先级(Enum):
+    """异步审核队列优先级，数值越小越先执行"""
+    交互 = 0
+    普通 = 1
+    批量 = 2
+
 class 内容类型(Enum):
     文本 = "文本"
     图像 = "图像"
@@ -60,6 +86,191 @@ class 安全事件:
     处理人员: Optional[str]
     处理措施: Optional[str]
 
+@dataclass
+class 已分析文档:
+    """文本预处理结果，一次计算供各分析器共用"""
+    内容: str
+    句子区间: List[Tuple[int, int]]
+    句子列表: List[str]
+    中文词列表: List[str]
+    关键词命中: Dict[str, Dict[str, List[int]]]
+    
+    def 命中次数(self, 类别: str) -> int:
+        """某类别关键词的总命中次数"""
+        return sum(len(位置列表) for 位置列表 in self.关键词命中.get(类别, {}).values())
+
+class 关键词自动机:
+    """Aho-Corasick 多模式匹配自动机，一次扫描返回所有类别的命中"""
+    def __init__(self, 分类词库: Dict[str, List[str]]):
+        # 关键词 -> 所属类别列表（同一关键词可属于多个类别）
+        self.关键词类别: Dict[str, List[str]] = defaultdict(list)
+        for 类别, 关键词列表 in 分类词库.items():
+            for 关键词 in 关键词列表:
+                if 关键词 and 类别 not in self.关键词类别[关键词]:
+                    self.关键词类别[关键词].append(类别)
+        
+        self.模式列表: List[str] = list(self.关键词类别.keys())
+        self.转移表: List[Dict[str, int]] = [{}]
+        self.失败表: List[int] = [0]
+        self.输出表: List[Tuple[int, ...]] = [()]
+        self.构建自动机()
+    
+    def 构建自动机(self):
+        """构建字典树与失败指针"""
+        for 模式序号, 模式 in enumerate(self.模式列表):
+            状态 = 0
+            for 字符 in 模式:
+                下一状态 = self.转移表[状态].get(字符)
+                if 下一状态 is None:
+                    下一状态 = len(self.转移表)
+                    self.转移表[状态][字符] = 下一状态
+                    self.转移表.append({})
+                    self.失败表.append(0)
+                    self.输出表.append(())
+                状态 = 下一状态
+            self.输出表[状态] += (模式序号,)
+        
+        # 广度优先计算失败指针，并合并后缀状态的输出
+        队列 = deque(self.转移表[0].values())
+        while 队列:
+            状态 = 队列.popleft()
+            for 字符, 子状态 in self.转移表[状态].items():
+                失败状态 = self.失败表[状态]
+                while 失败状态 and 字符 not in self.转移表[失败状态]:
+                    失败状态 = self.失败表[失败状态]
+                self.失败表[子状态] = self.转移表[失败状态].get(字符, 0)
+                self.输出表[子状态] += self.输出表[self.失败表[子状态]]
+                队列.append(子状态)
+    
+    def 扫描(self, 文本: str) -> List[Tuple[int, str]]:
+        """单次扫描文本，返回 (起始位置, 关键词) 列表"""
+        命中列表, _ = self.流式扫描(文本)
+        return 命中列表
+    
+    def 流式扫描(self, 文本块: str, 起始状态: int = 0, 偏移: int = 0) -> Tuple[List[Tuple[int, str]], int]:
+        """从给定状态继续扫描文本块，返回 (全局起始位置, 关键词) 列表和结束状态
+        
+        把上一块的结束状态传入下一块，跨块边界的关键词也能被识别。
+        """
+        转移表, 失败表, 输出表, 模式列表 = self.转移表, self.失败表, self.输出表, self.模式列表
+        命中列表 = []
+        状态 = 起始状态
+        
+        for 位置, 字符 in enumerate(文本块, 偏移):
+            while 状态 and 字符 not in 转移表[状态]:
+                状态 = 失败表[状态]
+            状态 = 转移表[状态].get(字符, 0)
+            for 模式序号 in 输出表[状态]:
+                模式 = 模式列表[模式序号]
+                命中列表.append((位置 - len(模式) + 1, 模式))
+        
+        return 命中列表, 状态
+    
+    def 分类统计(self, 文本: str) -> Dict[str, Dict[str, List[int]]]:
+        """按类别汇总命中：{类别: {关键词: [起始位置, ...]}}"""
+        统计结果: Dict[str, Dict[str, List[int]]] = {}
+        for 起始位置, 关键词 in self.扫描(文本):
+            for 类别 in self.关键词类别[关键词]:
+                统计结果.setdefault(类别, {}).setdefault(关键词, []).append(起始位置)
+        return 统计结果
+
+class 风险模式引擎:
+    """预编译的风险模式引擎，按句子匹配，匹配时间与文本长度成线性关系
+    
+    风险模式库中的模式形如 `.*[甲].*[乙].*`，即若干个片段按顺序出现在同一行。
+    引擎去掉首尾的 `.*`，把中间的 `.*` 作为分隔拆成片段并各自编译，
+    匹配时从左到右依次查找每个片段，文本中的每个位置最多被访问一次，
+    避免了 re.search 在长文本上的回溯爆炸。
+    """
+    def __init__(self, 风险模式库: Dict[str, Any], 合并匹配: bool = False):
+        self.风险模式库 = 风险模式库
+        self.合并匹配 = 合并匹配
+        self.行分隔符 = re.compile(r'[。！？!?\n]')
+        
+        # 模式名 -> 按顺序的片段正则
+        self.片段表: Dict[str, List[re.Pattern]] = {
+            模式名: [re.compile(片段) for 片段 in 模式配置["模式"].split('.*') if 片段]
+            for 模式名, 模式配置 in 风险模式库.items()
+        }
+        
+        # 合并匹配用：各模式当前待匹配片段组合 -> 合成的交替式（None表示全部完成）
+        self.片段列表表 = list(self.片段表.values())
+        self.合并正则缓存: Dict[Tuple[int, ...], Optional[re.Pattern]] = {}
+    
+    def 匹配句子(self, 句子: str) -> List[str]:
+        """返回单句（单行）中命中的模式名"""
+        if self.合并匹配:
+            return self.合并匹配句子(句子)
+        
+        命中模式 = []
+        for 模式名, 片段列表 in self.片段表.items():
+            位置 = 0
+            for 片段 in 片段列表:
+                匹配 = 片段.search(句子, 位置)
+                if 匹配 is None:
+                    break
+                位置 = 匹配.end()
+            else:
+                命中模式.append(模式名)
+        return 命中模式
+    
+    def 获取合并正则(self, 状态: Tuple[int, ...]) -> Optional[re.Pattern]:
+        """各未完成模式当前待匹配片段合成的交替式，按状态缓存"""
+        if 状态 not in self.合并正则缓存:
+            当前片段 = dict.fromkeys(
+                片段列表[下标].pattern
+                for 片段列表, 下标 in zip(self.片段列表表, 状态) if 下标 < len(片段列表)
+            )
+            self.合并正则缓存[状态] = re.compile('|'.join(f"(?:{片段})" for 片段 in 当前片段)) if 当前片段 else None
+        return self.合并正则缓存[状态]
+    
+    def 合并匹配句子(self, 句子: str) -> List[str]:
+        """用合并后的交替式匹配单句，结果与逐个模式匹配相同
+        
+        交替式由各模式当前待匹配的片段组成，一次搜索找出最近的候选位置，
+        命中的模式进入下一片段后换用新状态的交替式继续向右搜索。每个位置
+        最多扫描一次，时间与句长成线性关系。
+        """
+        下一片段 = [0] * len(self.片段列表表)
+        可开始位置 = [0] * len(self.片段列表表)
+        位置 = 0
+        while True:
+            合并正则 = self.获取合并正则(tuple(下一片段))
+            候选 = 合并正则.search(句子, 位置) if 合并正则 is not None else None
+            if 候选 is None:
+                break
+            起点 = 候选.start()
+            for 序号, 片段列表 in enumerate(self.片段列表表):
+                # 片段可能是零宽的，同一位置可连续推进多个片段
+                while 下一片段[序号] < len(片段列表) and 起点 >= 可开始位置[序号]:
+                    匹配 = 片段列表[下一片段[序号]].match(句子, 起点)
+                    if 匹配 is None:
+                        break
+                    可开始位置[序号] = 匹配.end()
+                    下一片段[序号] += 1
+            位置 = 起点 + 1
+        
+        return [
+            模式名 for 模式名, 片段列表, 下标 in zip(self.片段表, self.片段列表表, 下一片段)
+            if 下标 == len(片段列表)
+        ]
+    
+    def 匹配(self, 内容: str, 句子列表: List[str] = None) -> List[str]:
+        """逐句匹配整段文本，返回命中的模式名（按模式库顺序）"""
+        if 句子列表 is None:
+            句子列表 = self.行分隔符.split(内容)
+        
+        命中集合 = set()
+        for 句子 in 句子列表:
+            # 句子内部仍可能有换行，模式不跨行匹配
+            for 行 in 句子.split('\n'):
+                if 行:
+                    命中集合.update(self.匹配句子(行))
+            if len(命中集合) == len(self.片段表):
+                break
+        
+        return [模式名 for 模式名 in self.片段表 if 模式名 in 命中集合]
+
 class Google级安全识别器:
     """Google级安全内容识别器"""
     def __init__(self):
@@ -73,7 +284,148 @@ class Google级安全识别器:
         
         # 风险模式识别
         self.风险模式库 = self.初始化风险模式库()
+        self.风险模式引擎 = 风险模式引擎(
+            self.风险模式库,
+            合并匹配=self.配置管理器.获取配置("安全设置.风险模式合并匹配", False)
+        )
+        
+        # 关键词自动机（规则关键词 + 自定义关键词）
+        self.自定义关键词: List[str] = []
+        self.关键词自动机 = self.构建关键词自动机()
+        
+        # 批量评分用的 类别关键词×权重 向量
+        self.构建评分矩阵()
+        
+        # 上下文指纹缓存：上下文MD5摘要 -> 命中的语境类别，同一会话上下文只扫描一次
+        self.上下文指纹锁 = threading.Lock()
+        self.上下文指纹缓存: "OrderedDict[bytes, frozenset]" = OrderedDict()
+        self.上下文指纹条目数 = self.配置管理器.获取配置("安全设置.上下文指纹缓存条目数", 256)
+        self.上下文指纹统计 = {"命中次数": 0, "未命中次数": 0}
+        
+    def 构建关键词自动机(self, 自定义关键词: List[str] = None) -> 关键词自动机:
+        """由安全规则库和自定义关键词（缺省为当前词表）构建多模式匹配自动机"""
+        分类词库 = {风险类型: 规则["关键词"] for 风险类型, 规则 in self.安全规则库.items()}
+        分类词库["自定义关键词"] = self.自定义关键词 if 自定义关键词 is None else 自定义关键词
+        
+        # 语义词与语境词一并编入，预处理时一次扫描全部得到
+        分类词库["否定词"] = self.语义分析库["否定词"]
+        分类词库["程度词"] = self.语义分析库["程度词"]
+        分类词库["正面情感词"] = self.语义分析库["情感词"]["正面"]
+        分类词库["负面情感词"] = self.语义分析库["情感词"]["负面"]
+        分类词库.update(self.上下文理解器)
+        return 关键词自动机(分类词库)
+    
+    def 更新自定义关键词(self, 关键词集合, 自动机: 关键词自动机 = None):
+        """更新自定义关键词；未给出已构建的自动机时就地重建"""
+        自定义关键词 = sorted(关键词集合)
+        if 自动机 is None:
+            自动机 = self.构建关键词自动机(自定义关键词)
+        # 整体替换引用，正在进行的扫描继续使用旧自动机
+        self.自定义关键词 = 自定义关键词
+        self.关键词自动机 = 自动机
+    
+    def 构建评分矩阵(self):
+        """把规则关键词、程度词和语境的风险贡献整理为向量，列与特征矩阵一一对应
+        
+        单项权重由逐条计算的函数求出，批量评分与逐条评分使用同一套规则。
+        """
+        # 每个(类别, 关键词)一列，出现即计 0.1×类别风险权重
+        self.评分关键词列: Dict[Tuple[str, str], int] = {}
+        分值列表 = []
+        for 风险类型, 规则 in self.安全规则库.items():
+            for 关键词 in 规则["关键词"]:
+                列 = self.评分关键词列.setdefault((风险类型, 关键词), len(分值列表))
+                if 列 == len(分值列表):
+                    分值列表.append(0.0)
+                分值列表[列] += 0.1 * 规则["风险权重"]
+        self.关键词分值向量 = np.array(分值列表)
         
+        self.程度词列 = {词: 列 for 列, 词 in enumerate(dict.fromkeys(self.语义分析库["程度词"]))}
+        self.程度权重向量 = np.array([self.计算程度调整([词]) for 词 in self.程度词列])
+        
+        self.评分语境列表 = list(self.上下文理解器)
+        self.语境调整向量 = np.array([self.计算语境调整({语境}) for 语境 in self.评分语境列表])
+    
+    def 提取评分特征(self, 文档列表: List[已分析文档], 上下文: str = "") -> Dict[str, np.ndarray]:
+        """把一批已分析文档整理为评分特征矩阵（每行一篇文档）"""
+        文档数 = len(文档列表)
+        关键词行, 关键词列 = [], []
+        程度行, 程度列 = [], []
+        语境矩阵 = np.zeros((文档数, len(self.评分语境列表)), dtype=bool)
+        情感计数 = np.zeros((文档数, 2))
+        否定句子数 = np.zeros(文档数)
+        句子数 = np.zeros(文档数)
+        模式命中数 = np.zeros(文档数)
+        自定义命中数 = np.zeros(文档数)
+        
+        for 行, 文档 in enumerate(文档列表):
+            关键词命中 = 文档.关键词命中
+            for 风险类型 in self.安全规则库:
+                for 关键词 in 关键词命中.get(风险类型, ()):
+                    列 = self.评分关键词列.get((风险类型, 关键词))
+                    if 列 is not None:
+                        关键词行.append(行)
+                        关键词列.append(列)
+            for 程度词 in 关键词命中.get("程度词", ()):
+                程度行.append(行)
+                程度列.append(self.程度词列[程度词])
+            for 列, 语境 in enumerate(self.评分语境列表):
+                语境矩阵[行, 列] = bool(关键词命中.get(语境))
+            
+            情感计数[行] = (文档.命中次数("正面情感词"), 文档.命中次数("负面情感词"))
+            否定句子数[行] = self.统计否定句子数(文档)
+            句子数[行] = len(文档.句子区间)
+            模式命中数[行] = len(self.风险模式引擎.匹配(文档.内容, 文档.句子列表))
+            自定义命中数[行] = len(关键词命中.get("自定义关键词", ()))
+        
+        关键词矩阵 = np.zeros((文档数, len(self.关键词分值向量)))
+        关键词矩阵[关键词行, 关键词列] = 1.0
+        程度矩阵 = np.zeros((文档数, len(self.程度权重向量)))
+        程度矩阵[程度行, 程度列] = 1.0
+        
+        # 上下文字符串对整批文档相同，命中的语境并入每一行
+        上下文语境 = self.获取上下文指纹(上下文)
+        语境矩阵 |= np.array([语境 in 上下文语境 for 语境 in self.评分语境列表], dtype=bool)
+        
+        return {
+            "关键词矩阵": 关键词矩阵,
+            "程度矩阵": 程度矩阵,
+            "语境矩阵": 语境矩阵.astype(float),
+            "情感计数": 情感计数,
+            "否定句子数": 否定句子数,
+            "句子数": 句子数,
+            "模式命中数": 模式命中数,
+            "自定义命中数": 自定义命中数
+        }
+    
+    def 批量计算风险评分(self, 特征: Dict[str, np.ndarray]) -> np.ndarray:
+        """按特征矩阵计算每篇文档的总体风险评分，与计算总体风险评分逐条结果一致"""
+        基础风险分 = 特征["关键词矩阵"] @ self.关键词分值向量
+        
+        # 否定语境下调、程度修饰上调
+        句子数 = 特征["句子数"]
+        否定比例 = np.divide(特征["否定句子数"], 句子数, out=np.zeros_like(句子数), where=句子数 > 0)
+        风险调整 = -否定比例 * 0.3
+        风险调整 += np.minimum(特征["程度矩阵"] @ self.程度权重向量, 0.5)
+        
+        # 情感倾向：正面比例 >0.7 下调，<0.3 上调
+        正面计数, 负面计数 = 特征["情感计数"][:, 0], 特征["情感计数"][:, 1]
+        情感总数 = 正面计数 + 负面计数
+        正面比例 = np.divide(正面计数, 情感总数, out=np.full_like(情感总数, 0.5), where=情感总数 > 0)
+        风险调整 += np.where(正面比例 > 0.7, -0.2, np.where(正面比例 < 0.3, 0.2, 0.0))
+        
+        # 每个命中的风险模式固定增加50%，再加上下文语境调整
+        风险调整 += 特征["模式命中数"] * 0.5
+        风险调整 += 特征["语境矩阵"] @ self.语境调整向量
+        
+        return np.minimum(基础风险分 * (1 + 风险调整), 1.0)
+    
+    def 匹配自定义关键词(self, 内容: str, 文档: 已分析文档 = None) -> List[str]:
+        """返回内容中命中的自定义关键词"""
+        if 文档 is None:
+            文档 = self.分析文档(内容)
+        return list(文档.关键词命中.get("自定义关键词", {}).keys())
+    
     def 初始化安全规则库(self) -> Dict[str, Dict[str, Any]]:
         """初始化多维度安全规则库"""
         return {
@@ -193,8 +545,28 @@ class Google级安全识别器:
             }
         }
     
-    def 深度语义扫描(self, 内容: str, 上下文: str = "") -> Dict[str, Any]:
-        """深度语义内容扫描"""
+    def 分析文档(self, 内容: str) -> 已分析文档:
+        """对文本做一次性预处理：句子切分、中文词切分、关键词命中"""
+        句子区间 = []
+        for 匹配 in re.finditer(r'[^。！？!?]+', 内容):
+            起点, 终点 = 匹配.span()
+            片段 = 匹配.group()
+            去首 = len(片段) - len(片段.lstrip())
+            去尾 = len(片段) - len(片段.rstrip())
+            if 起点 + 去首 < 终点 - 去尾:
+                句子区间.append((起点 + 去首, 终点 - 去尾))
+        
+        return 已分析文档(
+            内容=内容,
+            句子区间=句子区间,
+            句子列表=[内容[起点:终点] for 起点, 终点 in 句子区间],
+            中文词列表=re.findall(r'[\u4e00-\u9fa5]{2,}', 内容),
+            关键词命中=self.关键词自动机.分类统计(内容)
+        )
+    
+    def 深度语义扫描(self, 内容: str, 上下文: str = "", 文档: 已分析文档 = None,
+                     阶段耗时: Dict[str, float] = None) -> Dict[str, Any]:
+        """深度语义内容扫描，阶段耗时不为None时按阶段累加耗时（毫秒）"""
         扫描结果 = {
             "表面风险": [],
             "深层风险": [],
@@ -204,20 +576,27 @@ class Google级安全识别器:
         }
         
         try:
-            # 表面关键词扫描
-            表面风险 = self.表面关键词扫描(内容)
+            # 预处理只做一次，后续各分析器共用
+            with 阶段计时(阶段耗时, "关键词扫描"):
+                if 文档 is None:
+                    文档 = self.分析文档(内容)
+                
+                # 表面关键词扫描
+                表面风险 = self.表面关键词扫描(内容, 文档)
             扫描结果["表面风险"] = 表面风险
             
             # 深层语义分析
-            深层风险 = self.深层语义分析(内容, 上下文)
+            深层风险 = self.深层语义分析(内容, 上下文, 文档, 阶段耗时)
             扫描结果["深层风险"] = 深层风险
             
             # 语义特征提取
-            语义特征 = self.提取语义特征(内容)
+            with 阶段计时(阶段耗时, "深层语义"):
+                语义特征 = self.提取语义特征(内容, 文档)
             扫描结果["语义分析"] = 语义特征
             
             # 上下文风险评估
-            上下文风险 = self.评估上下文风险(内容, 上下文)
+            with 阶段计时(阶段耗时, "上下文风险"):
+                上下文风险 = self.评估上下文风险(内容, 上下文, 文档)
             扫描结果["上下文风险评估"] = 上下文风险
             
             # 计算总体风险评分
@@ -230,43 +609,65 @@ class Google级安全识别器:
             self.日志器.error(f"深度语义扫描失败: {e}")
             return 扫描结果
     
-    def 表面关键词扫描(self, 内容: str) -> List[Dict[str, Any]]:
+    def 表面关键词扫描(self, 内容: str, 文档: 已分析文档 = None) -> List[Dict[str, Any]]:
         """表面关键词扫描"""
+        if 文档 is None:
+            文档 = self.分析文档(内容)
+        return self.汇总表面风险(文档.关键词命中)
+    
+    def 汇总表面风险(self, 关键词命中: Dict[str, Dict[str, List[int]]], 命中计数: Dict[str, Dict[str, int]] = None) -> List[Dict[str, Any]]:
+        """由关键词命中生成表面风险项；命中计数缺省时按位置列表长度计"""
         发现的风险 = []
         
         for 风险类型, 规则 in self.安全规则库.items():
-            命中关键词 = []
-            
-            for 关键词 in 规则["关键词"]:
-                if 关键词 in 内容:
-                    命中关键词.append(关键词)
+            类别命中 = 关键词命中.get(风险类型)
+            if not 类别命中:
+                continue
             
-            if 命中关键词:
-                风险项 = {
-                    "风险类型": 风险类型,
-                    "命中关键词": 命中关键词,
-                    "风险权重": 规则["风险权重"],
-                    "基础风险分": len(命中关键词) * 0.1 * 规则["风险权重"]
-                }
-                发现的风险.append(风险项)
+            # 保持规则库中的关键词顺序
+            命中关键词 = [关键词 for 关键词 in 规则["关键词"] if 关键词 in 类别命中]
+            if 命中计数 is None:
+                命中次数 = sum(len(类别命中[关键词]) for 关键词 in 命中关键词)
+            else:
+                命中次数 = sum(命中计数[风险类型][关键词] for 关键词 in 命中关键词)
+            风险项 = {
+                "风险类型": 风险类型,
+                "命中关键词": 命中关键词,
+                "命中次数": 命中次数,
+                "命中位置": {关键词: 类别命中[关键词] for 关键词 in 命中关键词},
+                "风险权重": 规则["风险权重"],
+                "基础风险分": len(命中关键词) * 0.1 * 规则["风险权重"]
+            }
+            发现的风险.append(风险项)
         
         return 发现的风险
     
-    def 深层语义分析(self, 内容: str, 上下文: str) -> List[Dict[str, Any]]:
+    def 深层语义分析(self, 内容: str, 上下文: str, 文档: 已分析文档 = None,
+                     阶段耗时: Dict[str, float] = None) -> List[Dict[str, Any]]:
         """深层语义分析"""
-        深层风险 = []
-        
-        # 检查否定语境（可能降低风险）
-        否定语境风险调整 = self.分析否定语境(内容)
-        
-        # 检查程度修饰（可能增加风险）
-        程度修饰风险调整 = self.分析程度修饰(内容)
+        if 文档 is None:
+            文档 = self.分析文档(内容)
         
-        # 检查情感倾向
-        情感倾向分析 = self.分析情感倾向(内容)
+        with 阶段计时(阶段耗时, "深层语义"):
+            # 检查否定语境（可能降低风险）
+            否定语境风险调整 = self.分析否定语境(内容, 文档)
+            
+            # 检查程度修饰（可能增加风险）
+            程度修饰风险调整 = self.分析程度修饰(内容, 文档)
+            
+            # 检查情感倾向
+            情感倾向分析 = self.分析情感倾向(内容, 文档)
         
         # 检查风险模式
-        模式匹配风险 = self.检查风险模式(内容)
+        with 阶段计时(阶段耗时, "风险模式"):
+            模式匹配风险 = self.检查风险模式(内容, 文档)
+        
+        return self.组合深层风险(否定语境风险调整, 程度修饰风险调整, 情感倾向分析, 模式匹配风险)
+    
+    def 组合深层风险(self, 否定语境风险调整: float, 程度修饰风险调整: float,
+                     情感倾向分析: Dict[str, Any], 模式匹配风险: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """把各项深层分析结果组合为深层风险列表"""
+        深层风险 = []
         
         if 否定语境风险调整:
             深层风险.append({
@@ -293,44 +694,60 @@ class Google级安全识别器:
         
         return 深层风险
     
-    def 分析否定语境(self, 内容: str) -> float:
+    def 分析否定语境(self, 内容: str, 文档: 已分析文档 = None) -> float:
         """分析否定语境"""
-        否定词 = self.语义分析库["否定词"]
-        句子列表 = self.分割句子(内容)
+        if 文档 is None:
+            文档 = self.分析文档(内容)
+        return self.计算否定调整(self.统计否定句子数(文档), len(文档.句子区间))
+    
+    def 统计否定句子数(self, 文档: 已分析文档) -> int:
+        """统计含否定词的句子数"""
+        句子区间 = 文档.句子区间
         
-        否定句子数 = 0
-        for 句子 in 句子列表:
-            for 否定词 in 否定词:
-                if 否定词 in 句子:
-                    否定句子数 += 1
-                    break
+        # 否定词命中位置落在哪些句子中
+        否定位置 = sorted(
+            位置 for 位置列表 in 文档.关键词命中.get("否定词", {}).values() for 位置 in 位置列表
+        )
+        否定句子 = set()
+        for 位置 in 否定位置:
+            句子序号 = bisect.bisect_right(句子区间, (位置, float('inf'))) - 1
+            if 句子序号 >= 0 and 位置 < 句子区间[句子序号][1]:
+                否定句子.add(句子序号)
         
-        否定比例 = 否定句子数 / len(句子列表) if 句子列表 else 0
+        return len(否定句子)
+    
+    def 计算否定调整(self, 否定句子数: int, 句子数: int) -> float:
+        """按否定句比例计算风险下调幅度"""
+        否定比例 = 否定句子数 / 句子数 if 句子数 else 0
         return 否定比例 * 0.3  # 否定语境最多降低30%风险
     
-    def 分析程度修饰(self, 内容: str) -> float:
+    def 分析程度修饰(self, 内容: str, 文档: 已分析文档 = None) -> float:
         """分析程度修饰"""
-        程度词 = self.语义分析库["程度词"]
-        
+        if 文档 is None:
+            文档 = self.分析文档(内容)
+        return self.计算程度调整(文档.关键词命中.get("程度词", {}))
+    
+    def 计算程度调整(self, 命中程度词) -> float:
+        """按出现过的程度词计算风险上调幅度"""
         程度修饰强度 = 0.0
-        for 程度词 in 程度词:
-            if 程度词 in 内容:
-                # 简单加权：非常类词权重更高
-                if 程度词 in ["非常", "极其", "十分"]:
-                    程度修饰强度 += 0.1
-                else:
-                    程度修饰强度 += 0.05
+        for 程度词 in 命中程度词:
+            # 简单加权：非常类词权重更高
+            if 程度词 in ["非常", "极其", "十分"]:
+                程度修饰强度 += 0.1
+            else:
+                程度修饰强度 += 0.05
         
         return min(程度修饰强度, 0.5)  # 最多增加50%风险
     
-    def 分析情感倾向(self, 内容: str) -> Dict[str, Any]:
+    def 分析情感倾向(self, 内容: str, 文档: 已分析文档 = None) -> Dict[str, Any]:
         """分析情感倾向"""
-        正面词 = self.语义分析库["情感词"]["正面"]
-        负面词 = self.语义分析库["情感词"]["负面"]
-        
-        正面计数 = sum(内容.count(词) for 词 in 正面词)
-        负面计数 = sum(内容.count(词) for 词 in 负面词)
+        if 文档 is None:
+            文档 = self.分析文档(内容)
         
+        return self.判定情感倾向(文档.命中次数("正面情感词"), 文档.命中次数("负面情感词"))
+    
+    def 判定情感倾向(self, 正面计数: int, 负面计数: int) -> Dict[str, Any]:
+        """按正负面情感词计数判定倾向"""
         if 正面计数 + 负面计数 == 0:
             return {"倾向": "中性", "风险调整": 0.0}
         
@@ -343,25 +760,30 @@ class Google级安全识别器:
         else:
             return {"倾向": "中性", "风险调整": 0.0}
     
-    def 检查风险模式(self, 内容: str) -> List[Dict[str, Any]]:
-        """检查风险模式"""
+    def 检查风险模式(self, 内容: str, 文档: 已分析文档 = None) -> List[Dict[str, Any]]:
+        """检查风险模式（逐句匹配预编译模式）"""
+        句子列表 = 文档.句子列表 if 文档 is not None else None
+        return self.生成模式风险(self.风险模式引擎.匹配(内容, 句子列表))
+    
+    def 生成模式风险(self, 模式名列表: List[str]) -> List[Dict[str, Any]]:
+        """由命中的模式名生成模式风险项"""
         模式风险 = []
-        
-        for 模式名, 模式配置 in self.风险模式库.items():
-            模式 = 模式配置["模式"]
-            if re.search(模式, 内容):
-                模式风险.append({
-                    "风险类型": "模式匹配",
-                    "描述": f"匹配到{模式名}模式",
-                    "风险等级": 模式配置["风险等级"],
-                    "风险调整": 0.5  # 模式匹配固定增加50%风险
-                })
+        for 模式名 in 模式名列表:
+            模式配置 = self.风险模式库[模式名]
+            模式风险.append({
+                "风险类型": "模式匹配",
+                "描述": f"匹配到{模式名}模式",
+                "风险等级": 模式配置["风险等级"],
+                "风险调整": 0.5  # 模式匹配固定增加50%风险
+            })
         
         return 模式风险
     
-    def 提取语义特征(self, 内容: str) -> Dict[str, Any]:
+    def 提取语义特征(self, 内容: str, 文档: 已分析文档 = None) -> Dict[str, Any]:
         """提取语义特征"""
-        句子列表 = self.分割句子(内容)
+        if 文档 is None:
+            文档 = self.分析文档(内容)
+        句子列表 = 文档.句子列表
         
         特征 = {
             "句子数量": len(句子列表),
@@ -377,64 +799,109 @@ class Google级安全识别器:
             特征["平均句长"] = 总字数 / len(句子列表)
             
             # 计算情感密度
-            情感词总数 = sum(内容.count(词) for 词 in self.语义分析库["情感词"]["正面"] + self.语义分析库["情感词"]["负面"])
+            情感词总数 = 文档.命中次数("正面情感词") + 文档.命中次数("负面情感词")
             特征["情感密度"] = 情感词总数 / len(内容) if 内容 else 0
             
             # 计算风险词密度
-            风险词总数 = 0
-            for 规则 in self.安全规则库.values():
-                风险词总数 += sum(内容.count(词) for 词 in 规则["关键词"])
+            风险词总数 = sum(文档.命中次数(风险类型) for 风险类型 in self.安全规则库)
             特征["风险词密度"] = 风险词总数 / len(内容) if 内容 else 0
             
             # 计算复杂性评分（基于句子长度变化和词汇多样性）
-            特征["复杂性评分"] = self.计算复杂性评分(内容)
+            特征["复杂性评分"] = self.计算复杂性评分(内容, 文档)
         
         return 特征
     
-    def 计算复杂性评分(self, 内容: str) -> float:
+    def 计算复杂性评分(self, 内容: str, 文档: 已分析文档 = None) -> float:
         """计算内容复杂性评分"""
         if len(内容) < 50:
             return 0.3
         
-        # 句子长度变化
-        句子列表 = self.分割句子(内容)
-        句长列表 = [len(句子) for 句子 in 句子列表]
+        if 文档 is None:
+            文档 = self.分析文档(内容)
+        
+        中文词 = 文档.中文词列表
+        return self.由统计计算复杂性评分(
+            len(内容), Counter(len(句子) for 句子 in 文档.句子列表), len(set(中文词)), len(中文词)
+        )
+    
+    def 由统计计算复杂性评分(self, 内容长度: int, 句长分布: Dict[int, int], 不同词数: int, 词总数: int) -> float:
+        """由句长分布（句长 -> 句子数）和词汇计数计算复杂性评分"""
+        if 内容长度 < 50:
+            return 0.3
         
-        if len(句长列表) < 2:
+        # 句子长度变化
+        句子数 = sum(句长分布.values())
+        if 句子数 < 2:
             return 0.5
         
-        平均句长 = sum(句长列表) / len(句长列表)
-        句长差异 = sum(abs(长度 - 平均句长) for 长度 in 句长列表) / len(句长列表)
+        平均句长 = sum(长度 * 数量 for 长度, 数量 in 句长分布.items()) / 句子数
+        句长差异 = sum(abs(长度 - 平均句长) * 数量 for 长度, 数量 in 句长分布.items()) / 句子数
         句长变化率 = 句长差异 / 平均句长
         
         # 词汇多样性
-        中文词 = re.findall(r'[\u4e00-\u9fa5]{2,}', 内容)
-        词汇多样性 = len(set(中文词)) / len(中文词) if 中文词 else 0
+        词汇多样性 = 不同词数 / 词总数 if 词总数 else 0
         
         复杂性 = (句长变化率 * 0.6 + 词汇多样性 * 0.4)
         return min(复杂性, 1.0)
     
-    def 评估上下文风险(self, 内容: str, 上下文: str) -> float:
+    def 评估上下文风险(self, 内容: str, 上下文: str, 文档: 已分析文档 = None) -> float:
         """评估上下文风险"""
+        if 文档 is None:
+            文档 = self.分析文档(内容)
+        
+        命中语境 = {语境 for 语境 in self.上下文理解器 if 文档.关键词命中.get(语境)}
+        命中语境 |= self.获取上下文指纹(上下文)
+        return self.计算语境调整(命中语境)
+    
+    def 获取上下文指纹(self, 上下文: str) -> frozenset:
+        """上下文中出现的语境类别（文学/教育/新闻/学术），按上下文摘要缓存"""
+        if not 上下文:
+            return frozenset()
+        
+        # 以摘要为键，缓存不持有上下文原文，长上下文也只占16字节
+        键 = hashlib.md5(上下文.encode()).digest()
+        with self.上下文指纹锁:
+            指纹 = self.上下文指纹缓存.get(键)
+            if 指纹 is not None:
+                self.上下文指纹缓存.move_to_end(键)
+                self.上下文指纹统计["命中次数"] += 1
+                return 指纹
+            self.上下文指纹统计["未命中次数"] += 1
+        
+        指纹 = frozenset(self.识别上下文语境(上下文))
+        with self.上下文指纹锁:
+            self.上下文指纹缓存[键] = 指纹
+            while len(self.上下文指纹缓存) > self.上下文指纹条目数:
+                self.上下文指纹缓存.popitem(last=False)
+        return 指纹
+    
+    def 获取上下文指纹状态(self) -> Dict[str, Any]:
+        """上下文指纹缓存状态"""
+        with self.上下文指纹锁:
+            return {"缓存条目数": len(self.上下文指纹缓存), **self.上下文指纹统计}
+    
+    def 识别上下文语境(self, 上下文: str) -> Set[str]:
+        """识别上下文字符串中出现的语境类别"""
+        return {
+            语境 for 语境, 语境词列表 in self.上下文理解器.items()
+            if any(语境词 in 上下文 for 语境词 in 语境词列表)
+        }
+    
+    def 计算语境调整(self, 命中语境: Set[str]) -> float:
+        """按命中的语境类别计算风险调整"""
         上下文风险 = 0.0
         
         # 检查文学语境
-        for 语境词 in self.上下文理解器["文学语境"]:
-            if 语境词 in 上下文 or 语境词 in 内容:
-                上下文风险 -= 0.3  # 文学语境降低风险
-                break
+        if "文学语境" in 命中语境:
+            上下文风险 -= 0.3  # 文学语境降低风险
         
         # 检查教育语境
-        for 语境词 in self.上下文理解器["教育语境"]:
-            if 语境词 in 上下文 or 语境词 in 内容:
-                上下文风险 -= 0.2  # 教育语境降低风险
-                break
+        if "教育语境" in 命中语境:
+            上下文风险 -= 0.2  # 教育语境降低风险
         
         # 检查新闻语境
-        for 语境词 in self.上下文理解器["新闻语境"]:
-            if 语境词 in 上下文 or 语境词 in 内容:
-                上下文风险 += 0.2  # 新闻语境增加风险
-                break
+        if "新闻语境" in 命中语境:
+            上下文风险 += 0.2  # 新闻语境增加风险
         
         return 上下文风险
     
@@ -463,25 +930,514 @@ class Google级安全识别器:
         句子列表 = re.split(r'[。！？!?]', 内容)
         return [句子.strip() for 句子 in 句子列表 if 句子.strip()]
 
+class 流式审核状态:
+    """流式审核的累计状态，内存占用与输入总长度无关"""
+    def __init__(self, 安全识别器: Google级安全识别器, 上下文: str = ""):
+        self.安全识别器 = 安全识别器
+        self.自动机 = 安全识别器.关键词自动机
+        self.句子分隔符 = re.compile(r'[。！？!?]')
+        
+        # 单句最多保留的字数，超长无标点文本按此截断用于模式匹配
+        self.最大句长 = 安全识别器.配置管理器.获取配置("安全设置.流式最大句长", 2000)
+        # 每个关键词最多保留的命中位置数
+        self.最大位置数 = 20
+        
+        self.自动机状态 = 0
+        self.已处理字数 = 0
+        self.已处理块数 = 0
+        
+        # 关键词累计：位置只保留前若干个，次数单独计数
+        self.关键词命中: Dict[str, Dict[str, List[int]]] = {}
+        self.命中计数: Dict[str, Dict[str, int]] = {}
+        
+        # 句子累计
+        self.句子数 = 0
+        self.否定句子数 = 0
+        self.句长总和 = 0
+        self.当前句片段: List[str] = []
+        self.当前句长度 = 0
+        self.当前句含否定 = False
+        
+        # 模式匹配与语境
+        self.模式匹配风险: Dict[str, Dict[str, Any]] = {}
+        self.上下文语境 = 安全识别器.获取上下文指纹(上下文)
+    
+    def 处理文本块(self, 文本块: str):
+        """处理一个文本块，更新累计状态"""
+        偏移 = self.已处理字数
+        命中列表, self.自动机状态 = self.自动机.流式扫描(文本块, self.自动机状态, 偏移)
+        
+        否定位置 = []
+        for 起始位置, 关键词 in 命中列表:
+            for 类别 in self.自动机.关键词类别[关键词]:
+                类别计数 = self.命中计数.setdefault(类别, {})
+                类别计数[关键词] = 类别计数.get(关键词, 0) + 1
+                位置列表 = self.关键词命中.setdefault(类别, {}).setdefault(关键词, [])
+                if len(位置列表) < self.最大位置数:
+                    位置列表.append(起始位置)
+                if 类别 == "否定词":
+                    否定位置.append(起始位置)
+        
+        # 按句子分隔符切分，末尾未结束的句子留到下一块
+        片段起点 = 0
+        for 分隔 in self.句子分隔符.finditer(文本块):
+            self.追加当前句(文本块, 片段起点, 分隔.start(), 偏移, 否定位置)
+            self.结束当前句()
+            片段起点 = 分隔.end()
+        self.追加当前句(文本块, 片段起点, len(文本块), 偏移, 否定位置)
+        
+        self.已处理字数 += len(文本块)
+        self.已处理块数 += 1
+    
+    def 追加当前句(self, 文本块: str, 起点: int, 终点: int, 偏移: int, 否定位置: List[int]):
+        """把文本块中的一段并入当前句"""
+        if 起点 >= 终点:
+            return
+        
+        if not self.当前句含否定:
+            全局起点, 全局终点 = 偏移 + 起点, 偏移 + 终点
+            序号 = bisect.bisect_left(否定位置, 全局起点)
+            self.当前句含否定 = 序号 < len(否定位置) and 否定位置[序号] < 全局终点
+        
+        保留字数 = self.最大句长 - sum(len(片段) for 片段 in self.当前句片段)
+        if 保留字数 > 0:
+            self.当前句片段.append(文本块[起点:min(终点, 起点 + 保留字数)])
+        self.当前句长度 += 终点 - 起点
+    
+    def 结束当前句(self):
+        """当前句结束：计入句子统计并检查风险模式"""
+        句子 = "".join(self.当前句片段)
+        去空白长度 = self.当前句长度 - (len(句子) - len(句子.strip()))
+        
+        if 句子.strip():
+            self.句子数 += 1
+            self.句长总和 += 去空白长度
+            if self.当前句含否定:
+                self.否定句子数 += 1
+            for 风险项 in self.安全识别器.检查风险模式(句子):
+                self.模式匹配风险.setdefault(风险项["描述"], 风险项)
+        
+        self.当前句片段 = []
+        self.当前句长度 = 0
+        self.当前句含否定 = False
+    
+    def 结束(self):
+        """输入结束，计入最后一个未以标点结尾的句子"""
+        self.结束当前句()
+    
+    def 生成扫描结果(self) -> Dict[str, Any]:
+        """按当前累计状态生成与深度语义扫描相同结构的结果"""
+        识别器 = self.安全识别器
+        
+        表面风险 = 识别器.汇总表面风险(self.关键词命中, self.命中计数)
+        深层风险 = 识别器.组合深层风险(
+            识别器.计算否定调整(self.否定句子数, self.句子数),
+            识别器.计算程度调整(self.关键词命中.get("程度词", {})),
+            识别器.判定情感倾向(self.类别命中次数("正面情感词"), self.类别命中次数("负面情感词")),
+            list(self.模式匹配风险.values())
+        )
+        命中语境 = {语境 for 语境 in 识别器.上下文理解器 if self.关键词命中.get(语境)} | self.上下文语境
+        上下文风险 = 识别器.计算语境调整(命中语境)
+        
+        # 流式模式不保留全文词表，不计算复杂性评分
+        总字数 = self.已处理字数
+        语义特征 = {
+            "句子数量": self.句子数,
+            "平均句长": self.句长总和 / self.句子数 if self.句子数 else 0,
+            "情感密度": (self.类别命中次数("正面情感词") + self.类别命中次数("负面情感词")) / 总字数 if 总字数 else 0,
+            "风险词密度": sum(self.类别命中次数(风险类型) for 风险类型 in 识别器.安全规则库) / 总字数 if 总字数 else 0
+        }
+        
+        return {
+            "表面风险": 表面风险,
+            "深层风险": 深层风险,
+            "语义分析": 语义特征,
+            "上下文风险评估": 上下文风险,
+            "总体风险评分": 识别器.计算总体风险评分(表面风险, 深层风险, 上下文风险)
+        }
+    
+    def 类别命中次数(self, 类别: str) -> int:
+        """某类别关键词的累计命中次数"""
+        return sum(self.命中计数.get(类别, {}).values())
+    
+    def 自定义关键词命中(self) -> List[str]:
+        """累计命中的自定义关键词"""
+        return list(self.命中计数.get("自定义关键词", {}).keys())
+
+@dataclass
+class 句子贡献:
+    """单个句子单元（句子及其后的句末标点）对全文统计的贡献"""
+    长度: int
+    句长: int  # 去首尾空白后的句长，0表示不构成句子
+    含否定: bool
+    模式命中: Tuple[str, ...]
+    命中计数: Dict[str, Dict[str, int]]
+    中文词计数: Dict[str, int]
+    # 需要命中位置的类别（风险类别和自定义关键词）：{类别: {关键词: 单元内起始位置}}
+    命中位置: Dict[str, Dict[str, Tuple[int, ...]]]
+
+class 增量文档状态:
+    """单个文档上次审核版本的句子单元及累计统计"""
+    def __init__(self, 词库版本: int):
+        self.词库版本 = 词库版本
+        self.单元列表: List[str] = []
+        self.贡献表: Dict[str, 句子贡献] = {}
+        self.单元引用数: Dict[str, int] = {}
+        
+        # 累计统计，随单元增删增减
+        self.命中计数: Dict[str, Dict[str, int]] = {}
+        self.句子数 = 0
+        self.否定句子数 = 0
+        self.句长总和 = 0
+        self.句长分布: Dict[int, int] = defaultdict(int)
+        self.模式计数: Dict[str, int] = defaultdict(int)
+        self.中文词计数: Dict[str, int] = defaultdict(int)
+        self.中文词总数 = 0
+    
+    def 累加(self, 贡献: 句子贡献, 方向: int):
+        """方向为1时计入一个单元的贡献，为-1时扣除"""
+        for 类别, 类别计数 in 贡献.命中计数.items():
+            累计 = self.命中计数.setdefault(类别, {})
+            for 关键词, 次数 in 类别计数.items():
+                剩余 = 累计.get(关键词, 0) + 方向 * 次数
+                if 剩余:
+                    累计[关键词] = 剩余
+                else:
+                    累计.pop(关键词, None)
+        
+        if 贡献.句长:
+            self.句子数 += 方向
+            self.句长总和 += 方向 * 贡献.句长
+            self.句长分布[贡献.句长] += 方向
+            if not self.句长分布[贡献.句长]:
+                del self.句长分布[贡献.句长]
+            if 贡献.含否定:
+                self.否定句子数 += 方向
+        
+        for 模式名 in 贡献.模式命中:
+            self.模式计数[模式名] += 方向
+            if not self.模式计数[模式名]:
+                del self.模式计数[模式名]
+        
+        for 词, 次数 in 贡献.中文词计数.items():
+            self.中文词计数[词] += 方向 * 次数
+            if not self.中文词计数[词]:
+                del self.中文词计数[词]
+            self.中文词总数 += 方向 * 次数
+    
+    def 类别命中次数(self, 类别: str) -> int:
+        """某类别关键词的累计命中次数"""
+        return sum(self.命中计数.get(类别, {}).values())
+
+class 增量文档审核器:
+    """按文档ID增量审核文本
+    
+    文本按句末标点切成句子单元（句子及其后的标点），每个单元的关键词计数、
+    否定、风险模式和分词结果缓存为句子贡献，文档的累计统计随单元增删增减。
+    再次提交时只比较与上一版本首尾相同的单元，中间改动区间内的新单元才重新
+    扫描，评分由累计统计直接计算，开销与改动范围成正比。
+    """
+    句末标点 = "。！？!?"
+    
+    def __init__(self, 安全识别器: Google级安全识别器):
+        self.安全识别器 = 安全识别器
+        self.配置管理器 = 获取配置管理器()
+        self.缓存锁 = threading.Lock()
+        self.单元切分 = re.compile(rf'[^{self.句末标点}]*[{self.句末标点}]+|[^{self.句末标点}]+')
+        self.句子部分 = re.compile(rf'[^{self.句末标点}]*')
+        
+        # 文档ID -> 增量文档状态
+        self.文档状态表: "OrderedDict[str, 增量文档状态]" = OrderedDict()
+        self.最大文档数 = self.配置管理器.获取配置("安全设置.增量审核文档数", 256)
+        
+        # 按自动机缓存可增量判断，词库变化后自动机重建时重新判断
+        self.已检查自动机 = None
+        self.可增量结果 = True
+    
+    def 可增量(self) -> bool:
+        """关键词含句末标点时会跨单元命中，无法按单元累计"""
+        自动机 = self.安全识别器.关键词自动机
+        if self.已检查自动机 is not 自动机:
+            self.可增量结果 = not any(
+                标点 in 关键词 for 关键词 in 自动机.关键词类别 for 标点 in self.句末标点
+            )
+            self.已检查自动机 = 自动机
+        return self.可增量结果
+    
+    def 分析句子单元(self, 单元: str) -> 句子贡献:
+        """对一个句子单元做与全文预处理相同的分析"""
+        识别器 = self.安全识别器
+        原句 = self.句子部分.match(单元).group()
+        句子 = 原句.strip()
+        句首偏移 = len(原句) - len(原句.lstrip())
+        
+        关键词命中 = 识别器.关键词自动机.分类统计(单元)
+        否定位置 = [位置 for 位置列表 in 关键词命中.get("否定词", {}).values() for 位置 in 位置列表]
+        中文词计数: Dict[str, int] = defaultdict(int)
+        for 词 in re.findall(r'[\u4e00-\u9fa5]{2,}', 原句):
+            中文词计数[词] += 1
+        
+        return 句子贡献(
+            长度=len(单元),
+            句长=len(句子),
+            含否定=bool(句子) and any(句首偏移 <= 位置 < 句首偏移 + len(句子) for 位置 in 否定位置),
+            模式命中=tuple(识别器.风险模式引擎.匹配(句子, [句子])) if 句子 else (),
+            命中计数={
+                类别: {关键词: len(位置列表) for 关键词, 位置列表 in 类别命中.items()}
+                for 类别, 类别命中 in 关键词命中.items()
+            },
+            中文词计数=dict(中文词计数),
+            命中位置={
+                类别: {关键词: tuple(位置列表) for 关键词, 位置列表 in 类别命中.items()}
+                for 类别, 类别命中 in 关键词命中.items()
+                if 类别 in 识别器.安全规则库 or 类别 == "自定义关键词"
+            }
+        )
+    
+    @staticmethod
+    def 公共前缀长度(旧列表: List[str], 新列表: List[str]) -> int:
+        """二分查找首部相同的单元数，每次比较是一次C层面的切片比较"""
+        低, 高 = 0, min(len(旧列表), len(新列表))
+        while 低 < 高:
+            中 = (低 + 高 + 1) // 2
+            if 旧列表[:中] == 新列表[:中]:
+                低 = 中
+            else:
+                高 = 中 - 1
+        return 低
+    
+    @staticmethod
+    def 公共后缀长度(旧列表: List[str], 新列表: List[str], 上限: int) -> int:
+        """二分查找尾部相同的单元数，不超过上限"""
+        低, 高 = 0, 上限
+        while 低 < 高:
+            中 = (低 + 高 + 1) // 2
+            if 旧列表[len(旧列表) - 中:] == 新列表[len(新列表) - 中:]:
+                低 = 中
+            else:
+                高 = 中 - 1
+        return 低
+    
+    def 更新文档(self, 文档ID: str, 内容: str, 词库版本: int) -> Tuple[增量文档状态, Dict[str, Any]]:
+        """按新版本内容更新文档状态，返回状态和增量统计"""
+        with self.缓存锁:
+            状态 = self.文档状态表.pop(文档ID, None)
+        if 状态 is None or 状态.词库版本 != 词库版本:
+            状态 = 增量文档状态(词库版本)
+        
+        新单元列表 = self.单元切分.findall(内容)
+        旧单元列表 = 状态.单元列表
+        前缀 = self.公共前缀长度(旧单元列表, 新单元列表)
+        后缀 = self.公共后缀长度(
+            旧单元列表, 新单元列表, min(len(旧单元列表), len(新单元列表)) - 前缀
+        )
+        移除单元 = 旧单元列表[前缀:len(旧单元列表) - 后缀]
+        加入单元 = 新单元列表[前缀:len(新单元列表) - 后缀]
+        
+        # 先计入新单元（移走再加回的单元可复用贡献），再扣除旧单元
+        重新扫描数 = 0
+        for 单元 in 加入单元:
+            贡献 = 状态.贡献表.get(单元)
+            if 贡献 is None:
+                贡献 = 状态.贡献表[单元] = self.分析句子单元(单元)
+                重新扫描数 += 1
+            状态.单元引用数[单元] = 状态.单元引用数.get(单元, 0) + 1
+            状态.累加(贡献, 1)
+        for 单元 in 移除单元:
+            状态.累加(状态.贡献表[单元], -1)
+            状态.单元引用数[单元] -= 1
+            if not 状态.单元引用数[单元]:
+                del 状态.单元引用数[单元]
+                del 状态.贡献表[单元]
+        状态.单元列表 = 新单元列表
+        
+        with self.缓存锁:
+            self.文档状态表[文档ID] = 状态
+            while len(self.文档状态表) > self.最大文档数:
+                self.文档状态表.popitem(last=False)
+        
+        return 状态, {
+            "句子单元数": len(新单元列表),
+            "改动区间单元数": len(加入单元),
+            "重新扫描单元数": 重新扫描数
+        }
+    
+    def 生成扫描结果(self, 状态: 增量文档状态, 内容: str, 上下文: str) -> Tuple[Dict[str, Any], List[str]]:
+        """由累计统计生成与深度语义扫描相同结构的结果，以及命中的自定义关键词"""
+        识别器 = self.安全识别器
+        
+        # 需要命中位置的类别由各单元的单元内位置加上单元起点得到，其余类别只用计数
+        位置汇总: Dict[str, Dict[str, List[int]]] = {}
+        单元起点 = 0
+        for 单元 in 状态.单元列表:
+            for 类别, 类别位置 in 状态.贡献表[单元].命中位置.items():
+                类别汇总 = 位置汇总.setdefault(类别, {})
+                for 关键词, 位置列表 in 类别位置.items():
+                    类别汇总.setdefault(关键词, []).extend(单元起点 + 位置 for 位置 in 位置列表)
+            单元起点 += len(单元)
+        
+        关键词命中: Dict[str, Dict[str, List[int]]] = {}
+        for 类别, 类别计数 in 状态.命中计数.items():
+            if not 类别计数:
+                continue
+            if 类别 in 位置汇总:
+                # 与全文扫描一致，按首次命中（自动机在词尾报告）顺序排列
+                关键词命中[类别] = dict(sorted(
+                    位置汇总[类别].items(), key=lambda 项: 项[1][0] + len(项[0])
+                ))
+            else:
+                关键词命中[类别] = {关键词: [] for 关键词 in 类别计数}
+        
+        表面风险 = 识别器.汇总表面风险(关键词命中, 状态.命中计数)
+        深层风险 = 识别器.组合深层风险(
+            识别器.计算否定调整(状态.否定句子数, 状态.句子数),
+            识别器.计算程度调整(关键词命中.get("程度词", {})),
+            识别器.判定情感倾向(状态.类别命中次数("正面情感词"), 状态.类别命中次数("负面情感词")),
+            识别器.生成模式风险([模式名 for 模式名 in 识别器.风险模式引擎.片段表 if 模式名 in 状态.模式计数])
+        )
+        命中语境 = {语境 for 语境 in 识别器.上下文理解器 if 关键词命中.get(语境)}
+        上下文风险 = 识别器.计算语境调整(命中语境 | 识别器.获取上下文指纹(上下文))
+        
+        语义特征 = {
+            "句子数量": 状态.句子数,
+            "平均句长": 0,
+            "情感密度": 0,
+            "风险词密度": 0,
+            "复杂性评分": 0
+        }
+        if 状态.句子数:
+            语义特征["平均句长"] = 状态.句长总和 / 状态.句子数
+            情感词总数 = 状态.类别命中次数("正面情感词") + 状态.类别命中次数("负面情感词")
+            语义特征["情感密度"] = 情感词总数 / len(内容) if 内容 else 0
+            风险词总数 = sum(状态.类别命中次数(风险类型) for 风险类型 in 识别器.安全规则库)
+            语义特征["风险词密度"] = 风险词总数 / len(内容) if 内容 else 0
+            语义特征["复杂性评分"] = 识别器.由统计计算复杂性评分(
+                len(内容), 状态.句长分布, len(状态.中文词计数), 状态.中文词总数
+            )
+        
+        return {
+            "表面风险": 表面风险,
+            "深层风险": 深层风险,
+            "语义分析": 语义特征,
+            "上下文风险评估": 上下文风险,
+            "总体风险评分": 识别器.计算总体风险评分(表面风险, 深层风险, 上下文风险)
+        }, list(关键词命中.get("自定义关键词", {}).keys())
+    
+    def 移除文档(self, 文档ID: str):
+        """丢弃某文档的增量状态"""
+        with self.缓存锁:
+            self.文档状态表.pop(文档ID, None)
+
+class 感知哈希索引:
+    """感知哈希BK树
+    
+    按汉明距离组织已审核图像的64位感知哈希。查询距离k以内的近似图像时，
+    利用三角不等式只进入距离在 [d-k, d+k] 范围内的子树，不必遍历全部图像。
+    """
+    def __init__(self, 最大条目数: int = 100000):
+        self.最大条目数 = 最大条目数
+        # 节点: [哈希值, 数据, {距离: 子节点}]
+        self.根节点 = None
+        self.条目数 = 0
+    
+    @staticmethod
+    def 汉明距离(哈希1: int, 哈希2: int) -> int:
+        return bin(哈希1 ^ 哈希2).count("1")
+    
+    def __len__(self) -> int:
+        return self.条目数
+    
+    def 添加(self, 哈希值: int, 数据: Any) -> bool:
+        """插入一条哈希；已有相同哈希时保留最早的数据，索引已满返回False"""
+        if self.根节点 is None:
+            self.根节点 = [哈希值, 数据, {}]
+            self.条目数 = 1
+            return True
+        
+        节点 = self.根节点
+        while True:
+            距离 = self.汉明距离(哈希值, 节点[0])
+            if 距离 == 0:
+                # 不覆盖：复用来源保持为最早完整分析的那张图像
+                return True
+            子节点 = 节点[2].get(距离)
+            if 子节点 is None:
+                if self.条目数 >= self.最大条目数:
+                    return False
+                节点[2][距离] = [哈希值, 数据, {}]
+                self.条目数 += 1
+                return True
+            节点 = 子节点
+    
+    def 查询(self, 哈希值: int, 最大距离: int) -> List[Tuple[int, Any]]:
+        """返回距离不超过 最大距离 的 (距离, 数据)，按距离升序"""
+        结果 = []
+        待访问 = [self.根节点] if self.根节点 is not None else []
+        while 待访问:
+            节点 = 待访问.pop()
+            距离 = self.汉明距离(哈希值, 节点[0])
+            if 距离 <= 最大距离:
+                结果.append((距离, 节点[1]))
+            for 子距离, 子节点 in 节点[2].items():
+                if 距离 - 最大距离 <= 子距离 <= 距离 + 最大距离:
+                    待访问.append(子节点)
+        结果.sort(key=lambda 项: 项[0])
+        return 结果
+
 class 视觉内容分析器:
-    """视觉内容分析器（模拟实现）"""
+    """视觉内容分析器
+    
+    图像在本地解码一次并缩小到分析尺寸，提取颜色直方图、肤色占比、
+    感知哈希等廉价特征，再用特征矩阵批量打分。结果按文件内容哈希缓存，
+    未变化的封面重复审核时不再解码；与已审核图像感知哈希相近的图像
+    （重新裁剪、重新压缩）直接复用已有判定。视频按采样帧率抽取关键帧，
+    复用同一套特征和打分器。
+    """
+    支持的图像格式 = ('.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp')
+    特征名称 = ("肤色占比", "红色占比", "暗部占比", "饱和度均值", "亮度标准差")
+    
     def __init__(self):
         self.配置管理器 = 获取配置管理器()
         self.日志器 = logging.getLogger('视觉内容分析器')
         
-        # 图像分析规则（模拟）
+        # 图像分析规则
         self.图像分析规则 = self.初始化图像分析规则()
+        self.构建评分矩阵()
+        
+        # 分析结果缓存：内容哈希 -> 分析结果；(路径, 大小, 修改时间) -> 内容哈希
+        self.缓存锁 = threading.Lock()
+        self.图像结果缓存: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.文件哈希缓存: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()
+        self.缓存统计 = {"命中次数": 0, "未命中次数": 0, "近似复用次数": 0}
+        self.缓存条目数 = self.配置管理器.获取配置("安全设置.图像缓存条目数", 1024)
+        self.分析尺寸 = self.配置管理器.获取配置("安全设置.图像分析尺寸", 256)
+        
+        # 已完整分析图像的感知哈希索引，数据为判定摘要
+        self.近似图像索引 = 感知哈希索引(self.配置管理器.获取配置("安全设置.近似图像索引条目数", 100000))
+        self.近似复用 = self.配置管理器.获取配置("安全设置.近似图像复用", True)
+        self.近似汉明距离 = self.配置管理器.获取配置("安全设置.近似图像汉明距离", 6)
+        self.近似直方图距离 = self.配置管理器.获取配置("安全设置.近似图像直方图距离", 0.3)
     
     def 初始化图像分析规则(self) -> Dict[str, Any]:
-        """初始化图像分析规则"""
+        """初始化图像分析规则
+        
+        特征权重为各特征在逻辑回归中的系数，偏置决定特征为0时的基础概率；
+        没有特征权重的类别无法从像素统计判断，不参与打分。
+        """
         return {
             "色情内容": {
                 "风险权重": 0.9,
-                "描述": "检测裸露或性暗示内容"
+                "描述": "检测裸露或性暗示内容",
+                "特征权重": {"肤色占比": 12.0},
+                "偏置": -6.0,
+                "提示": "肤色区域占比较高"
             },
             "暴力内容": {
                 "风险权重": 0.8,
-                "描述": "检测暴力、血腥画面"
+                "描述": "检测暴力、血腥画面",
+                "特征权重": {"红色占比": 15.0, "暗部占比": 2.0},
+                "偏置": -5.0,
+                "提示": "大面积暗红色区域"
             },
             "敏感符号": {
                 "风险权重": 0.7,
@@ -489,91 +1445,445 @@ class 视觉内容分析器:
             },
             "恐怖内容": {
                 "风险权重": 0.95,
-                "描述": "检测恐怖主义相关内容"
+                "描述": "检测恐怖主义相关内容",
+                "特征权重": {"暗部占比": 6.0, "饱和度均值": -3.0, "亮度标准差": -2.0},
+                "偏置": -5.0,
+                "提示": "画面整体昏暗压抑"
             }
         }
     
-    def 分析图像内容(self, 图像路径: str) -> Dict[str, Any]:
-        """分析图像内容（模拟实现）"""
-        # 在实际系统中，这里应该集成真实的图像识别API
-        # 由于环境限制，我们返回模拟结果
+    def 构建评分矩阵(self):
+        """把规则中的特征权重整理为 特征数×类别数 的矩阵"""
+        self.评分类别 = [类别 for 类别, 规则 in self.图像分析规则.items() if "特征权重" in 规则]
+        self.权重矩阵 = np.zeros((len(self.特征名称), len(self.评分类别)))
+        self.偏置向量 = np.zeros(len(self.评分类别))
+        self.风险权重向量 = np.zeros(len(self.评分类别))
+        
+        for 列, 类别 in enumerate(self.评分类别):
+            规则 = self.图像分析规则[类别]
+            for 特征, 权重 in 规则["特征权重"].items():
+                self.权重矩阵[self.特征名称.index(特征), 列] = 权重
+            self.偏置向量[列] = 规则["偏置"]
+            self.风险权重向量[列] = 规则["风险权重"]
+    
+    def 清空缓存(self):
+        """清空分析结果缓存、文件哈希缓存和近似图像索引"""
+        with self.缓存锁:
+            self.图像结果缓存.clear()
+            self.文件哈希缓存.clear()
+            self.近似图像索引 = 感知哈希索引(self.近似图像索引.最大条目数)
+    
+    def 计算文件哈希(self, 图像路径: str) -> str:
+        """文件内容哈希，文件大小和修改时间未变时复用上次结果"""
+        状态 = os.stat(图像路径)
+        文件标识 = (os.path.abspath(图像路径), 状态.st_size, 状态.st_mtime_ns)
+        with self.缓存锁:
+            内容哈希 = self.文件哈希缓存.get(文件标识)
+        if 内容哈希:
+            return 内容哈希
+        
+        哈希器 = hashlib.sha1()
+        with open(图像路径, 'rb') as f:
+            for 数据块 in iter(lambda: f.read(1 << 20), b""):
+                哈希器.update(数据块)
+        内容哈希 = 哈希器.hexdigest()
+        
+        with self.缓存锁:
+            self.文件哈希缓存[文件标识] = 内容哈希
+            while len(self.文件哈希缓存) > self.缓存条目数:
+                self.文件哈希缓存.popitem(last=False)
+        return 内容哈希
+    
+    def 解码图像(self, 图像路径: str) -> np.ndarray:
+        """解码并缩小图像，返回 高×宽×3 的uint8数组
+        
+        JPEG通过draft在解码阶段按比例降采样，大图不会以原始分辨率载入内存。
+        """
+        with Image.open(图像路径) as 图像:
+            图像.draft("RGB", (self.分析尺寸, self.分析尺寸))
+            图像 = 图像.convert("RGB")
+            图像.thumbnail((self.分析尺寸, self.分析尺寸))
+            return np.asarray(图像, dtype=np.uint8)
+    
+    def 计算亮度(self, 像素: np.ndarray) -> np.ndarray:
+        """RGB像素转亮度"""
+        return 0.299 * 像素[..., 0] + 0.587 * 像素[..., 1] + 0.114 * 像素[..., 2]
+    
+    def 提取图像特征(self, 像素: np.ndarray, 感知哈希: str = None) -> Dict[str, Any]:
+        """提取颜色直方图、肤色占比、感知哈希等特征"""
+        像素 = 像素.astype(np.int16)
+        红, 绿, 蓝 = 像素[..., 0], 像素[..., 1], 像素[..., 2]
+        最大值 = 像素.max(axis=2)
+        最小值 = 像素.min(axis=2)
+        亮度 = self.计算亮度(像素)
+        
+        # RGB空间的经典肤色规则
+        肤色 = ((红 > 95) & (绿 > 40) & (蓝 > 20) & (最大值 - 最小值 > 15)
+                & (np.abs(红 - 绿) > 15) & (红 > 绿) & (红 > 蓝))
+        红色 = (红 > 120) & (绿 < 80) & (蓝 < 80)
+        饱和度 = np.where(最大值 > 0, (最大值 - 最小值) / np.maximum(最大值, 1), 0)
+        
+        直方图 = self.计算颜色直方图(像素)
+        
+        return {
+            "特征向量": np.array([
+                肤色.mean(),
+                红色.mean(),
+                (亮度 < 40).mean(),
+                饱和度.mean(),
+                亮度.std() / 128.0
+            ]),
+            "颜色直方图": [round(float(值), 4) for 值 in 直方图],
+            "感知哈希": 感知哈希 or self.计算感知哈希(亮度),
+            "尺寸": [int(像素.shape[1]), int(像素.shape[0])]
+        }
+    
+    def 计算颜色直方图(self, 像素: np.ndarray) -> np.ndarray:
+        """每通道8个区间的归一化颜色直方图（24维）"""
+        return np.concatenate([
+            np.bincount((像素[..., 通道] >> 5).ravel(), minlength=8) for 通道 in range(3)
+        ]) / (像素.shape[0] * 像素.shape[1])
+    
+    def 计算感知哈希(self, 亮度: np.ndarray) -> str:
+        """32×32灰度图做二维DCT，取左上8×8低频系数与中位数比较得到64位哈希"""
+        高, 宽 = 亮度.shape
+        if 高 >= 32 and 宽 >= 32:
+            # 分块取均值缩到32×32，比取点抗锯齿，裁剪和重新压缩后哈希更稳定
+            块高, 块宽 = 高 // 32, 宽 // 32
+            缩略 = 亮度[:块高 * 32, :块宽 * 32].reshape(32, 块高, 32, 块宽).mean(axis=(1, 3))
+        else:
+            缩略 = 亮度[np.ix_(np.arange(32) * 高 // 32, np.arange(32) * 宽 // 32)]
+        
+        下标 = np.arange(32)
+        变换矩阵 = np.cos(np.pi * (2 * 下标[None, :] + 1) * 下标[:, None] / 64)
+        低频 = (变换矩阵 @ 缩略 @ 变换矩阵.T)[:8, :8].ravel()
+        位 = 低频 > np.median(低频[1:])
+        return f"{int(''.join('1' if 值 else '0' for 值 in 位), 2):016x}"
+    
+    def 批量打分(self, 特征矩阵: np.ndarray) -> np.ndarray:
+        """特征矩阵(N×特征数) -> 各类别风险概率(N×类别数)"""
+        return 1.0 / (1.0 + np.exp(-(特征矩阵 @ self.权重矩阵 + self.偏置向量)))
+    
+    def 生成图像分析结果(self, 特征: Dict[str, Any], 类别概率: np.ndarray, 内容哈希: str) -> Dict[str, Any]:
+        """由特征和类别概率组装分析结果"""
+        加权评分 = 类别概率 * self.风险权重向量
+        风险评分 = float(加权评分.max()) if len(加权评分) else 0.0
+        
+        检测到的元素 = [
+            f"{self.图像分析规则[类别]['提示']}（{类别} {概率:.0%}）"
+            for 类别, 概率 in zip(self.评分类别, 类别概率) if 概率 > 0.5
+        ]
+        
+        if 风险评分 > 0.7:
+            等级, 置信度 = 风险等级.高风险, 0.8
+        elif 风险评分 > 0.4:
+            等级, 置信度 = 风险等级.中风险, 0.6
+        else:
+            等级, 置信度 = 风险等级.安全, 0.9
+        
+        return {
+            "分析状态": "分析完成",
+            "检测到的元素": 检测到的元素 or ["未检测到明显风险"],
+            "风险评分": 风险评分,
+            "风险等级": 等级,
+            "置信度": 置信度,
+            "分析详情": {
+                "内容哈希": 内容哈希,
+                "尺寸": 特征["尺寸"],
+                "感知哈希": 特征["感知哈希"],
+                "颜色直方图": 特征["颜色直方图"],
+                "特征": {名称: round(float(值), 4) for 名称, 值 in zip(self.特征名称, 特征["特征向量"])},
+                "类别评分": {类别: round(float(概率), 4) for 类别, 概率 in zip(self.评分类别, 类别概率)}
+            }
+        }
+    
+    def 查找近似图像(self, 感知哈希: str, 直方图: np.ndarray, 内容哈希: str) -> Optional[Dict[str, Any]]:
+        """在感知哈希索引中查找近似图像，命中时复用其中风险最高的判定
+        
+        感知哈希只反映亮度结构，候选还要求颜色直方图的L1距离足够小，
+        避免亮度结构相近但颜色完全不同的图像误用判定。
+        """
+        if not self.近似复用:
+            return None
+        with self.缓存锁:
+            近似列表 = self.近似图像索引.查询(int(感知哈希, 16), self.近似汉明距离)
+        近似列表 = [
+            (距离, 判定) for 距离, 判定 in 近似列表
+            if np.abs(判定["颜色直方图"] - 直方图).sum() <= self.近似直方图距离
+        ]
+        if not 近似列表:
+            return None
         
-        模拟结果 = {
-            "分析状态": "模拟分析完成",
+        距离, 判定 = max(近似列表, key=lambda 项: (项[1]["风险评分"], -项[0]))
+        with self.缓存锁:
+            self.缓存统计["近似复用次数"] += 1
+        return {
+            "分析状态": "复用近似图像判定",
+            "检测到的元素": list(判定["检测到的元素"]),
+            "风险评分": 判定["风险评分"],
+            "风险等级": 判定["风险等级"],
+            "置信度": 判定["置信度"],
+            "分析详情": {
+                "内容哈希": 内容哈希,
+                "感知哈希": 感知哈希,
+                "复用来源": 判定["内容哈希"],
+                "汉明距离": 距离
+            }
+        }
+    
+    def 写入结果缓存(self, 内容哈希: str, 结果: Dict[str, Any]):
+        """写入内容哈希缓存，超出条目数时淘汰最久未用的结果"""
+        with self.缓存锁:
+            self.图像结果缓存[内容哈希] = copy.deepcopy(结果)
+            while len(self.图像结果缓存) > self.缓存条目数:
+                self.图像结果缓存.popitem(last=False)
+    
+    def 创建图像异常结果(self, 分析状态: str, 等级: 风险等级) -> Dict[str, Any]:
+        """无法分析时的结果"""
+        return {
+            "分析状态": 分析状态,
             "检测到的元素": [],
             "风险评分": 0.0,
-            "风险等级": 风险等级.安全,
+            "风险等级": 等级,
             "置信度": 0.0,
-            "分析详情": "这是模拟的图像分析结果"
+            "分析详情": 分析状态
         }
-        
-        # 模拟分析逻辑
-        try:
-            # 检查文件扩展名（模拟内容类型判断）
-            文件扩展名 = Path(图像路径).suffix.lower()
-            if 文件扩展名 in ['.jpg', '.jpeg', '.png', '.gif']:
-                # 模拟风险检测
-                随机风险 = hash(图像路径) % 100 / 100.0  # 基于文件名的伪随机风险
+    
+    def 批量分析图像(self, 图像路径列表: List[str]) -> List[Dict[str, Any]]:
+        """批量分析图像
+        
+        先按内容哈希查缓存；未命中的解码后先查感知哈希索引，有近似图像则复用
+        判定，否则提取特征，最后一次打分。
+        """
+        结果列表: List[Optional[Dict[str, Any]]] = [None] * len(图像路径列表)
+        待打分: List[Tuple[int, str, bool, Dict[str, Any]]] = []
+        
+        for 序号, 图像路径 in enumerate(图像路径列表):
+            if Path(图像路径).suffix.lower() not in self.支持的图像格式:
+                结果列表[序号] = self.创建图像异常结果("不支持的图像格式", 风险等级.低风险)
+                continue
+            
+            try:
+                内容哈希 = self.计算文件哈希(图像路径)
+                with self.缓存锁:
+                    缓存结果 = self.图像结果缓存.get(内容哈希)
+                    if 缓存结果 is not None:
+                        self.图像结果缓存.move_to_end(内容哈希)
+                        self.缓存统计["命中次数"] += 1
+                        结果列表[序号] = copy.deepcopy(缓存结果)
+                        continue
+                    self.缓存统计["未命中次数"] += 1
                 
-                if 随机风险 > 0.7:
-                    模拟结果["风险评分"] = 随机风险
-                    模拟结果["风险等级"] = 风险等级.高风险
-                    模拟结果["检测到的元素"] = ["模拟检测到潜在敏感内容"]
-                    模拟结果["置信度"] = 0.8
-                elif 随机风险 > 0.4:
-                    模拟结果["风险评分"] = 随机风险
-                    模拟结果["风险等级"] = 风险等级.中风险
-                    模拟结果["检测到的元素"] = ["模拟检测到可能敏感内容"]
-                    模拟结果["置信度"] = 0.6
-                else:
-                    模拟结果["风险评分"] = 随机风险
-                    模拟结果["风险等级"] = 风险等级.安全
-                    模拟结果["检测到的元素"] = ["未检测到明显风险"]
-                    模拟结果["置信度"] = 0.9
-            else:
-                模拟结果["分析状态"] = "不支持的图像格式"
-               模拟结果["风险等级"] = 风险等级.低风险
-        
-        except Exception as e:
-            模拟结果["分析状态"] = f"分析失败: {e}"
-           模拟结果["风险等级"] = 风险等级.中风险
-        
-        return 模拟结果
+                if Image is None:
+                    结果列表[序号] = self.创建图像异常结果("缺少图像解码库PIL，无法分析", 风险等级.中风险)
+                    continue
+                
+                像素 = self.解码图像(图像路径)
+                亮度 = self.计算亮度(像素.astype(np.float32))
+                感知哈希 = self.计算感知哈希(亮度)
+                # 纯色或近乎无纹理的图像感知哈希只是噪声，不参与近似复用
+                可索引 = bool(亮度.std() >= 2.0)
+                if 可索引:
+                    近似结果 = self.查找近似图像(感知哈希, self.计算颜色直方图(像素), 内容哈希)
+                    if 近似结果 is not None:
+                        结果列表[序号] = 近似结果
+                        self.写入结果缓存(内容哈希, 近似结果)
+                        continue
+                
+                待打分.append((序号, 内容哈希, 可索引, self.提取图像特征(像素, 感知哈希)))
+            except Exception as e:
+                结果列表[序号] = self.创建图像异常结果(f"分析失败: {e}", 风险等级.中风险)
+        
+        if 待打分:
+            概率矩阵 = self.批量打分(np.stack([特征["特征向量"] for _, _, _, 特征 in 待打分]))
+            for (序号, 内容哈希, 可索引, 特征), 类别概率 in zip(待打分, 概率矩阵):
+                结果 = self.生成图像分析结果(特征, 类别概率, 内容哈希)
+                结果列表[序号] = 结果
+                self.写入结果缓存(内容哈希, 结果)
+                if not 可索引:
+                    continue
+                with self.缓存锁:
+                    self.近似图像索引.添加(int(特征["感知哈希"], 16), {
+                        "内容哈希": 内容哈希,
+                        "颜色直方图": np.array(特征["颜色直方图"]),
+                        "风险评分": 结果["风险评分"],
+                        "风险等级": 结果["风险等级"],
+                        "置信度": 结果["置信度"],
+                        "检测到的元素": 结果["检测到的元素"]
+                    })
+        
+        return 结果列表
+    
+    def 分析图像内容(self, 图像路径: str) -> Dict[str, Any]:
+        """分析图像内容"""
+        return self.批量分析图像([图像路径])[0]
+    
+    def 读取视频关键帧(self, 视频路径: str, 采样帧率: float) -> Iterator[Tuple[float, np.ndarray]]:
+        """按采样帧率逐帧产出 (时间点, 缩小后的像素)，不把整个视频载入内存
+        
+        GIF/WebP动图用PIL逐帧读取；其他格式由ffmpeg按帧率抽帧、缩放后
+        以PPM流输出到管道。生成器关闭时终止ffmpeg进程。ffmpeg异常退出或
+        输出被截断时，即使已经产出部分帧也抛出异常。
+        """
+        if Path(视频路径).suffix.lower() in ('.gif', '.webp') and Image is not None:
+            yield from self.读取动图关键帧(视频路径, 采样帧率)
+            return
+        
+        ffmpeg路径 = self.配置管理器.获取配置("安全设置.ffmpeg路径", None) or shutil.which("ffmpeg")
+        if not ffmpeg路径:
+            raise RuntimeError("未找到ffmpeg，无法解码视频")
+        
+        尺寸 = self.分析尺寸
+        进程 = subprocess.Popen(
+            [ffmpeg路径, "-v", "error", "-i", 视频路径,
+             "-vf", f"fps={采样帧率},scale={尺寸}:{尺寸}:force_original_aspect_ratio=decrease",
+             "-f", "image2pipe", "-vcodec", "ppm", "-"],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        )
+        try:
+            帧序号 = 0
+            while True:
+                # PPM帧头: P6\n宽 高\n255\n
+                魔数 = 进程.stdout.readline()
+                if not 魔数:
+                    break
+                宽, 高 = map(int, 进程.stdout.readline().split())
+                进程.stdout.readline()
+                数据 = 进程.stdout.read(宽 * 高 * 3)
+                if len(数据) < 宽 * 高 * 3:
+                    raise RuntimeError(f"ffmpeg输出在第{帧序号 + 1}帧处被截断")
+                yield 帧序号 / 采样帧率, np.frombuffer(数据, dtype=np.uint8).reshape(高, 宽, 3)
+                帧序号 += 1
+            
+            返回码 = 进程.wait()
+            if 返回码 != 0:
+                raise RuntimeError(f"ffmpeg解码失败（返回码{返回码}，已解码{帧序号}帧）")
+        finally:
+            if 进程.poll() is None:
+                进程.kill()
+                进程.wait()
+            进程.stdout.close()
+    
+    def 读取动图关键帧(self, 视频路径: str, 采样帧率: float) -> Iterator[Tuple[float, np.ndarray]]:
+        """逐帧读取动图，按帧持续时间换算时间点后采样"""
+        采样间隔 = 1.0 / 采样帧率
+        with Image.open(视频路径) as 图像:
+            当前时间 = 0.0
+            下次采样 = 0.0
+            for 帧序号 in range(getattr(图像, "n_frames", 1)):
+                图像.seek(帧序号)
+                if 当前时间 >= 下次采样:
+                    帧 = 图像.convert("RGB")
+                    帧.thumbnail((self.分析尺寸, self.分析尺寸))
+                    yield 当前时间, np.asarray(帧, dtype=np.uint8)
+                    下次采样 += 采样间隔 * (int((当前时间 - 下次采样) / 采样间隔) + 1)
+                当前时间 += 图像.info.get("duration", 100) / 1000.0
     
     def 分析视频内容(self, 视频路径: str) -> Dict[str, Any]:
-        """分析视频内容（模拟实现）"""
-        # 视频分析通常更复杂，涉及多帧分析和音频分析
-        模拟结果 = {
-            "分析状态": "模拟视频分析完成",
+        """分析视频内容
+        
+        关键帧按批送入与图像相同的矩阵打分器，任一帧风险评分超过提前终止
+        阈值即停止解码。扫描耗时和扫描期间的进程峰值内存写入结果。
+        """
+        采样帧率 = self.配置管理器.获取配置("安全设置.视频采样帧率", 1.0)
+        批大小 = self.配置管理器.获取配置("安全设置.视频批大小", 16)
+        最大帧数 = self.配置管理器.获取配置("安全设置.视频最大采样帧数", 3600)
+        终止阈值 = self.配置管理器.获取配置("安全设置.视频提前终止阈值", 0.7)
+        
+        扫描开始 = time.time()
+        当前进程 = psutil.Process()
+        峰值内存 = 当前进程.memory_info().rss
+        
+        已扫描帧数 = 0
+        最后时间点 = 0.0
+        提前终止 = False
+        达到帧数上限 = False
+        解码失败 = False
+        最高评分 = 0.0
+        风险帧: List[Dict[str, Any]] = []
+        类别最高评分 = {类别: 0.0 for 类别 in self.评分类别}
+        
+        def 打分(批次: List[Tuple[float, Dict[str, Any]]]):
+            nonlocal 最高评分
+            概率矩阵 = self.批量打分(np.stack([特征["特征向量"] for _, 特征 in 批次]))
+            for (时间点, 特征), 类别概率 in zip(批次, 概率矩阵):
+                帧评分 = float((类别概率 * self.风险权重向量).max()) if len(类别概率) else 0.0
+                for 类别, 概率 in zip(self.评分类别, 类别概率):
+                    类别最高评分[类别] = max(类别最高评分[类别], float(概率))
+                if 帧评分 > 0.4:
+                    风险帧.append({
+                        "时间点_秒": round(时间点, 2),
+                        "风险评分": round(帧评分, 4),
+                        "感知哈希": 特征["感知哈希"],
+                        "类别评分": {类别: round(float(概率), 4) for 类别, 概率 in zip(self.评分类别, 类别概率)}
+                    })
+                最高评分 = max(最高评分, 帧评分)
+        
+        分析结果 = {
+            "分析状态": "视频分析完成",
             "视频时长": "未知",
             "关键帧分析": [],
             "音频分析": {},
             "风险评分": 0.0,
             "风险等级": 风险等级.安全,
-            "分析详情": "这是模拟的视频分析结果"
+            "分析详情": {}
         }
         
+        关键帧 = self.读取视频关键帧(视频路径, 采样帧率)
         try:
-            # 模拟视频分析
-            随机风险 = hash(视频路径) % 100 / 100.0
+            批次: List[Tuple[float, Dict[str, Any]]] = []
+            for 时间点, 像素 in 关键帧:
+                批次.append((时间点, self.提取图像特征(像素)))
+                已扫描帧数 += 1
+                最后时间点 = 时间点
+                
+                if len(批次) >= 批大小 or 已扫描帧数 >= 最大帧数:
+                    打分(批次)
+                    批次 = []
+                    峰值内存 = max(峰值内存, 当前进程.memory_info().rss)
+                    if 最高评分 > 终止阈值:
+                        提前终止 = True
+                        break
+                    if 已扫描帧数 >= 最大帧数:
+                        达到帧数上限 = True
+                        break
             
-            if 随机风险 > 0.8:
-                模拟结果["风险评分"] = 随机风险
-                模拟结果["风险等级"] = 风险等级.高风险
-                模拟结果["关键帧分析"] = ["模拟检测到多帧敏感内容"]
-            elif 随机风险 > 0.5:
-                模拟结果["风险评分"] = 随机风险
-                模拟结果["风险等级"] = 风险等级.中风险
-                模拟结果["关键帧分析"] = ["模拟检测到部分敏感内容"]
-            else:
-                模拟结果["风险评分"] = 随机风险
-                模拟结果["风险等级"] = 风险等级.安全
-                模拟结果["关键帧分析"] = ["未检测到明显风险"]
-        
+            if 批次:
+                打分(批次)
+                峰值内存 = max(峰值内存, 当前进程.memory_info().rss)
         except Exception as e:
-            模拟结果["分析状态"] = f"分析失败: {e}"
+            分析结果["分析状态"] = f"分析失败: {e}"
+            解码失败 = True
+        finally:
+            关键帧.close()
+        
+        if 最高评分 > 0.7:
+            分析结果["风险等级"] = 风险等级.高风险
+        elif 最高评分 > 0.4 or 解码失败 or 达到帧数上限 or not 已扫描帧数:
+            # 没有看完整个视频时不能判定为安全，至少按中风险交人工复核
+            分析结果["风险等级"] = 风险等级.中风险
+        
+        if 已扫描帧数 and not (提前终止 or 达到帧数上限 or 解码失败):
+            分析结果["视频时长"] = round(最后时间点 + 1.0 / 采样帧率, 2)
+        
+        分析结果["风险评分"] = 最高评分
+        分析结果["关键帧分析"] = [
+            f"{帧['时间点_秒']}秒处检测到潜在敏感画面（评分{帧['风险评分']:.2f}）"
+            for 帧 in sorted(风险帧, key=lambda 帧: -帧["风险评分"])[:10]
+        ] or (["未检测到明显风险"] if 已扫描帧数 else [])
+        分析结果["分析详情"] = {
+            "采样帧率": 采样帧率,
+            "已扫描帧数": 已扫描帧数,
+            "提前终止": 提前终止,
+            "达到帧数上限": 达到帧数上限,
+            "解码失败": 解码失败,
+            "类别最高评分": {类别: round(评分, 4) for 类别, 评分 in 类别最高评分.items()},
+            "风险帧": 风险帧[:20]
+        }
+        分析结果["扫描耗时_秒"] = round(time.time() - 扫描开始, 4)
+        分析结果["峰值内存_MB"] = round(峰值内存 / (1024 * 1024), 2)
         
-        return 模拟结果
+        return 分析结果
 
 class 文本语义扫描器:
     """文本语义扫描器"""
@@ -582,29 +1892,21 @@ class 文本语义扫描器:
         self.安全识别器 = Google级安全识别器()
         self.日志器 = logging.getLogger('文本语义扫描器')
         
-    def 扫描文本内容(self, 内容: str, 上下文: str = "") -> Dict[str, Any]:
-        """扫描文本内容"""
+    def 扫描文本内容(self, 内容: str, 上下文: str = "", 文档: 已分析文档 = None,
+                     阶段耗时: Dict[str, float] = None) -> Dict[str, Any]:
+        """扫描文本内容，各阶段耗时（毫秒）写入扫描报告"""
         扫描开始时间 = time.time()
+        阶段耗时 = {} if 阶段耗时 is None else 阶段耗时
         
         try:
-            # 深度语义扫描
-            语义扫描结果 = self.安全识别器.深度语义扫描(内容, 上下文)
+            if 文档 is None:
+                with 阶段计时(阶段耗时, "关键词扫描"):
+                    文档 = self.安全识别器.分析文档(内容)
             
-            # 风险评估
-            风险等级 = self.评估风险等级(语义扫描结果["总体风险评分"])
-            
-            # 生成扫描报告
-            扫描报告 = {
-                "扫描状态": "完成",
-                "扫描时间": time.time() - 扫描开始时间,
-                "内容长度": len(内容),
-                "风险等级": 风险等级,
-                "风险评分": 语义扫描结果["总体风险评分"],
-                "详细分析": 语义扫描结果,
-                "建议措施": self.生成建议措施(语义扫描结果, 风险等级)
-            }
+            # 深度语义扫描
+            语义扫描结果 = self.安全识别器.深度语义扫描(内容, 上下文, 文档, 阶段耗时)
             
-            return 扫描报告
+            return self.生成扫描报告(内容, 语义扫描结果, 扫描开始时间, 阶段耗时)
             
         except Exception as e:
             self.日志器.error(f"文本扫描失败: {e}")
@@ -616,6 +1918,22 @@ class 文本语义扫描器:
                 "建议措施": ["扫描失败，建议人工审核"]
             }
     
+    def 生成扫描报告(self, 内容: str, 语义扫描结果: Dict[str, Any], 扫描开始时间: float,
+                     阶段耗时: Dict[str, float]) -> Dict[str, Any]:
+        """由深度语义扫描结果生成扫描报告"""
+        风险等级 = self.评估风险等级(语义扫描结果["总体风险评分"])
+        
+        return {
+            "扫描状态": "完成",
+            "扫描时间": time.time() - 扫描开始时间,
+            "内容长度": len(内容),
+            "风险等级": 风险等级,
+            "风险评分": 语义扫描结果["总体风险评分"],
+            "详细分析": 语义扫描结果,
+            "建议措施": self.生成建议措施(语义扫描结果, 风险等级),
+            "阶段耗时_毫秒": 阶段耗时
+        }
+    
     def 评估风险等级(self, 风险评分: float) -> 风险等级:
         """根据风险评分评估风险等级"""
         if 风险评分 >= 0.8:
@@ -629,6 +1947,11 @@ class 文本语义扫描器:
         else:
             return 风险等级.安全
     
+    def 批量评估风险等级(self, 风险评分: np.ndarray) -> List[风险等级]:
+        """按与评估风险等级相同的阈值批量划分风险等级"""
+        等级表 = [风险等级.安全, 风险等级.低风险, 风险等级.中风险, 风险等级.高风险, 风险等级.危险]
+        return [等级表[序号] for 序号 in np.digitize(风险评分, [0.2, 0.4, 0.6, 0.8])]
+    
     def 生成建议措施(self, 扫描结果: Dict[str, Any], 风险等级: 风险等级) -> List[str]:
         """生成建议措施"""
         措施列表 = []
@@ -663,32 +1986,91 @@ class 文本语义扫描器:
         
         return 措施列表
 
+class 滑动窗口计数器:
+    """固定内存的时间分桶计数器（环形缓冲区）
+    
+    每个桶覆盖 桶宽_秒 秒，共 桶数 个桶循环复用。写入只触碰一个桶，
+    查询遍历全部桶，内存与写入频率无关。
+    """
+    def __init__(self, 桶宽_秒: int, 桶数: int):
+        self.桶宽 = 桶宽_秒
+        self.桶数 = 桶数
+        self.计数 = [0] * 桶数
+        self.桶编号 = [-1] * 桶数  # 每个槽位当前存放的是第几个时间桶
+        self.计数锁 = threading.Lock()
+    
+    def 记录(self, 时间戳: float = None, 数量: int = 1):
+        """在时间戳所在的桶上累加计数"""
+        桶号 = int((时间戳 if 时间戳 is not None else time.time()) // self.桶宽)
+        槽位 = 桶号 % self.桶数
+        with self.计数锁:
+            if self.桶编号[槽位] > 桶号:
+                return  # 比缓冲区覆盖范围更早的迟到数据直接丢弃
+            if self.桶编号[槽位] != 桶号:
+                # 槽位里是已过期的旧桶，直接覆盖
+                self.桶编号[槽位] = 桶号
+                self.计数[槽位] = 0
+            self.计数[槽位] += 数量
+    
+    def 统计(self, 窗口_秒: float, 当前时间: float = None) -> int:
+        """统计最近 窗口_秒 秒内的计数（以桶为粒度）"""
+        当前桶号 = int((当前时间 if 当前时间 is not None else time.time()) // self.桶宽)
+        最早桶号 = 当前桶号 - min(int(-(-窗口_秒 // self.桶宽)), self.桶数) + 1
+        with self.计数锁:
+            return sum(
+                计数 for 计数, 桶号 in zip(self.计数, self.桶编号)
+                if 最早桶号 <= 桶号 <= 当前桶号
+            )
+
+class 时间序列指标:
+    """单个监控指标：秒级桶覆盖最近5分钟，分钟级桶覆盖最近1小时"""
+    def __init__(self):
+        self.秒级 = 滑动窗口计数器(1, 300)
+        self.分钟级 = 滑动窗口计数器(60, 60)
+    
+    def 记录(self, 时间戳: float = None, 数量: int = 1):
+        """记录一次指标"""
+        时间戳 = 时间戳 if 时间戳 is not None else time.time()
+        self.秒级.记录(时间戳, 数量)
+        self.分钟级.记录(时间戳, 数量)
+    
+    def 统计(self, 窗口_秒: float, 当前时间: float = None) -> int:
+        """5分钟以内的窗口用秒级桶，更长的窗口用分钟级桶"""
+        if 窗口_秒 <= self.秒级.桶宽 * self.秒级.桶数:
+            return self.秒级.统计(窗口_秒, 当前时间)
+        return self.分钟级.统计(窗口_秒, 当前时间)
+
 class 实时风险监控器:
     """实时风险监控器"""
-    def __init__(self):
+    def __init__(self, 启动监控: bool = True):
         self.配置管理器 = 获取配置管理器()
         self.日志器 = logging.getLogger('实时风险监控器')
         
-        # 监控状态
-        self.监控指标 = defaultdict(list)
+        # 监控状态：各指标为固定内存的分桶计数，警报只保留最近50条
+        self.监控指标 = {
+            "总内容数": 时间序列指标(),
+            "高风险内容数": 时间序列指标(),
+            "警报数": 时间序列指标()
+        }
         self.风险阈值 = self.配置管理器.获取配置("安全设置.风险等级阈值", 0.7)
-        self.最近警报 = []
+        self.最近警报 = deque(maxlen=50)
+        
+        # 多进程部署时由审核系统设置，计数和警报同时写入共享状态
+        self.共享状态: Optional[共享审核状态] = None
         
-        # 启动监控线程
+        # 启动监控线程（基准测试等临时实例不启动）
         self.监控线程 = threading.Thread(target=self.监控循环, daemon=True)
-        self.监控运行中 = True
-        self.监控线程.start()
+        self.监控运行中 = 启动监控
+        if 启动监控:
+            self.监控线程.start()
     
     def 监控循环(self):
         """监控循环"""
         while self.监控运行中:
             try:
-                # 检查风险指标
+                # 检查风险指标（分桶计数自动过期，无需清理旧数据）
                 self.检查风险指标()
                 
-                # 清理旧数据
-                self.清理历史数据()
-                
                 # 间隔时间
                 time.sleep(60)  # 每分钟检查一次
                 
@@ -701,17 +2083,14 @@ class 实时风险监控器:
         当前时间 = time.time()
         
         # 检查最近的风险事件
-        最近风险事件 = [
-            事件 for 事件 in self.最近警报
-            if 当前时间 - 事件["时间"] < 300  # 最近5分钟
-        ]
+        最近风险事件数 = self.监控指标["高风险内容数"].统计(300, 当前时间)  # 最近5分钟
         
-        if len(最近风险事件) > 10:  # 5分钟内超过10个风险事件
-            self.触发风险警报("高频风险事件", f"5分钟内检测到{len(最近风险事件)}个风险事件")
+        if 最近风险事件数 > 10:  # 5分钟内超过10个风险事件
+            self.触发风险警报("高频风险事件", f"5分钟内检测到{最近风险事件数}个风险事件")
         
-        # 检查高风险内容比例
-        总内容数 = self.监控指标.get("总内容数", [0])[-1]
-        高风险内容数 = self.监控指标.get("高风险内容数", [0])[-1]
+        # 检查最近1小时高风险内容比例
+        总内容数 = self.监控指标["总内容数"].统计(3600, 当前时间)
+        高风险内容数 = self.监控指标["高风险内容数"].统计(3600, 当前时间)
         
         if 总内容数 > 0 and 高风险内容数 / 总内容数 > 0.1:  # 高风险内容超过10%
             self.触发风险警报("高风险内容比例过高", f"高风险内容比例: {高风险内容数/总内容数:.1%}")
@@ -726,21 +2105,23 @@ class 实时风险监控器:
         }
         
         self.最近警报.append(警报记录)
+        self.监控指标["警报数"].记录(警报记录["时间"])
+        if self.共享状态:
+            self.共享状态.记录监控("警报数", 警报记录["时间"])
+            self.共享状态.记录警报(警报记录)
         self.日志器.warning(f"风险警报: {警报类型} - {警报信息}")
-        
-        # 限制警报数量
-        if len(self.最近警报) > 50:
-            self.最近警报 = self.最近警报[-50:]
     
     def 记录内容审核(self, 审核结果: 审核结果):
         """记录内容审核结果"""
         当前时间 = time.time()
         
         # 更新监控指标
-        self.监控指标["总内容数"].append(当前时间)
+        self.监控指标["总内容数"].记录(当前时间)
+        if self.共享状态:
+            self.共享状态.记录监控("总内容数", 当前时间)
         
         if 审核结果.风险等级 in [风险等级.高风险, 风险等级.危险]:
-            self.监控指标["高风险内容数"].append(当前时间)
+            self.监控指标["高风险内容数"].记录(当前时间)
             
             # 记录高风险事件
             风险事件 = {
@@ -750,79 +2131,927 @@ class 实时风险监控器:
                 "内容类型": 审核结果.内容类型.value
             }
             self.最近警报.append(风险事件)
-    
-    def 清理历史数据(self):
-        """清理历史数据"""
-        当前时间 = time.time()
-        保留时间 = 当前时间 - 3600  # 保留最近1小时数据
-        
-        for 指标类型 in self.监控指标:
-            self.监控指标[指标类型] = [
-                数据 for 数据 in self.监控指标[指标类型]
-                if 数据 > 保留时间
-            ]
+            self.监控指标["警报数"].记录(当前时间)
+            if self.共享状态:
+                self.共享状态.记录监控("高风险内容数", 当前时间)
+                self.共享状态.记录监控("警报数", 当前时间)
+                self.共享状态.记录警报(风险事件)
     
     def 获取监控状态(self) -> Dict[str, Any]:
         """获取监控状态"""
         当前时间 = time.time()
         
-        # 计算最近1小时的数据
-        最近1小时数据 = {
-            "总内容数": len([数据 for 数据 in self.监控指标.get("总内容数", []) if 数据 > 当前时间 - 3600]),
-            "高风险内容数": len([数据 for 数据 in self.监控指标.get("高风险内容数", []) if 数据 > 当前时间 - 3600]),
-            "最近警报数": len([警报 for 警报 in self.最近警报 if 警报["时间"] > 当前时间 - 3600])
-        }
+        # 按滑动窗口汇总分桶计数
+        最近统计 = {}
+        for 窗口名, 窗口秒数 in (("最近5分钟统计", 300), ("最近1小时统计", 3600)):
+            最近统计[窗口名] = {
+                "总内容数": self.监控指标["总内容数"].统计(窗口秒数, 当前时间),
+                "高风险内容数": self.监控指标["高风险内容数"].统计(窗口秒数, 当前时间),
+                "最近警报数": self.监控指标["警报数"].统计(窗口秒数, 当前时间)
+            }
         
         return {
             "监控状态": "运行中" if self.监控运行中 else "已停止",
-            "最近1小时统计": 最近1小时数据,
+            **最近统计,
             "当前风险阈值": self.风险阈值,
-            "最近警报": self.最近警报[-5:]  # 最近5个警报
+            "最近警报": list(self.最近警报)[-5:]  # 最近5个警报
         }
     
     def 停止监控(self):
         """停止监控"""
         self.监控运行中 = False
 
-class 三级审核系统:
-    """三级审核系统 - 主审核引擎"""
+@contextmanager
+def 阶段计时(阶段耗时: Optional[Dict[str, float]], 阶段: str):
+    """把代码块耗时（毫秒）累加到 阶段耗时[阶段]；阶段耗时为None时不计时"""
+    if 阶段耗时 is None:
+        yield
+        return
+    开始 = time.perf_counter()
+    try:
+        yield
+    finally:
+        阶段耗时[阶段] = 阶段耗时.get(阶段, 0.0) + (time.perf_counter() - 开始) * 1000
+
+class 阶段耗时统计:
+    """各审核阶段的耗时直方图
+    
+    桶边界从0.01毫秒起按2倍递增到约20秒，每个阶段只保存桶计数、总和与最值，
+    内存固定。分位数在桶内线性插值估计，可导出为Prometheus文本格式。
+    """
+    桶边界_毫秒 = tuple(0.01 * 2 ** 序号 for 序号 in range(22))
+    
     def __init__(self):
-        self.配置管理器 = 获取配置管理器()
-        self.安全识别器 = Google级安全识别器()
-        self.视觉分析器 = 视觉内容分析器()
-        self.文本扫描器 = 文本语义扫描器()
-        self.风险监控器 = 实时风险监控器()
-        self.日志器 = logging.getLogger('三级审核系统')
-        
-        # 审核配置
-        self.当前模式 = 审核模式.开启
-        self.自定义关键词库 = set()
-        self.审核历史 = []
-        self.安全事件记录 = []
-        
-        # 加载配置
-        self.加载审核配置()
+        self.统计锁 = threading.Lock()
+        self.阶段数据: Dict[str, Dict[str, Any]] = {}
     
-    def 加载审核配置(self):
-        """加载审核配置"""
-        安全配置 = self.配置管理器.获取安全配置()
-        
+    def 记录(self, 阶段: str, 耗时_毫秒: float):
+        """记录一次阶段耗时"""
+        桶序号 = bisect.bisect_left(self.桶边界_毫秒, 耗时_毫秒)
+        with self.统计锁:
+            数据 = self.阶段数据.get(阶段)
+            if 数据 is None:
+                数据 = self.阶段数据[阶段] = {
+                    "桶计数": [0] * (len(self.桶边界_毫秒) + 1),
+                    "次数": 0,
+                    "总耗时": 0.0,
+                    "最大值": 0.0
+                }
+            数据["桶计数"][桶序号] += 1
+            数据["次数"] += 1
+            数据["总耗时"] += 耗时_毫秒
+            数据["最大值"] = max(数据["最大值"], 耗时_毫秒)
+    
+    def 批量记录(self, 阶段耗时: Dict[str, float]):
+        """记录一次审核的各阶段耗时"""
+        for 阶段, 耗时 in 阶段耗时.items():
+            self.记录(阶段, 耗时)
+    
+    def 估计分位数(self, 数据: Dict[str, Any], 分位: float) -> float:
+        """按桶计数估计分位数，落在最后一个桶时返回最大值"""
+        目标 = 分位 * 数据["次数"]
+        累计 = 0
+        for 桶序号, 计数 in enumerate(数据["桶计数"]):
+            if 计数 and 累计 + 计数 >= 目标:
+                if 桶序号 == len(self.桶边界_毫秒):
+                    return 数据["最大值"]
+                下界 = self.桶边界_毫秒[桶序号 - 1] if 桶序号 else 0.0
+                上界 = min(self.桶边界_毫秒[桶序号], 数据["最大值"])
+                return 下界 + (上界 - 下界) * max(目标 - 累计, 0) / 计数
+            累计 += 计数
+        return 数据["最大值"]
+    
+    def 获取统计(self) -> Dict[str, Dict[str, float]]:
+        """各阶段的次数、平均值和p50/p95/p99（毫秒）"""
+        with self.统计锁:
+            return {
+                阶段: {
+                    "次数": 数据["次数"],
+                    "平均_毫秒": round(数据["总耗时"] / 数据["次数"], 4),
+                    "p50_毫秒": round(self.估计分位数(数据, 0.50), 4),
+                    "p95_毫秒": round(self.估计分位数(数据, 0.95), 4),
+                    "p99_毫秒": round(self.估计分位数(数据, 0.99), 4),
+                    "最大_毫秒": round(数据["最大值"], 4)
+                }
+                for 阶段, 数据 in self.阶段数据.items()
+            }
+    
+    def 导出Prometheus文本(self) -> str:
+        """导出为Prometheus直方图文本格式（单位秒）"""
+        指标名 = "audit_stage_duration_seconds"
+        行列表 = [
+            f"# HELP {指标名} 三级审核系统各阶段耗时",
+            f"# TYPE {指标名} histogram"
+        ]
+        with self.统计锁:
+            for 阶段, 数据 in self.阶段数据.items():
+                累计 = 0
+                for 边界, 计数 in zip(self.桶边界_毫秒, 数据["桶计数"]):
+                    累计 += 计数
+                    行列表.append(f'{指标名}_bucket{{stage="{阶段}",le="{边界 / 1000:g}"}} {累计}')
+                行列表.append(f'{指标名}_bucket{{stage="{阶段}",le="+Inf"}} {数据["次数"]}')
+                行列表.append(f'{指标名}_sum{{stage="{阶段}"}} {数据["总耗时"] / 1000:.6f}')
+                行列表.append(f'{指标名}_count{{stage="{阶段}"}} {数据["次数"]}')
+        return "\n".join(行列表) + "\n"
+    
+    def 写入Prometheus文件(self, 文件路径: str):
+        """原子写入Prometheus文本文件，供node_exporter文本采集器读取"""
+        路径 = Path(文件路径)
+        路径.parent.mkdir(parents=True, exist_ok=True)
+        临时路径 = 路径.with_name(路径.name + ".tmp")
+        临时路径.write_text(self.导出Prometheus文本(), encoding="utf-8")
+        os.replace(临时路径, 路径)
+
+class 审核结果缓存:
+    """审核结果缓存（LRU + TTL）"""
+    def __init__(self):
+        self.配置管理器 = 获取配置管理器()
+        self.日志器 = logging.getLogger('审核结果缓存')
+        self.缓存锁 = threading.Lock()
+        
+        # 键 -> (过期时间, 审核结果)
+        self.缓存数据: "OrderedDict[str, Tuple[float, 审核结果]]" = OrderedDict()
+        self.缓存统计 = {
+            "命中次数": 0,
+            "未命中次数": 0,
+            "过期次数": 0,
+            "淘汰次数": 0
+        }
+        
+        # 缓存配置
+        self.最大条目数 = self.配置管理器.获取配置("安全设置.审核缓存条目数", 2048)
+        self.过期时间 = self.配置管理器.获取配置("安全设置.审核缓存过期时间", 600)
+    
+    def 生成缓存键(self, 内容: str, 上下文指纹: frozenset, 模式: 审核模式, 词库版本: int) -> str:
+        """由内容哈希、上下文指纹、审核模式和词库版本组成缓存键
+        
+        审核结果只通过命中的语境类别依赖上下文，指纹相同的上下文共用缓存结果。
+        """
+        内容哈希 = hashlib.md5(内容.encode()).hexdigest()
+        return f"{内容哈希}:{'+'.join(sorted(上下文指纹))}:{模式.value}:{词库版本}"
+    
+    def 获取(self, 键: str) -> Optional[审核结果]:
+        """获取缓存的审核结果，返回副本以免调用方修改缓存内容"""
+        with self.缓存锁:
+            条目 = self.缓存数据.get(键)
+            if 条目 is None:
+                self.缓存统计["未命中次数"] += 1
+                return None
+            
+            过期时间, 结果 = 条目
+            if time.time() > 过期时间:
+                del self.缓存数据[键]
+                self.缓存统计["过期次数"] += 1
+                self.缓存统计["未命中次数"] += 1
+                return None
+            
+            self.缓存数据.move_to_end(键)
+            self.缓存统计["命中次数"] += 1
+        
+        return copy.deepcopy(结果)
+    
+    def 设置(self, 键: str, 结果: 审核结果):
+        """写入审核结果的副本，调用方之后修改返回的结果不会影响缓存"""
+        副本 = copy.deepcopy(结果)
+        with self.缓存锁:
+            self.缓存数据[键] = (time.time() + self.过期时间, 副本)
+            self.缓存数据.move_to_end(键)
+            
+            while len(self.缓存数据) > self.最大条目数:
+                self.缓存数据.popitem(last=False)
+                self.缓存统计["淘汰次数"] += 1
+    
+    def 清空(self):
+        """清空缓存（词库或模式变化时调用）"""
+        with self.缓存锁:
+            self.缓存数据.clear()
+    
+    def 获取状态(self) -> Dict[str, Any]:
+        """获取缓存状态"""
+        with self.缓存锁:
+            总请求次数 = self.缓存统计["命中次数"] + self.缓存统计["未命中次数"]
+            return {
+                "缓存条目数": len(self.缓存数据),
+                "最大条目数": self.最大条目数,
+                "命中率": self.缓存统计["命中次数"] / 总请求次数 if 总请求次数 > 0 else 0,
+                **self.缓存统计
+            }
+
+class 审核历史存储:
+    """审核历史环形列存储
+    
+    各字段按列预分配，写满后覆盖最旧记录；风险等级、内容类型和通过数随写入
+    和淘汰增量维护，统计为O(1)。时间戳单调不减，时间范围导出用二分查找。
+    配置了溢写路径时，被淘汰的记录追加写入磁盘段文件（JSON行），
+    段文件按时间顺序稀疏索引，历史总量不受内存限制。关闭（含进程退出）时
+    内存中的记录全部溢写到段文件，重启后不丢失。
+    """
+    字段列表 = ("审核ID", "内容类型", "风险等级", "风险评分", "通过", "审核时间", "时间戳")
+    段索引间隔 = 256
+    
+    def __init__(self, 容量: int = 10000, 溢写路径: str = None):
+        self.日志器 = logging.getLogger('审核历史存储')
+        self.存储锁 = threading.RLock()
+        self.容量 = 容量
+        
+        # 列存储
+        self.审核ID列: List[Optional[str]] = [None] * 容量
+        self.内容类型列: List[Optional[str]] = [None] * 容量
+        self.风险等级列: List[Optional[str]] = [None] * 容量
+        self.风险评分列 = array('d', bytes(8 * 容量))
+        self.通过列 = bytearray(容量)
+        self.审核时间列 = array('d', bytes(8 * 容量))
+        self.时间戳列 = array('d', bytes(8 * 容量))
+        self.起始位置 = 0
+        self.记录数 = 0
+        
+        # 增量计数
+        self.通过数 = 0
+        self.风险等级计数 = {等级.value: 0 for 等级 in 风险等级}
+        self.内容类型计数 = {类型.value: 0 for 类型 in 内容类型}
+        
+        # 磁盘段文件：稀疏索引为 (时间戳列表, 偏移列表)
+        self.溢写路径 = Path(溢写路径) if 溢写路径 else None
+        self.段文件 = None
+        self.段记录数 = 0
+        self.段索引时间戳: List[float] = []
+        self.段索引偏移: List[int] = []
+        self.段最后时间戳 = 0.0
+        if self.溢写路径:
+            self.打开段文件()
+            atexit.register(self.关闭)
+    
+    def 打开段文件(self):
+        """打开段文件并重建稀疏索引"""
+        self.溢写路径.parent.mkdir(parents=True, exist_ok=True)
+        if self.溢写路径.exists():
+            with open(self.溢写路径, 'rb') as f:
+                偏移 = 0
+                for 行 in f:
+                    if not 行.strip():
+                        偏移 += len(行)
+                        continue
+                    时间戳 = json.loads(行)["时间戳"]
+                    if self.段记录数 % self.段索引间隔 == 0:
+                        self.段索引时间戳.append(时间戳)
+                        self.段索引偏移.append(偏移)
+                    self.段记录数 += 1
+                    self.段最后时间戳 = 时间戳
+                    偏移 += len(行)
+        self.段文件 = open(self.溢写路径, 'ab')
+    
+    def __len__(self) -> int:
+        return self.记录数
+    
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        with self.存储锁:
+            return iter([self.读取记录(序号) for 序号 in range(self.记录数)])
+    
+    def 物理位置(self, 序号: int) -> int:
+        """逻辑序号（0为最旧）转为列下标"""
+        return (self.起始位置 + 序号) % self.容量
+    
+    def 读取记录(self, 序号: int) -> Dict[str, Any]:
+        """按逻辑序号读取一条记录"""
+        位置 = self.物理位置(序号)
+        return {
+            "审核ID": self.审核ID列[位置],
+            "内容类型": self.内容类型列[位置],
+            "风险等级": self.风险等级列[位置],
+            "风险评分": self.风险评分列[位置],
+            "通过": bool(self.通过列[位置]),
+            "审核时间": self.审核时间列[位置],
+            "时间戳": self.时间戳列[位置]
+        }
+    
+    def 追加(self, 记录: Dict[str, Any]):
+        """追加一条记录，写满时淘汰最旧记录"""
+        with self.存储锁:
+            # 保证时间戳单调不减，二分查找才成立
+            if self.记录数:
+                记录["时间戳"] = max(记录["时间戳"], self.时间戳列[self.物理位置(self.记录数 - 1)])
+            
+            if self.记录数 == self.容量:
+                self.淘汰最旧记录()
+            
+            位置 = self.物理位置(self.记录数)
+            self.审核ID列[位置] = 记录["审核ID"]
+            self.内容类型列[位置] = 记录["内容类型"]
+            self.风险等级列[位置] = 记录["风险等级"]
+            self.风险评分列[位置] = 记录["风险评分"]
+            self.通过列[位置] = 1 if 记录["通过"] else 0
+            self.审核时间列[位置] = 记录["审核时间"]
+            self.时间戳列[位置] = 记录["时间戳"]
+            self.记录数 += 1
+            
+            self.通过数 += self.通过列[位置]
+            self.风险等级计数[记录["风险等级"]] = self.风险等级计数.get(记录["风险等级"], 0) + 1
+            self.内容类型计数[记录["内容类型"]] = self.内容类型计数.get(记录["内容类型"], 0) + 1
+    
+    def 淘汰最旧记录(self):
+        """移出最旧记录并扣减计数，配置了段文件时先溢写"""
+        if self.段文件:
+            self.溢写记录(self.读取记录(0))
+        
+        位置 = self.起始位置
+        self.通过数 -= self.通过列[位置]
+        self.风险等级计数[self.风险等级列[位置]] -= 1
+        self.内容类型计数[self.内容类型列[位置]] -= 1
+        self.审核ID列[位置] = None
+        
+        self.起始位置 = (self.起始位置 + 1) % self.容量
+        self.记录数 -= 1
+    
+    def 溢写记录(self, 记录: Dict[str, Any]):
+        """追加写入段文件"""
+        try:
+            if self.段记录数 % self.段索引间隔 == 0:
+                self.段索引时间戳.append(记录["时间戳"])
+                self.段索引偏移.append(self.段文件.tell())
+            self.段文件.write(json.dumps(记录, ensure_ascii=False).encode('utf-8') + b"\n")
+            self.段记录数 += 1
+            self.段最后时间戳 = 记录["时间戳"]
+        except OSError as e:
+            self.日志器.error(f"审核历史溢写失败: {e}")
+    
+    def 二分查找(self, 时间戳: float, 右侧: bool = False) -> int:
+        """在内存记录中按时间戳二分，返回逻辑序号"""
+        低, 高 = 0, self.记录数
+        while 低 < 高:
+            中 = (低 + 高) // 2
+            当前 = self.时间戳列[self.物理位置(中)]
+            if 当前 < 时间戳 or (右侧 and 当前 == 时间戳):
+                低 = 中 + 1
+            else:
+                高 = 中
+        return 低
+    
+    def 读取段文件(self, 开始时间: float, 结束时间: float) -> List[Dict[str, Any]]:
+        """从段文件读取时间范围内的记录，由稀疏索引定位起点"""
+        if not self.段记录数 or 开始时间 > self.段最后时间戳:
+            return []
+        
+        self.段文件.flush()
+        索引位置 = max(bisect.bisect_left(self.段索引时间戳, 开始时间) - 1, 0)
+        结果 = []
+        with open(self.溢写路径, 'rb') as f:
+            f.seek(self.段索引偏移[索引位置])
+            for 行 in f:
+                if not 行.strip():
+                    continue
+                记录 = json.loads(行)
+                if 记录["时间戳"] > 结束时间:
+                    break
+                if 记录["时间戳"] >= 开始时间:
+                    结果.append(记录)
+        return 结果
+    
+    def 按时间导出(self, 开始时间: float, 结束时间: float) -> List[Dict[str, Any]]:
+        """导出时间范围内的记录（含已溢写到磁盘的部分）"""
+        with self.存储锁:
+            结果 = []
+            if self.段文件:
+                结果 = self.读取段文件(开始时间, 结束时间)
+            
+            起点 = self.二分查找(开始时间)
+            终点 = self.二分查找(结束时间, 右侧=True)
+            结果.extend(self.读取记录(序号) for 序号 in range(起点, 终点))
+            return 结果
+    
+    def 获取统计(self) -> Dict[str, Any]:
+        """返回内存窗口内的增量计数"""
+        with self.存储锁:
+            return {
+                "总数": self.记录数,
+                "通过数": self.通过数,
+                "风险等级统计": dict(self.风险等级计数),
+                "内容类型统计": dict(self.内容类型计数)
+            }
+    
+    def 关闭(self):
+        """把内存中的记录溢写到段文件后关闭"""
+        with self.存储锁:
+            if self.段文件:
+                while self.记录数:
+                    self.淘汰最旧记录()
+                self.段文件.close()
+                self.段文件 = None
+                atexit.unregister(self.关闭)
+
+class 安全事件存储:
+    """安全事件存储
+    
+    内存中按事件ID和处理状态双重索引最近的事件，状态流转O(1)；
+    各状态的事件数增量维护。配置了数据库路径时事件同步写入本地SQLite
+    （WAL模式，处理状态和发生时间建索引），重启后计数和历史事件都能恢复，
+    导出直接走索引查询。
+    """
+    def __init__(self, 数据库路径: str = None, 内存条目数: int = 1000):
+        self.日志器 = logging.getLogger('安全事件存储')
+        self.存储锁 = threading.RLock()
+        self.内存条目数 = 内存条目数
+        
+        # 事件ID -> 安全事件（按发生顺序），处理状态 -> 有序事件ID集合
+        self.事件索引: "OrderedDict[str, 安全事件]" = OrderedDict()
+        self.状态索引: Dict[str, "OrderedDict[str, None]"] = defaultdict(OrderedDict)
+        self.状态计数: Dict[str, int] = defaultdict(int)
+        
+        self.数据库 = None
+        if 数据库路径:
+            self.打开数据库(Path(数据库路径))
+    
+    def 打开数据库(self, 数据库路径: Path):
+        """打开SQLite数据库并恢复各状态计数"""
+        try:
+            数据库路径.parent.mkdir(parents=True, exist_ok=True)
+            self.数据库 = sqlite3.connect(str(数据库路径), check_same_thread=False)
+            self.数据库.execute("PRAGMA journal_mode=WAL")
+            self.数据库.execute("PRAGMA synchronous=NORMAL")
+            self.数据库.execute("""
+                CREATE TABLE IF NOT EXISTS 安全事件 (
+                    事件ID TEXT PRIMARY KEY,
+                    内容类型 TEXT,
+                    风险等级 TEXT,
+                    内容摘要 TEXT,
+                    审核结果 TEXT,
+                    处理状态 TEXT,
+                    发生时间 REAL,
+                    处理时间 REAL,
+                    处理人员 TEXT,
+                    处理措施 TEXT
+                )
+            """)
+            self.数据库.execute("CREATE INDEX IF NOT EXISTS 索引_处理状态 ON 安全事件 (处理状态, 发生时间)")
+            self.数据库.execute("CREATE INDEX IF NOT EXISTS 索引_发生时间 ON 安全事件 (发生时间)")
+            self.数据库.commit()
+            
+            for 状态, 数量 in self.数据库.execute("SELECT 处理状态, COUNT(*) FROM 安全事件 GROUP BY 处理状态"):
+                self.状态计数[状态] = 数量
+        except sqlite3.Error as e:
+            self.日志器.error(f"安全事件数据库打开失败，仅保留内存事件: {e}")
+            self.数据库 = None
+    
+    def __len__(self) -> int:
+        return sum(self.状态计数.values())
+    
+    def __iter__(self) -> Iterator[安全事件]:
+        return iter(self.导出())
+    
+    def 序列化审核结果(self, 结果: 审核结果) -> str:
+        """审核结果转为JSON文本"""
+        数据 = {字段: getattr(结果, 字段) for 字段 in 审核结果.__dataclass_fields__}
+        数据["内容类型"] = 结果.内容类型.value
+        数据["风险等级"] = 结果.风险等级.value
+        数据["审核模式"] = 结果.审核模式.value
+        return json.dumps(数据, ensure_ascii=False, default=str)
+    
+    def 行转事件(self, 行: tuple) -> 安全事件:
+        """数据库行还原为安全事件"""
+        结果数据 = json.loads(行[4])
+        结果数据["内容类型"] = 内容类型(结果数据["内容类型"])
+        结果数据["风险等级"] = 风险等级(结果数据["风险等级"])
+        结果数据["审核模式"] = 审核模式(结果数据["审核模式"])
+        return 安全事件(
+            事件ID=行[0],
+            内容类型=内容类型(行[1]),
+            风险等级=风险等级(行[2]),
+            内容摘要=行[3],
+            审核结果=审核结果(**结果数据),
+            处理状态=行[5],
+            发生时间=行[6],
+            处理时间=行[7],
+            处理人员=行[8],
+            处理措施=行[9]
+        )
+    
+    def 添加(self, 事件: 安全事件):
+        """写入新事件，同ID事件覆盖旧记录"""
+        with self.存储锁:
+            旧状态 = self.查询状态(事件.事件ID)
+            if 旧状态 is not None:
+                self.状态计数[旧状态] -= 1
+                self.状态索引[旧状态].pop(事件.事件ID, None)
+            
+            self.事件索引[事件.事件ID] = 事件
+            self.事件索引.move_to_end(事件.事件ID)
+            self.状态索引[事件.处理状态][事件.事件ID] = None
+            self.状态计数[事件.处理状态] += 1
+            
+            if self.数据库:
+                self.执行写入(
+                    "INSERT OR REPLACE INTO 安全事件 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (事件.事件ID, 事件.内容类型.value, 事件.风险等级.value, 事件.内容摘要,
+                     self.序列化审核结果(事件.审核结果), 事件.处理状态, 事件.发生时间,
+                     事件.处理时间, 事件.处理人员, 事件.处理措施)
+                )
+            
+            # 内存只保留最近的事件，更早的事件留在数据库中
+            while len(self.事件索引) > self.内存条目数:
+                淘汰ID, 淘汰事件 = self.事件索引.popitem(last=False)
+                self.状态索引[淘汰事件.处理状态].pop(淘汰ID, None)
+                if not self.数据库:
+                    self.状态计数[淘汰事件.处理状态] -= 1
+    
+    def 查询状态(self, 事件ID: str) -> Optional[str]:
+        """查询事件当前处理状态，不存在时返回None"""
+        事件 = self.事件索引.get(事件ID)
+        if 事件 is not None:
+            return 事件.处理状态
+        if self.数据库:
+            行 = self.数据库.execute("SELECT 处理状态 FROM 安全事件 WHERE 事件ID = ?", (事件ID,)).fetchone()
+            return 行[0] if 行 else None
+        return None
+    
+    def 更新状态(self, 事件ID: str, 处理状态: str, 处理人员: str = None, 处理措施: str = None) -> bool:
+        """事件状态流转，返回事件是否存在"""
+        with self.存储锁:
+            旧状态 = self.查询状态(事件ID)
+            if 旧状态 is None:
+                return False
+            
+            处理时间 = time.time()
+            事件 = self.事件索引.get(事件ID)
+            if 事件 is not None:
+                事件.处理状态 = 处理状态
+                事件.处理时间 = 处理时间
+                事件.处理人员 = 处理人员
+                事件.处理措施 = 处理措施
+                self.状态索引[旧状态].pop(事件ID, None)
+                self.状态索引[处理状态][事件ID] = None
+            
+            self.状态计数[旧状态] -= 1
+            self.状态计数[处理状态] += 1
+            
+            if self.数据库:
+                self.执行写入(
+                    "UPDATE 安全事件 SET 处理状态 = ?, 处理时间 = ?, 处理人员 = ?, 处理措施 = ? WHERE 事件ID = ?",
+                    (处理状态, 处理时间, 处理人员, 处理措施, 事件ID)
+                )
+            return True
+    
+    def 执行写入(self, 语句: str, 参数: tuple):
+        """执行单条写入并提交，失败只记日志不影响审核"""
+        try:
+            self.数据库.execute(语句, 参数)
+            self.数据库.commit()
+        except sqlite3.Error as e:
+            self.日志器.error(f"安全事件写入失败: {e}")
+    
+    def 状态数量(self, 处理状态: str) -> int:
+        """指定状态的事件数"""
+        return self.状态计数.get(处理状态, 0)
+    
+    def 导出(self, 处理状态: str = None, 数量上限: int = None) -> List[安全事件]:
+        """按发生顺序导出事件；有数据库时包含全部历史事件"""
+        with self.存储锁:
+            if self.数据库:
+                语句 = "SELECT * FROM 安全事件"
+                参数: tuple = ()
+                if 处理状态:
+                    语句 += " WHERE 处理状态 = ?"
+                    参数 = (处理状态,)
+                语句 += " ORDER BY 发生时间"
+                if 数量上限:
+                    语句 += " LIMIT ?"
+                    参数 += (数量上限,)
+                # 内存中的事件直接复用对象，保证调用方拿到的是同一实例
+                return [
+                    self.事件索引.get(行[0]) or self.行转事件(行)
+                    for 行 in self.数据库.execute(语句, 参数)
+                ]
+            
+            if 处理状态:
+                事件列表 = [self.事件索引[事件ID] for 事件ID in self.状态索引.get(处理状态, ())]
+            else:
+                事件列表 = list(self.事件索引.values())
+            return 事件列表[:数量上限] if 数量上限 else 事件列表
+    
+    def 关闭(self):
+        """关闭数据库连接"""
+        with self.存储锁:
+            if self.数据库:
+                self.数据库.close()
+                self.数据库 = None
+
+class 共享审核状态:
+    """多进程共享的审核状态（本地SQLite，WAL模式）
+    
+    每个进程只累加自己的分片行：审核计数按 (进程标识, 维度, 取值)，监控计数按
+    (进程标识, 分钟, 指标)；审核记录和警报追加写入。写入先在内存中攒批，由后台线程
+    按条数或间隔一次事务提交，进程之间只在提交时短暂争用写锁。汇总时对计数表
+    GROUP BY 求和，代价只与进程数和维度取值数有关，与审核总量无关。
+    """
+    监控指标名 = ("总内容数", "高风险内容数", "警报数")
+    
+    def __init__(self, 数据库路径: str, 批量条数: int = 200, 刷新间隔_秒: float = 1.0,
+                 记录保留时长_秒: float = 7 * 86400):
+        self.日志器 = logging.getLogger('共享审核状态')
+        self.进程标识 = f"{socket.gethostname()}:{os.getpid()}"
+        self.批量条数 = 批量条数
+        self.刷新间隔_秒 = 刷新间隔_秒
+        self.记录保留时长_秒 = 记录保留时长_秒
+        
+        # 待提交的增量
+        self.缓冲锁 = threading.Lock()
+        self.待写记录: List[tuple] = []
+        self.待写警报: List[tuple] = []
+        self.待加计数: Counter = Counter()
+        self.待加监控: Counter = Counter()
+        
+        self.数据库锁 = threading.Lock()
+        self.上次清理时间 = 0.0
+        Path(数据库路径).parent.mkdir(parents=True, exist_ok=True)
+        self.数据库 = sqlite3.connect(数据库路径, timeout=30, check_same_thread=False)
+        self.数据库.execute("PRAGMA journal_mode=WAL")
+        self.数据库.execute("PRAGMA synchronous=NORMAL")
+        self.数据库.executescript("""
+            CREATE TABLE IF NOT EXISTS 审核记录 (
+                审核ID TEXT, 进程标识 TEXT, 内容类型 TEXT, 风险等级 TEXT,
+                风险评分 REAL, 通过 INTEGER, 审核时间 REAL, 时间戳 REAL
+            );
+            CREATE INDEX IF NOT EXISTS 索引_审核记录时间 ON 审核记录 (时间戳);
+            CREATE TABLE IF NOT EXISTS 审核计数 (
+                进程标识 TEXT, 维度 TEXT, 取值 TEXT, 数量 INTEGER,
+                PRIMARY KEY (进程标识, 维度, 取值)
+            );
+            CREATE TABLE IF NOT EXISTS 监控计数 (
+                进程标识 TEXT, 分钟 INTEGER, 指标 TEXT, 数量 INTEGER,
+                PRIMARY KEY (进程标识, 分钟, 指标)
+            );
+            CREATE INDEX IF NOT EXISTS 索引_监控分钟 ON 监控计数 (分钟);
+            CREATE TABLE IF NOT EXISTS 风险警报 (时间 REAL, 进程标识 TEXT, 内容 TEXT);
+            CREATE INDEX IF NOT EXISTS 索引_警报时间 ON 风险警报 (时间);
+            CREATE TABLE IF NOT EXISTS 进程心跳 (进程标识 TEXT PRIMARY KEY, 最后提交时间 REAL);
+        """)
+        self.数据库.commit()
+        
+        self.刷新信号 = threading.Event()
+        self.运行中 = True
+        self.刷新线程 = threading.Thread(target=self.刷新循环, daemon=True)
+        self.刷新线程.start()
+        atexit.register(self.关闭)
+    
+    def 记录审核(self, 历史记录: Dict[str, Any]):
+        """追加一条审核记录，并累加总数、通过数、风险等级和内容类型计数"""
+        with self.缓冲锁:
+            self.待写记录.append((
+                历史记录["审核ID"], self.进程标识, 历史记录["内容类型"], 历史记录["风险等级"],
+                历史记录["风险评分"], int(历史记录["通过"]), 历史记录["审核时间"], 历史记录["时间戳"]
+            ))
+            self.待加计数[("总数", "")] += 1
+            self.待加计数[("通过数", "")] += int(历史记录["通过"])
+            self.待加计数[("风险等级", 历史记录["风险等级"])] += 1
+            self.待加计数[("内容类型", 历史记录["内容类型"])] += 1
+            攒满 = len(self.待写记录) >= self.批量条数
+        if 攒满:
+            self.刷新信号.set()
+    
+    def 记录监控(self, 指标: str, 时间戳: float, 数量: int = 1):
+        """按分钟累加监控指标"""
+        with self.缓冲锁:
+            self.待加监控[(int(时间戳 // 60), 指标)] += 数量
+    
+    def 记录警报(self, 警报记录: Dict[str, Any]):
+        """追加一条风险警报"""
+        with self.缓冲锁:
+            self.待写警报.append((
+                警报记录["时间"], self.进程标识, json.dumps(警报记录, ensure_ascii=False, default=str)
+            ))
+    
+    def 刷新循环(self):
+        """后台提交线程：到间隔或攒满一批时提交"""
+        while self.运行中:
+            self.刷新信号.wait(self.刷新间隔_秒)
+            self.刷新信号.clear()
+            self.刷新()
+    
+    def 刷新(self):
+        """把本进程攒下的增量在一个事务内提交"""
+        with self.缓冲锁:
+            记录, self.待写记录 = self.待写记录, []
+            警报, self.待写警报 = self.待写警报, []
+            计数, self.待加计数 = self.待加计数, Counter()
+            监控, self.待加监控 = self.待加监控, Counter()
+        if not (记录 or 警报 or 计数 or 监控):
+            return
+        
+        当前时间 = time.time()
+        with self.数据库锁:
+            if self.数据库 is None:
+                return
+            try:
+                with self.数据库:
+                    self.数据库.executemany("INSERT INTO 审核记录 VALUES (?, ?, ?, ?, ?, ?, ?, ?)", 记录)
+                    self.数据库.executemany("INSERT INTO 风险警报 VALUES (?, ?, ?)", 警报)
+                    self.数据库.executemany(
+                        "INSERT INTO 审核计数 VALUES (?, ?, ?, ?) ON CONFLICT (进程标识, 维度, 取值) "
+                        "DO UPDATE SET 数量 = 数量 + excluded.数量",
+                        [(self.进程标识, 维度, 取值, 数量) for (维度, 取值), 数量 in 计数.items() if 数量]
+                    )
+                    self.数据库.executemany(
+                        "INSERT INTO 监控计数 VALUES (?, ?, ?, ?) ON CONFLICT (进程标识, 分钟, 指标) "
+                        "DO UPDATE SET 数量 = 数量 + excluded.数量",
+                        [(self.进程标识, 分钟, 指标, 数量) for (分钟, 指标), 数量 in 监控.items()]
+                    )
+                    self.数据库.execute(
+                        "INSERT OR REPLACE INTO 进程心跳 VALUES (?, ?)", (self.进程标识, 当前时间)
+                    )
+                    
+                    # 每分钟清理一次本进程过期的分钟计数和审核记录
+                    if 当前时间 - self.上次清理时间 > 60:
+                        self.上次清理时间 = 当前时间
+                        self.数据库.execute(
+                            "DELETE FROM 监控计数 WHERE 进程标识 = ? AND 分钟 < ?",
+                            (self.进程标识, int(当前时间 // 60) - 120)
+                        )
+                        self.数据库.execute(
+                            "DELETE FROM 审核记录 WHERE 进程标识 = ? AND 时间戳 < ?",
+                            (self.进程标识, 当前时间 - self.记录保留时长_秒)
+                        )
+                        self.数据库.execute(
+                            "DELETE FROM 风险警报 WHERE 进程标识 = ? AND 时间 < ?",
+                            (self.进程标识, 当前时间 - self.记录保留时长_秒)
+                        )
+            except sqlite3.Error as e:
+                # 提交失败时把增量放回缓冲，下次重试
+                self.日志器.error(f"共享审核状态提交失败: {e}")
+                with self.缓冲锁:
+                    self.待写记录[:0] = 记录
+                    self.待写警报[:0] = 警报
+                    self.待加计数.update(计数)
+                    self.待加监控.update(监控)
+    
+    def 获取汇总统计(self, 最近警报数: int = 5) -> Dict[str, Any]:
+        """汇总所有进程的审核计数、滑动窗口监控计数（分钟粒度）和最近警报"""
+        self.刷新()
+        当前时间 = time.time()
+        当前分钟 = int(当前时间 // 60)
+        
+        with self.数据库锁:
+            计数行 = self.数据库.execute(
+                "SELECT 维度, 取值, SUM(数量) FROM 审核计数 GROUP BY 维度, 取值"
+            ).fetchall()
+            窗口行 = {
+                窗口名: dict(self.数据库.execute(
+                    "SELECT 指标, SUM(数量) FROM 监控计数 WHERE 分钟 > ? GROUP BY 指标",
+                    (当前分钟 - 窗口分钟数,)
+                ).fetchall())
+                for 窗口名, 窗口分钟数 in (("最近5分钟统计", 5), ("最近1小时统计", 60))
+            }
+            警报行 = self.数据库.execute(
+                "SELECT 内容 FROM 风险警报 ORDER BY 时间 DESC LIMIT ?", (最近警报数,)
+            ).fetchall()
+            活跃进程数 = self.数据库.execute(
+                "SELECT COUNT(*) FROM 进程心跳 WHERE 最后提交时间 > ?", (当前时间 - 3600,)
+            ).fetchone()[0]
+        
+        风险等级统计: Dict[str, int] = {}
+        内容类型统计: Dict[str, int] = {}
+        总数 = 通过数 = 0
+        for 维度, 取值, 数量 in 计数行:
+            if 维度 == "总数":
+                总数 = 数量
+            elif 维度 == "通过数":
+                通过数 = 数量
+            elif 维度 == "风险等级":
+                风险等级统计[取值] = 数量
+            elif 维度 == "内容类型":
+                内容类型统计[取值] = 数量
+        
+        return {
+            "活跃进程数": 活跃进程数,
+            "总审核数": 总数,
+            "通过数": 通过数,
+            "拒绝数": 总数 - 通过数,
+            "通过率": 通过数 / 总数 if 总数 > 0 else 0,
+            "风险等级统计": 风险等级统计,
+            "内容类型统计": 内容类型统计,
+            **{
+                窗口名: {指标: 计数.get(指标, 0) for 指标 in self.监控指标名}
+                for 窗口名, 计数 in 窗口行.items()
+            },
+            "最近警报": [json.loads(行[0]) for 行 in reversed(警报行)]
+        }
+    
+    def 关闭(self):
+        """停止提交线程，提交剩余增量并关闭数据库"""
+        if not self.运行中:
+            return
+        self.运行中 = False
+        self.刷新信号.set()
+        self.刷新线程.join(timeout=5)
+        self.刷新()
+        with self.数据库锁:
+            if self.数据库 is not None:
+                self.数据库.close()
+                self.数据库 = None
+
+@dataclass(frozen=True)
+class 关键词快照:
+    """不可变的自定义关键词快照，每次修改生成新快照，版本号加一"""
+    版本: int
+    关键词: frozenset
+
+class 三级审核系统:
+    """三级审核系统 - 主审核引擎
+    
+    配置覆盖按配置路径（如 "安全设置.安全事件数据库路径"）取代配置文件中的值，
+    只作用于本实例，用于基准测试等需要把存储指向临时目录的场合。
+    """
+    def __init__(self, 配置覆盖: Dict[str, Any] = None):
+        self.配置管理器 = 获取配置管理器()
+        self.配置覆盖 = dict(配置覆盖 or {})
+        self.安全识别器 = Google级安全识别器()
+        self.视觉分析器 = 视觉内容分析器()
+        self.文本扫描器 = 文本语义扫描器()
+        self.风险监控器 = 实时风险监控器(启动监控=self.读取配置("安全设置.启用风险监控", True))
+        self.日志器 = logging.getLogger('三级审核系统')
+        
+        # 审核配置
+        self.当前模式 = 审核模式.开启
+        
+        # 自定义关键词：读取方直接取当前快照，不加锁；写入方在写锁内生成新快照并整体替换，
+        # 自动机由后台线程按最新快照重建，连续修改合并为一次重建和一次配置写入
+        self.关键词快照 = 关键词快照(0, frozenset())
+        self.关键词重建条件 = threading.Condition()
+        self.已生效关键词版本 = 0
+        self.关键词待持久化 = False
+        self.关键词重建线程 = None
+        self.审核历史 = 审核历史存储(
+            容量=self.读取配置("安全设置.审核历史条目数", 10000),
+            溢写路径=self.读取配置("安全设置.审核历史溢写路径", None)
+        )
+        # 安全事件默认只保留在内存，配置了数据库路径才落盘
+        self.安全事件记录 = 安全事件存储(
+            数据库路径=self.读取配置("安全设置.安全事件数据库路径", ""),
+            内存条目数=self.读取配置("安全设置.安全事件内存条目数", 1000)
+        )
+        
+        # 多进程部署时各进程共享的审核计数、监控计数和警报（配置了路径才启用）
+        self.共享状态: Optional[共享审核状态] = None
+        共享状态路径 = self.读取配置("安全设置.共享状态路径", None)
+        if 共享状态路径:
+            try:
+                self.共享状态 = 共享审核状态(
+                    共享状态路径,
+                    批量条数=self.读取配置("安全设置.共享状态批量条数", 200),
+                    刷新间隔_秒=self.读取配置("安全设置.共享状态刷新间隔", 1.0)
+                )
+                self.风险监控器.共享状态 = self.共享状态
+            except sqlite3.Error as e:
+                self.日志器.error(f"共享审核状态打开失败，仅使用本进程统计: {e}")
+        
+        # 审核结果缓存，词库每次变化版本号加一
+        self.审核缓存 = 审核结果缓存()
+        
+        # 各审核阶段耗时直方图
+        self.阶段耗时 = 阶段耗时统计()
+        
+        # 按文档ID保存上次审核版本的增量审核器
+        self.增量审核器 = 增量文档审核器(self.文本扫描器.安全识别器)
+        self.词库版本 = 0
+        
+        # 历史、事件、监控的写入锁；批量审核进程池（按词库版本和模式懒创建）
+        self.记录锁 = threading.RLock()
+        self.批量进程池 = None
+        self.批量进程池标识 = None
+        
+        # 异步审核队列和工作线程（首次提交时创建）
+        self.异步审核队列 = None
+        self.异步工作线程: List[threading.Thread] = []
+        self.异步任务序号 = itertools.count()
+        
+        # 加载配置
+        self.加载审核配置()
+    
+    def 读取配置(self, 配置路径: str, 默认值: Any = None) -> Any:
+        """读取配置，本实例的配置覆盖优先"""
+        if 配置路径 in self.配置覆盖:
+            return self.配置覆盖[配置路径]
+        return self.配置管理器.获取配置(配置路径, 默认值)
+    
+    def 加载审核配置(self):
+        """加载审核配置"""
+        安全配置 = self.配置管理器.获取安全配置()
+        
         # 设置审核模式
         模式配置 = 安全配置.get("审核模式", "开启")
         self.当前模式 = 审核模式(模式配置)
         
         # 加载自定义关键词
         自定义关键词 = 安全配置.get("自定义关键词", [])
-        self.自定义关键词库 = set(自定义关键词)
+        self.关键词快照 = 关键词快照(self.关键词快照.版本 + 1, frozenset(自定义关键词))
+        self.同步关键词自动机()
         
         self.日志器.info(f"审核系统初始化完成 - 模式: {self.当前模式.value}")
     
     def 设置审核模式(self, 模式: 审核模式, 自定义关键词: List[str] = None):
         """设置审核模式"""
         self.当前模式 = 模式
+        self.审核缓存.清空()
         
         if 模式 == 审核模式.自定义 and 自定义关键词:
-            self.自定义关键词库 = set(自定义关键词)
+            self.修改自定义关键词(lambda _: 自定义关键词, 持久化=False)
         
         # 保存配置
         self.配置管理器.设置配置("安全设置.审核模式", 模式.value)
@@ -831,29 +3060,115 @@ class 三级审核系统:
         
         self.日志器.info(f"审核模式已设置为: {模式.value}")
     
-    def 添加自定义关键词(self, 关键词: str):
+    @property
+    def 自定义关键词库(self) -> frozenset:
+        """当前生效的自定义关键词（不可变快照）"""
+        return self.关键词快照.关键词
+    
+    def 同步关键词自动机(self):
+        """在当前线程按最新快照重建关键词自动机（初始化时使用）"""
+        快照 = self.关键词快照
+        self.应用关键词快照(快照)
+        with self.关键词重建条件:
+            self.已生效关键词版本 = max(self.已生效关键词版本, 快照.版本)
+            self.关键词重建条件.notify_all()
+    
+    def 应用关键词快照(self, 快照: 关键词快照):
+        """按快照构建一次自动机，两个识别器共用，再让旧词库下的缓存失效"""
+        自定义关键词 = sorted(快照.关键词)
+        自动机 = self.安全识别器.构建关键词自动机(自定义关键词)
+        self.安全识别器.更新自定义关键词(自定义关键词, 自动机)
+        self.文本扫描器.安全识别器.更新自定义关键词(自定义关键词, 自动机)
+        
+        # 先换自动机再加版本号：读到新版本号的审核一定使用新自动机
+        self.词库版本 += 1
+        self.审核缓存.清空()
+    
+    def 修改自定义关键词(self, 修改函数, 等待生效: bool = True, 持久化: bool = True) -> 关键词快照:
+        """由当前关键词集合生成新快照并原子替换，自动机交给后台线程重建
+        
+        修改函数接收当前关键词的frozenset，返回新的关键词集合。
+        等待生效为True时，返回前等待自动机切换到不早于新快照的版本。
+        """
+        with self.关键词重建条件:
+            当前快照 = self.关键词快照
+            新关键词 = frozenset(关键词 for 关键词 in 修改函数(当前快照.关键词) if 关键词)
+            if 新关键词 == 当前快照.关键词:
+                return 当前快照
+            
+            新快照 = 关键词快照(当前快照.版本 + 1, 新关键词)
+            self.关键词快照 = 新快照
+            self.关键词待持久化 = self.关键词待持久化 or 持久化
+            
+            if self.关键词重建线程 is None:
+                self.关键词重建线程 = threading.Thread(target=self.关键词重建循环, daemon=True)
+                self.关键词重建线程.start()
+            self.关键词重建条件.notify_all()
+        
+        if 等待生效:
+            self.等待关键词生效(新快照.版本)
+        return 新快照
+    
+    def 关键词重建循环(self):
+        """后台重建线程：每次取最新快照重建，期间的多次修改合并处理"""
+        while True:
+            with self.关键词重建条件:
+                self.关键词重建条件.wait_for(lambda: self.关键词快照.版本 > self.已生效关键词版本)
+                快照 = self.关键词快照
+                持久化, self.关键词待持久化 = self.关键词待持久化, False
+            
+            try:
+                self.应用关键词快照(快照)
+                if 持久化:
+                    self.配置管理器.设置配置("安全设置.自定义关键词", sorted(快照.关键词))
+            except Exception as e:
+                self.日志器.error(f"自定义关键词自动机重建失败: {e}")
+            
+            with self.关键词重建条件:
+                self.已生效关键词版本 = 快照.版本
+                self.关键词重建条件.notify_all()
+    
+    def 等待关键词生效(self, 版本: int = None, 超时: float = None) -> bool:
+        """等待自动机切换到指定版本（缺省为最新快照），超时返回False"""
+        with self.关键词重建条件:
+            目标版本 = self.关键词快照.版本 if 版本 is None else 版本
+            return self.关键词重建条件.wait_for(lambda: self.已生效关键词版本 >= 目标版本, 超时)
+    
+    def 添加自定义关键词(self, 关键词: str, 等待生效: bool = True):
         """添加自定义关键词"""
-        self.自定义关键词库.add(关键词)
-        
-        # 更新配置
-        当前关键词 = list(self.自定义关键词库)
-        self.配置管理器.设置配置("安全设置.自定义关键词", 当前关键词)
-        
+        self.修改自定义关键词(lambda 当前: 当前 | {关键词}, 等待生效)
         self.日志器.info(f"已添加自定义关键词: {关键词}")
     
-    def 移除自定义关键词(self, 关键词: str):
+    def 移除自定义关键词(self, 关键词: str, 等待生效: bool = True):
         """移除自定义关键词"""
         if 关键词 in self.自定义关键词库:
-            self.自定义关键词库.remove(关键词)
-            
-            # 更新配置
-            当前关键词 = list(self.自定义关键词库)
-            self.配置管理器.设置配置("安全设置.自定义关键词", 当前关键词)
-            
+            self.修改自定义关键词(lambda 当前: 当前 - {关键词}, 等待生效)
             self.日志器.info(f"已移除自定义关键词: {关键词}")
     
-    def 审核内容(self, 内容: Any, 内容类型: 内容类型, 上下文: str = "") -> 审核结果:
-        """审核内容"""
+    def 批量导入自定义关键词(self, 关键词列表: Iterable[str], 替换: bool = False,
+                             等待生效: bool = True) -> Dict[str, Any]:
+        """一次导入大量自定义关键词：只生成一个快照、重建一次自动机、写一次配置"""
+        导入关键词 = frozenset(关键词.strip() for 关键词 in 关键词列表 if 关键词 and 关键词.strip())
+        原关键词 = self.自定义关键词库
+        快照 = self.修改自定义关键词(
+            lambda 当前: 导入关键词 if 替换 else 当前 | 导入关键词, 等待生效
+        )
+        
+        新增数 = len(快照.关键词 - 原关键词)
+        self.日志器.info(f"已批量导入自定义关键词: 新增{新增数}个，共{len(快照.关键词)}个")
+        return {
+            "新增数": 新增数,
+            "移除数": len(原关键词 - 快照.关键词),
+            "关键词总数": len(快照.关键词),
+            "快照版本": 快照.版本
+        }
+    
+    def 审核内容(self, 内容: Any, 内容类型: 内容类型, 上下文: str = "", 文档ID: str = None) -> 审核结果:
+        """审核内容
+        
+        全面模式下给出文档ID的文本按增量方式审核：与该文档上次审核的版本比较，
+        只重新扫描改动过的句子。
+        """
         审核开始时间 = time.time()
         审核ID = hashlib.md5(f"{内容}{审核开始时间}".encode()).hexdigest()[:8]
         
@@ -866,12 +3181,351 @@ class 三级审核系统:
                 return self.自定义模式审核(内容, 内容类型, 审核ID, 审核开始时间, 上下文)
             
             else:  # 开启模式
+                if 内容类型 == 内容类型.文本 and 文档ID is not None:
+                    return self.审核文本内容(内容, 审核ID, 审核开始时间, 上下文, 文档ID)
                 return self.全面模式审核(内容, 内容类型, 审核ID, 审核开始时间, 上下文)
                 
         except Exception as e:
             self.日志器.error(f"审核过程出错: {e}")
             return self.创建失败审核结果(审核ID, 内容类型, 审核开始时间, str(e))
     
+    def 批量审核(self, 内容列表: List[Any], 内容类型: 内容类型, 上下文: str = "") -> List[审核结果]:
+        """批量审核，结果按输入顺序返回
+        
+        全面模式下文本分发到多进程并行扫描，图像整批交给视觉分析器合并打分。
+        """
+        批次开始时间 = time.time()
+        
+        if 内容类型 == 内容类型.图像 and self.当前模式 == 审核模式.开启:
+            return self.批量审核图像(内容列表, 批次开始时间)
+        
+        # 其余类型或非全面模式的审核开销很小，直接在当前进程逐条处理
+        if 内容类型 != 内容类型.文本 or self.当前模式 != 审核模式.开启:
+            return [self.审核内容(内容, 内容类型, 上下文) for 内容 in 内容列表]
+        
+        结果列表: List[Optional[审核结果]] = [None] * len(内容列表)
+        审核ID列表 = [
+            hashlib.md5(f"{内容}{批次开始时间}{序号}".encode()).hexdigest()[:8]
+            for 序号, 内容 in enumerate(内容列表)
+        ]
+        
+        # 先查缓存，只把未命中且批内不重复的文本交给进程池
+        词库版本, 模式 = self.词库版本, self.当前模式
+        上下文指纹 = self.文本扫描器.安全识别器.获取上下文指纹(上下文)
+        缓存键列表 = [self.审核缓存.生成缓存键(内容, 上下文指纹, 模式, 词库版本) for 内容 in 内容列表]
+        待扫描序号 = []
+        首次出现 = {}
+        重复序号 = {}
+        for 序号, 缓存键 in enumerate(缓存键列表):
+            if 缓存键 in 首次出现:
+                重复序号[序号] = 首次出现[缓存键]
+                continue
+            缓存结果 = self.审核缓存.获取(缓存键)
+            if 缓存结果 is not None:
+                缓存结果.审核ID = 审核ID列表[序号]
+                缓存结果.审核时间 = 0.0
+                缓存结果.审核详情["缓存命中"] = True
+                结果列表[序号] = 缓存结果
+            else:
+                首次出现[缓存键] = 序号
+                待扫描序号.append(序号)
+        
+        失败序号 = set()
+        if 待扫描序号:
+            扫描结果 = self.并行扫描文本(
+                [内容列表[序号] for 序号 in 待扫描序号],
+                [审核ID列表[序号] for 序号 in 待扫描序号],
+                上下文
+            )
+            for 序号, (结果, 错误信息) in zip(待扫描序号, 扫描结果):
+                if 结果 is None:
+                    # 失败结果由创建失败审核结果自行写入历史
+                    self.日志器.error(f"批量审核出错: {错误信息}")
+                    结果列表[序号] = self.创建失败审核结果(审核ID列表[序号], 内容类型, 批次开始时间, 错误信息)
+                    失败序号.add(序号)
+                    continue
+                self.记录扫描阶段耗时(结果)
+                self.审核缓存.设置(缓存键列表[序号], 结果)
+                结果列表[序号] = 结果
+        
+        # 批内重复文本复用首次出现的结果
+        for 序号, 首次序号 in 重复序号.items():
+            if 首次序号 in 失败序号:
+                结果列表[序号] = self.创建失败审核结果(审核ID列表[序号], 内容类型, 批次开始时间, "批内重复文本审核失败")
+                失败序号.add(序号)
+                continue
+            结果 = copy.deepcopy(结果列表[首次序号])
+            结果.审核ID = 审核ID列表[序号]
+            结果.审核时间 = 0.0
+            结果列表[序号] = 结果
+        
+        # 在父进程中按输入顺序统一写入历史、事件和监控
+        with self.记录锁:
+            for 序号, 结果 in enumerate(结果列表):
+                if 序号 not in 失败序号:
+                    self.记录文本审核结果(结果, 内容列表[序号])
+        
+        self.日志器.info(f"批量审核完成: {len(内容列表)} 条, 耗时 {time.time() - 批次开始时间:.2f}秒")
+        return 结果列表
+    
+    def 批量风险评分(self, 内容列表: List[str], 上下文: str = "") -> Dict[str, Any]:
+        """按全面模式规则只计算一批文本的风险评分、等级和是否通过
+        
+        不生成逐条的风险明细，也不写历史和监控，适合大批量初筛：
+        各文档提取特征后，整批评分只是几次矩阵运算。
+        """
+        开始时间 = time.time()
+        识别器 = self.文本扫描器.安全识别器
+        
+        文档列表 = [识别器.分析文档(内容) for 内容 in 内容列表]
+        特征 = 识别器.提取评分特征(文档列表, 上下文)
+        风险评分 = 识别器.批量计算风险评分(特征)
+        
+        # 与组装文本审核结果一致：命中自定义关键词时评分不低于 命中数×0.2
+        风险评分 = np.maximum(风险评分, 特征["自定义命中数"] * 0.2)
+        风险等级列表 = self.文本扫描器.批量评估风险等级(风险评分)
+        
+        return {
+            "风险评分": 风险评分.tolist(),
+            "风险等级": 风险等级列表,
+            "通过": [等级 in (风险等级.安全, 风险等级.低风险) for 等级 in 风险等级列表],
+            "耗时": time.time() - 开始时间
+        }
+    
+    def 并行扫描文本(self, 文本列表: List[str], 审核ID列表: List[str], 上下文: str) -> List[Tuple[Optional[审核结果], Optional[str]]]:
+        """在进程池中扫描文本，返回与输入顺序一致的 (审核结果, 错误信息) 列表"""
+        进程数 = self.配置管理器.获取配置("安全设置.批量审核进程数", None) or os.cpu_count() or 1
+        
+        # 任务太少或单核时不值得启动进程池
+        if 进程数 <= 1 or len(文本列表) < 2:
+            return [
+                执行批量文本审核(文本, 审核ID, 上下文, self)
+                for 文本, 审核ID in zip(文本列表, 审核ID列表)
+            ]
+        
+        进程池 = self.获取批量进程池(进程数)
+        块大小 = max(1, len(文本列表) // (进程数 * 4))
+        上下文列表 = [上下文] * len(文本列表)
+        return list(进程池.map(执行批量文本审核, 文本列表, 审核ID列表, 上下文列表, chunksize=块大小))
+    
+    def 获取批量进程池(self, 进程数: int) -> ProcessPoolExecutor:
+        """获取批量审核进程池，词库或模式变化后重建"""
+        池标识 = (self.词库版本, self.当前模式, 进程数)
+        if self.批量进程池 is None or self.批量进程池标识 != 池标识:
+            self.关闭批量进程池()
+            self.批量进程池 = ProcessPoolExecutor(
+                max_workers=进程数,
+                initializer=初始化批量审核进程,
+                initargs=(self.当前模式.value, sorted(self.自定义关键词库))
+            )
+            self.批量进程池标识 = 池标识
+        return self.批量进程池
+    
+    def 关闭批量进程池(self):
+        """关闭批量审核进程池"""
+        if self.批量进程池 is not None:
+            self.批量进程池.shutdown(wait=True)
+            self.批量进程池 = None
+            self.批量进程池标识 = None
+    
+    def 启动异步审核(self):
+        """按需创建有界优先级队列和工作线程"""
+        with self.记录锁:
+            if self.异步审核队列 is not None:
+                return
+            self.异步审核队列 = PriorityQueue(
+                maxsize=self.配置管理器.获取配置("安全设置.异步审核队列长度", 256)
+            )
+            线程数 = self.配置管理器.获取配置("安全设置.异步审核线程数", 2)
+            self.异步工作线程 = [
+                threading.Thread(target=self.异步审核工作线程, args=(self.异步审核队列,), daemon=True)
+                for _ in range(max(1, 线程数))
+            ]
+            for 线程 in self.异步工作线程:
+                线程.start()
+    
+    def 异步审核工作线程(self, 任务队列: PriorityQueue):
+        """异步审核工作线程：按优先级取任务，跳过已取消或已过截止时间的任务"""
+        while True:
+            _, _, 任务 = 任务队列.get()
+            try:
+                if 任务 is None:  # 停止信号
+                    return
+                
+                结果未来 = 任务["结果未来"]
+                if not 结果未来.set_running_or_notify_cancel():
+                    continue
+                
+                截止时间 = 任务["截止时间"]
+                if 截止时间 is not None and time.time() > 截止时间:
+                    审核ID = hashlib.md5(f"{任务['内容']}{time.time()}".encode()).hexdigest()[:8]
+                    结果未来.set_result(self.创建失败审核结果(
+                        审核ID, 任务["内容类型"], 任务["提交时间"], "排队超过截止时间，未执行审核"
+                    ))
+                    continue
+                
+                try:
+                    结果未来.set_result(self.审核内容(任务["内容"], 任务["内容类型"], 任务["上下文"]))
+                except Exception as e:
+                    结果未来.set_exception(e)
+            finally:
+                任务队列.task_done()
+    
+    def 提交审核(self, 内容: Any, 内容类型: 内容类型, 上下文: str = "", 优先级: 审核优先级 = None,
+                 截止时间_秒: float = None, 阻塞: bool = True, 等待超时: float = None) -> Future:
+        """提交审核任务到工作队列，返回Future
+        
+        队列已满时按 阻塞/等待超时 等待空位（背压），等不到则抛出 Full。
+        截止时间_秒 为从提交起算的期限，到期仍未开始的任务直接返回失败结果。
+        """
+        self.启动异步审核()
+        优先级 = 优先级 or 审核优先级.普通
+        提交时间 = time.time()
+        结果未来 = Future()
+        任务 = {
+            "内容": 内容,
+            "内容类型": 内容类型,
+            "上下文": 上下文,
+            "提交时间": 提交时间,
+            "截止时间": 提交时间 + 截止时间_秒 if 截止时间_秒 is not None else None,
+            "结果未来": 结果未来
+        }
+        # 同优先级按提交顺序执行
+        self.异步审核队列.put((优先级.value, next(self.异步任务序号), 任务), block=阻塞, timeout=等待超时)
+        return 结果未来
+    
+    async def 审核内容_async(self, 内容: Any, 内容类型: 内容类型, 上下文: str = "",
+                            优先级: 审核优先级 = None, 截止时间_秒: float = None) -> 审核结果:
+        """审核内容的asyncio版本，在工作线程中执行，不阻塞事件循环
+        
+        队列满时在线程中等待空位，不占用事件循环；超过截止时间返回失败审核结果。
+        """
+        开始时间 = time.time()
+        try:
+            结果未来 = await asyncio.wait_for(
+                asyncio.to_thread(self.提交审核, 内容, 内容类型, 上下文, 优先级, 截止时间_秒, True, 截止时间_秒),
+                截止时间_秒
+            )
+            剩余时间 = None if 截止时间_秒 is None else max(0.0, 截止时间_秒 - (time.time() - 开始时间))
+            return await asyncio.wait_for(asyncio.wrap_future(结果未来), 剩余时间)
+        except (asyncio.TimeoutError, Full):
+            审核ID = hashlib.md5(f"{内容}{开始时间}".encode()).hexdigest()[:8]
+            return self.创建失败审核结果(审核ID, 内容类型, 开始时间, "审核超过截止时间")
+    
+    def 停止异步审核(self, 等待: bool = True):
+        """停止异步审核工作线程，已入队的任务处理完后退出"""
+        with self.记录锁:
+            if self.异步审核队列 is None:
+                return
+            队列, 线程列表 = self.异步审核队列, self.异步工作线程
+            self.异步审核队列 = None
+            self.异步工作线程 = []
+        
+        # 停止信号排在所有任务之后
+        for _ in 线程列表:
+            队列.put((float("inf"), next(self.异步任务序号), None))
+        if 等待:
+            for 线程 in 线程列表:
+                线程.join()
+    
+    def 流式审核文本(self, 文本块迭代器: Iterable[str], 上下文: str = "", 提前终止: bool = True) -> Iterator[审核结果]:
+        """流式审核超长文本，每处理一块产出一次阶段性审核结果
+        
+        风险达到危险且允许提前终止时不再读取后续文本块。只有最后一次产出的
+        结果（审核详情中流式状态为完成或提前终止）会写入历史和监控。
+        """
+        开始时间 = time.time()
+        审核ID = hashlib.md5(f"流式审核{开始时间}{id(文本块迭代器)}".encode()).hexdigest()[:8]
+        
+        if self.当前模式 == 审核模式.关闭:
+            yield self.创建通过审核结果(审核ID, 内容类型.文本, 开始时间)
+            return
+        
+        状态 = 流式审核状态(self.文本扫描器.安全识别器, 上下文)
+        内容摘要 = ""
+        
+        try:
+            for 文本块 in 文本块迭代器:
+                if len(内容摘要) < 100:
+                    内容摘要 += 文本块[:100 - len(内容摘要)]
+                状态.处理文本块(文本块)
+                
+                结果 = self.生成流式审核结果(状态, 审核ID, 开始时间, "进行中")
+                if 提前终止 and 结果.风险等级 == 风险等级.危险:
+                    状态.结束()
+                    结果 = self.生成流式审核结果(状态, 审核ID, 开始时间, "提前终止")
+                    self.记录文本审核结果(结果, 内容摘要)
+                    yield 结果
+                    return
+                yield 结果
+            
+            状态.结束()
+            结果 = self.生成流式审核结果(状态, 审核ID, 开始时间, "完成")
+            self.记录文本审核结果(结果, 内容摘要)
+            yield 结果
+            
+        except Exception as e:
+            self.日志器.error(f"流式审核出错: {e}")
+            yield self.创建失败审核结果(审核ID, 内容类型.文本, 开始时间, str(e))
+    
+    def 生成流式审核结果(self, 状态: 流式审核状态, 审核ID: str, 开始时间: float, 流式状态: str) -> 审核结果:
+        """由流式累计状态生成审核结果"""
+        自定义关键词命中 = 状态.自定义关键词命中()
+        流式详情 = {
+            "流式状态": 流式状态,
+            "已处理块数": 状态.已处理块数,
+            "已处理字数": 状态.已处理字数
+        }
+        
+        if self.当前模式 == 审核模式.自定义:
+            # 自定义模式只看自定义关键词，与自定义模式审核一致
+            风险评分 = len(自定义关键词命中) * 0.2 if 自定义关键词命中 else 0.0
+            风险等级实例 = 风险等级.中风险 if 自定义关键词命中 else 风险等级.安全
+            return 审核结果(
+                审核ID=审核ID,
+                内容类型=内容类型.文本,
+                风险等级=风险等级实例,
+                风险评分=风险评分,
+                审核模式=self.当前模式,
+                通过=not 自定义关键词命中,
+                发现的问题=[{
+                    "问题类型": "自定义关键词命中",
+                    "命中关键词": 自定义关键词命中,
+                    "风险描述": f"命中{len(自定义关键词命中)}个自定义关键词"
+                }] if 自定义关键词命中 else [],
+                自定义关键词命中=自定义关键词命中,
+                审核时间=time.time() - 开始时间,
+                审核详情={"自定义关键词检查": 自定义关键词命中, **流式详情},
+                建议措施=["内容包含自定义敏感词，建议修改或删除"] if 自定义关键词命中 else ["内容安全，可正常使用"]
+            )
+        
+        扫描结果 = 状态.生成扫描结果()
+        最终风险评分 = 扫描结果["总体风险评分"]
+        if 自定义关键词命中:
+            最终风险评分 = max(最终风险评分, len(自定义关键词命中) * 0.2)
+        最终风险等级 = self.文本扫描器.评估风险等级(最终风险评分)
+        
+        return 审核结果(
+            审核ID=审核ID,
+            内容类型=内容类型.文本,
+            风险等级=最终风险等级,
+            风险评分=最终风险评分,
+            审核模式=self.当前模式,
+            通过=最终风险等级 in [风险等级.安全, 风险等级.低风险],
+            发现的问题=扫描结果["表面风险"],
+            自定义关键词命中=自定义关键词命中,
+            审核时间=time.time() - 开始时间,
+            审核详情={
+                "扫描状态": "完成" if 流式状态 != "进行中" else "进行中",
+                "内容长度": 状态.已处理字数,
+                "风险等级": 最终风险等级,
+                "风险评分": 最终风险评分,
+                "详细分析": 扫描结果,
+                **流式详情
+            },
+            建议措施=self.文本扫描器.生成建议措施(扫描结果, 最终风险等级)
+        )
+    
     def 全面模式审核(self, 内容: Any, 内容类型: 内容类型, 审核ID: str, 开始时间: float, 上下文: str) -> 审核结果:
         """全面模式审核"""
         if 内容类型 == 内容类型.文本:
@@ -889,9 +3543,7 @@ class 三级审核系统:
         
         if 内容类型 == 内容类型.文本:
             # 只检查自定义关键词
-            for 关键词 in self.自定义关键词库:
-                if 关键词 in 内容:
-                    命中关键词.append(关键词)
+            命中关键词 = self.安全识别器.匹配自定义关键词(内容)
         
         if 命中关键词:
             return 审核结果(
@@ -914,17 +3566,86 @@ class 三级审核系统:
         else:
             return self.创建通过审核结果(审核ID, 内容类型, 开始时间)
     
-    def 审核文本内容(self, 文本内容: str, 审核ID: str, 开始时间: float, 上下文: str) -> 审核结果:
+    def 审核文本内容(self, 文本内容: str, 审核ID: str, 开始时间: float, 上下文: str, 文档ID: str = None) -> 审核结果:
         """审核文本内容"""
+        缓存键 = self.审核缓存.生成缓存键(
+            文本内容, self.文本扫描器.安全识别器.获取上下文指纹(上下文), self.当前模式, self.词库版本
+        )
+        审核结果实例 = self.审核缓存.获取(缓存键)
+        
+        if 审核结果实例 is not None:
+            # 命中缓存：沿用扫描结论，ID与耗时按本次审核记录
+            审核结果实例.审核ID = 审核ID
+            审核结果实例.审核时间 = time.time() - 开始时间
+            审核结果实例.审核详情["缓存命中"] = True
+        else:
+            if 文档ID is not None and self.增量审核器.可增量():
+                审核结果实例 = self.计算增量文本审核结果(文档ID, 文本内容, 审核ID, 开始时间, 上下文)
+            else:
+                审核结果实例 = self.计算文本审核结果(文本内容, 审核ID, 开始时间, 上下文)
+            self.记录扫描阶段耗时(审核结果实例)
+            self.审核缓存.设置(缓存键, 审核结果实例)
+        
+        self.记录文本审核结果(审核结果实例, 文本内容)
+        return 审核结果实例
+    
+    def 记录扫描阶段耗时(self, 审核结果实例: 审核结果):
+        """把一次实际扫描（非缓存命中）的各阶段耗时计入直方图"""
+        阶段耗时 = 审核结果实例.审核详情.get("阶段耗时_毫秒")
+        if 阶段耗时:
+            self.阶段耗时.批量记录(阶段耗时)
+    
+    def 记录文本审核结果(self, 审核结果实例: 审核结果, 文本内容: str):
+        """写入风险监控、审核历史和安全事件"""
+        with self.记录锁:
+            # 记录风险监控
+            开始 = time.perf_counter()
+            self.风险监控器.记录内容审核(审核结果实例)
+            self.阶段耗时.记录("监控写入", (time.perf_counter() - 开始) * 1000)
+            
+            # 记录审核历史
+            self.记录审核历史(审核结果实例)
+            
+            # 如果发现高风险，记录安全事件
+            if not 审核结果实例.通过:
+                self.记录安全事件(审核结果实例, 文本内容[:100] + "...")
+    
+    def 计算文本审核结果(self, 文本内容: str, 审核ID: str, 开始时间: float, 上下文: str) -> 审核结果:
+        """执行文本扫描并生成审核结果（不写历史和监控）"""
+        阶段耗时: Dict[str, float] = {}
+        
+        # 文本只预处理一次，扫描与自定义关键词检查共用
+        with 阶段计时(阶段耗时, "关键词扫描"):
+            文档 = self.文本扫描器.安全识别器.分析文档(文本内容)
+        
         # 文本语义扫描
-        扫描报告 = self.文本扫描器.扫描文本内容(文本内容, 上下文)
+        扫描报告 = self.文本扫描器.扫描文本内容(文本内容, 上下文, 文档, 阶段耗时)
         
         # 检查自定义关键词（即使在全面模式下也检查）
-        自定义关键词命中 = []
-        for 关键词 in self.自定义关键词库:
-            if 关键词 in 文本内容:
-                自定义关键词命中.append(关键词)
+        with 阶段计时(阶段耗时, "自定义关键词"):
+            自定义关键词命中 = self.文本扫描器.安全识别器.匹配自定义关键词(文本内容, 文档)
+        扫描报告["阶段耗时_毫秒"] = 阶段耗时
+        
+        return self.组装文本审核结果(审核ID, 开始时间, 扫描报告, 自定义关键词命中)
+    
+    def 计算增量文本审核结果(self, 文档ID: str, 文本内容: str, 审核ID: str, 开始时间: float, 上下文: str) -> 审核结果:
+        """按文档ID增量扫描文本并生成审核结果（不写历史和监控）"""
+        阶段耗时: Dict[str, float] = {}
+        扫描开始时间 = time.time()
+        
+        with 阶段计时(阶段耗时, "增量预处理"):
+            状态, 增量统计 = self.增量审核器.更新文档(文档ID, 文本内容, self.词库版本)
+        with 阶段计时(阶段耗时, "增量汇总"):
+            语义扫描结果, 自定义关键词命中 = self.增量审核器.生成扫描结果(状态, 文本内容, 上下文)
         
+        扫描报告 = self.文本扫描器.生成扫描报告(文本内容, 语义扫描结果, 扫描开始时间, 阶段耗时)
+        扫描报告["增量审核"] = 增量统计
+        
+        return self.组装文本审核结果(审核ID, 开始时间, 扫描报告, 自定义关键词命中)
+    
+    def 组装文本审核结果(self, 审核ID: str, 开始时间: float, 扫描报告: Dict[str, Any],
+                         自定义关键词命中: List[str]) -> 审核结果:
+        """综合扫描报告和自定义关键词命中生成文本审核结果"""
         # 综合风险评估
         最终风险评分 = 扫描报告["风险评分"]
         if 自定义关键词命中:
@@ -935,23 +3656,8 @@ class 三级审核系统:
         # 判断是否通过
         通过审核 = 最终风险等级 in [风险等级.安全, 风险等级.低风险]
         
-        # 记录风险监控
-        self.风险监控器.记录内容审核(审核结果(
-            审核ID=审核ID,
-            内容类型=内容类型.文本,
-            风险等级=最终风险等级,
-            风险评分=最终风险评分,
-            审核模式=self.当前模式,
-            通过=通过审核,
-            发现的问题=扫描报告["详细分析"]["表面风险"],
-            自定义关键词命中=自定义关键词命中,
-            审核时间=0,
-            审核详情=扫描报告,
-            建议措施=[]
-        ))
-        
         # 创建审核结果
-        审核结果实例 = 审核结果(
+        return 审核结果(
             审核ID=审核ID,
             内容类型=内容类型.文本,
             风险等级=最终风险等级,
@@ -964,29 +3670,38 @@ class 三级审核系统:
             审核详情=扫描报告,
             建议措施=扫描报告["建议措施"]
         )
-        
-        # 记录审核历史
-        self.记录审核历史(审核结果实例)
-        
-        # 如果发现高风险，记录安全事件
-        if not 通过审核:
-            self.记录安全事件(审核结果实例, 文本内容[:100] + "...")
-        
-        return 审核结果实例
     
     def 审核图像内容(self, 图像路径: str, 审核ID: str, 开始时间: float) -> 审核结果:
         """审核图像内容"""
         # 视觉内容分析
         分析结果 = self.视觉分析器.分析图像内容(图像路径)
+        return self.生成图像审核结果(分析结果, 审核ID, 开始时间)
+    
+    def 批量审核图像(self, 图像路径列表: List[str], 批次开始时间: float) -> List[审核结果]:
+        """一次调用 批量分析图像，未命中缓存的图像合并为一个矩阵打分"""
+        审核ID列表 = [
+            hashlib.md5(f"{图像路径}{批次开始时间}{序号}".encode()).hexdigest()[:8]
+            for 序号, 图像路径 in enumerate(图像路径列表)
+        ]
         
-        风险等级映射 = {
-            "安全": 风险等级.安全,
-            "低风险": 风险等级.低风险,
-            "中风险": 风险等级.中风险,
-            "高风险": 风险等级.高风险
-        }
+        try:
+            分析结果列表 = self.视觉分析器.批量分析图像(图像路径列表)
+        except Exception as e:
+            self.日志器.error(f"批量审核图像出错: {e}")
+            return [
+                self.创建失败审核结果(审核ID, 内容类型.图像, 批次开始时间, str(e))
+                for 审核ID in 审核ID列表
+            ]
         
-        风险等级实例 = 风险等级映射.get(分析结果["风险等级"], 风险等级.安全)
+        return [
+            self.生成图像审核结果(分析结果, 审核ID, 批次开始时间)
+            for 分析结果, 审核ID in zip(分析结果列表, 审核ID列表)
+        ]
+    
+    def 生成图像审核结果(self, 分析结果: Dict[str, Any], 审核ID: str, 开始时间: float) -> 审核结果:
+        """由图像分析结果生成审核结果并记录历史"""
+        # 分析器直接给出风险等级枚举
+        风险等级实例 = 分析结果["风险等级"]
         通过审核 = 风险等级实例 in [风险等级.安全, 风险等级.低风险]
         
         审核结果实例 = 审核结果(
@@ -1013,14 +3728,8 @@ class 三级审核系统:
         # 视频内容分析
         分析结果 = self.视觉分析器.分析视频内容(视频路径)
         
-        风险等级映射 = {
-            "安全": 风险等级.安全,
-            "低风险": 风险等级.低风险,
-            "中风险": 风险等级.中风险,
-            "高风险": 风险等级.高风险
-        }
-        
-        风险等级实例 = 风险等级映射.get(分析结果["风险等级"], 风险等级.安全)
+        # 分析器直接给出风险等级枚举
+        风险等级实例 = 分析结果["风险等级"]
         通过审核 = 风险等级实例 in [风险等级.安全, 风险等级.低风险]
         
         审核结果实例 = 审核结果(
@@ -1111,11 +3820,12 @@ class 三级审核系统:
             "时间戳": time.time()
         }
         
-        self.审核历史.append(历史记录)
-        
-        # 限制历史记录数量
-        if len(self.审核历史) > 10000:
-            self.审核历史 = self.审核历史[-10000:]
+        with self.记录锁:
+            开始 = time.perf_counter()
+            self.审核历史.追加(历史记录)
+            if self.共享状态:
+                self.共享状态.记录审核(历史记录)
+            self.阶段耗时.记录("历史写入", (time.perf_counter() - 开始) * 1000)
     
     def 记录安全事件(self, 审核结果: 审核结果, 内容摘要: str):
         """记录安全事件"""
@@ -1132,54 +3842,56 @@ class 三级审核系统:
             处理措施=None
         )
         
-        self.安全事件记录.append(安全事件实例)
-        
-        # 限制安全事件数量
-        if len(self.安全事件记录) > 1000:
-            self.安全事件记录 = self.安全事件记录[-1000:]
+        with self.记录锁:
+            self.安全事件记录.添加(安全事件实例)
     
     def 处理安全事件(self, 事件ID: str, 处理人员: str, 处理措施: str):
         """处理安全事件"""
-        for 事件 in self.安全事件记录:
-            if 事件.事件ID == 事件ID:
-                事件.处理状态 = "已处理"
-                事件.处理时间 = time.time()
-                事件.处理人员 = 处理人员
-                事件.处理措施 = 处理措施
-                break
+        self.安全事件记录.更新状态(事件ID, "已处理", 处理人员, 处理措施)
     
     def 获取审核统计(self) -> Dict[str, Any]:
         """获取审核统计信息"""
-        总审核数 = len(self.审核历史)
-        通过数 = len([记录 for 记录 in self.审核历史 if 记录["通过"]])
+        # 历史存储随写入增量维护计数
+        历史统计 = self.审核历史.获取统计()
+        总审核数 = 历史统计["总数"]
+        通过数 = 历史统计["通过数"]
         拒绝数 = 总审核数 - 通过数
+        风险统计 = 历史统计["风险等级统计"]
+        类型统计 = 历史统计["内容类型统计"]
         
-        # 风险等级统计
-        风险统计 = {}
-        for 风险等级 in 风险等级:
-            风险统计[风险等级.value] = len([
-                记录 for 记录 in self.审核历史 
-                if 记录["风险等级"] == 风险等级.value
-            ])
-        
-        # 内容类型统计
-        类型统计 = {}
-        for 内容类型 in 内容类型:
-            类型统计[内容类型.value] = len([
-                记录 for 记录 in self.审核历史 
-                if 记录["内容类型"] == 内容类型.value
-            ])
-        
-        return {
+        统计 = {
             "总审核数": 总审核数,
             "通过数": 通过数,
             "拒绝数": 拒绝数,
             "通过率": 通过数 / 总审核数 if 总审核数 > 0 else 0,
             "风险等级统计": 风险统计,
             "内容类型统计": 类型统计,
-            "待处理安全事件": len([事件 for 事件 in self.安全事件记录 if 事件.处理状态 == "待处理"]),
+            "待处理安全事件": self.安全事件记录.状态数量("待处理"),
+            "审核缓存": self.审核缓存.获取状态(),
+            "上下文指纹": self.文本扫描器.安全识别器.获取上下文指纹状态(),
+            "阶段耗时": self.阶段耗时.获取统计(),
             "监控状态": self.风险监控器.获取监控状态()
         }
+        
+        # 启用共享状态时附上所有工作进程的汇总
+        if self.共享状态:
+            统计["全部进程"] = self.共享状态.获取汇总统计()
+        
+        return 统计
+    
+    def 关闭共享状态(self):
+        """提交本进程剩余的共享状态增量并断开"""
+        if self.共享状态:
+            self.风险监控器.共享状态 = None
+            self.共享状态.关闭()
+            self.共享状态 = None
+    
+    def 导出阶段耗时(self, 文件路径: str = None) -> str:
+        """导出Prometheus格式的阶段耗时；给出路径（或配置了导出路径）时同时写入文件"""
+        文件路径 = 文件路径 or self.配置管理器.获取配置("安全设置.阶段耗时导出路径", None)
+        if 文件路径:
+            self.阶段耗时.写入Prometheus文件(文件路径)
+        return self.阶段耗时.导出Prometheus文本()
     
     def 导出审核日志(self, 开始时间: float = None, 结束时间: float = None) -> List[Dict[str, Any]]:
         """导出审核日志"""
@@ -1188,19 +3900,11 @@ class 三级审核系统:
         if 结束时间 is None:
             结束时间 = time.time()
         
-        过滤日志 = [
-            记录 for 记录 in self.审核历史
-            if 开始时间 <= 记录["时间戳"] <= 结束时间
-        ]
-        
-        return 过滤日志
+        return self.审核历史.按时间导出(开始时间, 结束时间)
     
-    def 导出安全事件(self, 处理状态: str = None) -> List[安全事件]:
+    def 导出安全事件(self, 处理状态: str = None, 数量上限: int = None) -> List[安全事件]:
         """导出安全事件"""
-        if 处理状态:
-            return [事件 for 事件 in self.安全事件记录 if 事件.处理状态 == 处理状态]
-        else:
-            return self.安全事件记录
+        return self.安全事件记录.导出(处理状态, 数量上限)
 
 # 三级审核系统单例
 三级审核系统实例 = None
@@ -1212,6 +3916,40 @@ def 获取三级审核系统():
         三级审核系统实例 = 三级审核系统()
     return 三级审核系统实例
 
+class 批量文本审核器:
+    """批量审核子进程使用的文本审核器
+    
+    只构建文本扫描器并应用父进程的审核模式和自定义关键词，不打开事件库和
+    历史存储，也不启动监控和共享状态线程。打分直接复用 三级审核系统 的方法，
+    结果与父进程内审核一致。
+    """
+    计算文本审核结果 = 三级审核系统.计算文本审核结果
+    组装文本审核结果 = 三级审核系统.组装文本审核结果
+    
+    def __init__(self, 模式值: str, 自定义关键词: List[str]):
+        self.当前模式 = 审核模式(模式值)
+        self.文本扫描器 = 文本语义扫描器()
+        
+        关键词列表 = sorted(自定义关键词)
+        识别器 = self.文本扫描器.安全识别器
+        识别器.更新自定义关键词(关键词列表, 识别器.构建关键词自动机(关键词列表))
+
+# 批量审核子进程内的审核器实例
+批量审核进程实例: Optional[批量文本审核器] = None
+
+def 初始化批量审核进程(模式值: str, 自定义关键词: List[str]):
+    """批量审核子进程初始化：按父进程的模式和词库构建轻量的文本审核器"""
+    global 批量审核进程实例
+    批量审核进程实例 = 批量文本审核器(模式值, 自定义关键词)
+
+def 执行批量文本审核(文本内容: str, 审核ID: str, 上下文: str, 审核系统: 三级审核系统 = None) -> Tuple[Optional[审核结果], Optional[str]]:
+    """扫描单条文本，只返回结果不写历史；异常以错误信息返回"""
+    审核系统 = 审核系统 or 批量审核进程实例
+    try:
+        return 审核系统.计算文本审核结果(文本内容, 审核ID, time.time(), 上下文), None
+    except Exception as e:
+        return None, str(e)
+
 if __name__ == "__main__":
     # 测试三级审核系统
     审核系统 = 获取三级审核系统()